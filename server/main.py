@@ -6,26 +6,54 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from routes.routes import router
+from routes.worker import close_client, router as worker_router
 from services.grid_context import grid_context_service
-from services.devices import device_manager
+from services.sites import site_manager
 from services.llm_insight import llm_insight_service
+from services.clock import clock
+from services.metrics import RequestMetricsMiddleware
+from services.loop_monitor import LOOP_MONITOR_ENABLED, loop_monitor
+from services.pathway.follower import pathway_follower
+from services.shared_state import SERVER_ROLE, shared_state_publisher
+from services.timelines import timeline_runner
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    device_manager.start_background_task()
+    if LOOP_MONITOR_ENABLED:
+        loop_monitor.start_background_task()
+    if SERVER_ROLE == "worker":
+        # Simulation and LLM loops run in the owner process only
+        print("Worker process: serving live reads from shared memory")
+        yield
+        await pathway_follower.stop_background_task()
+        await close_client()
+        await loop_monitor.stop_background_task()
+        return
+    
+    site_manager.start_background_task()
     grid_context_service.start_background_task()
     llm_insight_service.start_background_task()
+    if SERVER_ROLE == "owner":
+        shared_state_publisher.start_background_task()
     
     print("Data streams initialized:")
     print("- Internal stream: 4 devices (motor, HVAC, compressor, lighting) @ 10Hz")
+    if len(site_manager.sites) > 1:
+        print(f"- Sites: {len(site_manager.sites)} (one simulation task each)")
     print("- External stream: Grid context (carbon, pricing) @ 15min intervals")
     print("- LLM insight service: Gemini analysis @ 30s intervals")
+    if not clock.realtime or clock.seed is not None:
+        print(f"- Simulation clock: {clock.describe()}")
     
     yield
     
+    await timeline_runner.stop_background_task()
+    await shared_state_publisher.stop_background_task()
+    await loop_monitor.stop_background_task()
+    await pathway_follower.stop_background_task()
     await llm_insight_service.stop_background_task()
-    await device_manager.stop_background_task()
+    await site_manager.stop_background_task()
     await grid_context_service.stop_background_task()
     print("All services stopped")
 
@@ -44,5 +72,6 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RequestMetricsMiddleware)
 
-app.include_router(router)
\ No newline at end of file
+app.include_router(worker_router if SERVER_ROLE == "worker" else router)
@@ -1,12 +1,19 @@
-from fastapi import APIRouter
+import json
+import time
+from typing import Dict, Optional
+from fastapi import APIRouter, Depends
+from fastapi.responses import Response
 from services.grid_context import grid_context_service
-from services.devices import device_manager
+from services.devices import DeviceManager, telemetry_json
+from services.sites import site_manager
+from routes.sites import get_site
+from services.metrics import PIPELINE_STAGE_SECONDS
 
 router = APIRouter()
 
 
 @router.get("/combined")
-def get_combined_stream():
+def get_combined_stream(manager: DeviceManager = Depends(get_site)):
     """
     Combined data from both internal and external streams for Pathway processing.
     
@@ -45,7 +52,7 @@ def get_combined_stream():
       "timestamp": 1708563245.123
     }
     """
-    devices_data = device_manager.get_all_telemetry()
+    devices_data = manager.get_all_telemetry()
     grid_data = grid_context_service.get_context()
     
     # Get timestamp from first device
@@ -58,8 +65,27 @@ def get_combined_stream():
     }
 
 
+def snapshot_json(devices_json: str, timestamp: float, trace: dict) -> str:
+    """Internal stream snapshot around pre-serialized device telemetry"""
+    if trace["origin_ts"] is not None:
+        PIPELINE_STAGE_SECONDS.observe(time.time() - trace["origin_ts"], stage="serve")
+    return f'{{"devices": {devices_json}, {json.dumps({"timestamp": timestamp, **trace})[1:]}'
+
+
+def sites_json(snapshots: Dict[str, str]) -> str:
+    """{"sites": {site_id: snapshot}} from per-site snapshot JSON"""
+    sites = ", ".join(f"{json.dumps(site_id)}: {snapshot}" for site_id, snapshot in snapshots.items())
+    return f'{{"sites": {{{sites}}}}}'
+
+
+def _internal_snapshot(manager: DeviceManager) -> str:
+    trace = manager.get_trace()
+    records = list(manager.get_all_records())
+    return snapshot_json(telemetry_json(records), records[0].timestamp if records else 0, trace)
+
+
 @router.get("/internal")
-def get_internal_stream():
+def get_internal_stream(site: Optional[str] = None):
     """
     Internal stream only: All device telemetry data.
     
@@ -67,14 +93,22 @@ def get_internal_stream():
     Includes motor, HVAC, compressor, and lighting systems.
     
     Use this endpoint when you only need device data without grid context.
-    """
-    devices_data = device_manager.get_all_telemetry()
-    timestamp = next(iter(devices_data.values()))["timestamp"] if devices_data else 0
     
-    return {
-        "devices": devices_data,
-        "timestamp": timestamp
-    }
+    tick_id and origin_ts (wall time the snapshot was completed) let
+    consumers such as the Pathway connector trace end-to-end latency.
+    
+    Query Parameters:
+    - site: Site id (default: default site), or * for every site as
+      {"sites": {site_id: {"devices", "timestamp", "tick_id", "origin_ts"}}}
+    """
+    if site == "*":
+        content = sites_json({
+            site_id: _internal_snapshot(manager)
+            for site_id, manager in list(site_manager.sites.items())
+        })
+    else:
+        content = _internal_snapshot(get_site(site))
+    return Response(content=content, media_type="application/json")
 
 
 @router.get("/external")
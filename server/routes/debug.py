@@ -0,0 +1,131 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from services.loop_monitor import loop_monitor
+from services.profiler import (
+    ADMIN_TOKEN,
+    MAX_PROFILE_SECONDS,
+    ProfilerBusy,
+    allocation_diff,
+    allocations_to_folded,
+    is_admin,
+    sample_cpu,
+    to_folded,
+)
+
+router = APIRouter()
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Debug endpoints are disabled; set ADMIN_TOKEN to enable them")
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@router.get("/loop", dependencies=[Depends(require_admin)])
+def get_loop_monitor():
+    """
+    Event-loop lag sampler and slow-callback detector status (admin only)
+    
+    Includes the latest and maximum wake-up lag, the number of stalls
+    longer than the threshold and the stack of the most recent one.
+    
+    Headers:
+    - X-Admin-Token: must match ADMIN_TOKEN
+    """
+    return loop_monitor.status()
+
+
+@router.post("/loop", dependencies=[Depends(require_admin)])
+async def configure_loop_monitor(
+    enabled: Optional[bool] = None,
+    threshold: Optional[float] = None,
+    interval: Optional[float] = None
+):
+    """
+    Toggle or tune the loop monitor at runtime (admin only)
+    
+    Headers:
+    - X-Admin-Token: must match ADMIN_TOKEN
+    
+    Query Parameters:
+    - enabled: Start or stop the sampler and watchdog
+    - threshold: Seconds the loop may be held before the stack is logged
+    - interval: Sampling interval in seconds
+    """
+    for name, value in (("threshold", threshold), ("interval", interval)):
+        if value is not None and value <= 0:
+            raise HTTPException(status_code=400, detail=f"{name} must be positive")
+    if threshold is not None:
+        loop_monitor.threshold = threshold
+    if interval is not None:
+        loop_monitor.interval = interval
+    if enabled is True:
+        loop_monitor.start_background_task()
+    elif enabled is False:
+        await loop_monitor.stop_background_task()
+    return loop_monitor.status()
+
+
+def _check_duration(duration: float):
+    if not 0 < duration <= MAX_PROFILE_SECONDS:
+        raise HTTPException(status_code=400, detail=f"duration must be in (0, {MAX_PROFILE_SECONDS:.0f}] seconds")
+
+
+def _folded_response(body: str, name: str) -> PlainTextResponse:
+    return PlainTextResponse(body, headers={"Content-Disposition": f'attachment; filename="{name}.folded"'})
+
+
+@router.get("/profile/cpu", dependencies=[Depends(require_admin)])
+async def profile_cpu(duration: float = 10.0, interval: float = 0.005):
+    """
+    Capture a sampling CPU profile of every thread (admin only)
+    
+    Returns folded stacks ("thread;frame;...;frame samples") for
+    flamegraph.pl or speedscope. Sampling runs in a worker thread, so the
+    event loop is profiled while it keeps serving traffic.
+    
+    Headers:
+    - X-Admin-Token: must match ADMIN_TOKEN
+    
+    Query Parameters:
+    - duration: Seconds to sample (default: 10)
+    - interval: Seconds between samples (default: 0.005)
+    """
+    _check_duration(duration)
+    if not 0.001 <= interval <= 1.0:
+        raise HTTPException(status_code=400, detail="interval must be between 0.001 and 1 seconds")
+    try:
+        counts = await sample_cpu(duration, interval)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return _folded_response(to_folded(counts), "cpu")
+
+
+@router.get("/profile/alloc", dependencies=[Depends(require_admin)])
+async def profile_allocations(duration: float = 10.0, top: int = 50, format: str = "folded"):
+    """
+    Diff tracemalloc snapshots taken `duration` seconds apart (admin only)
+    
+    Returns the tracebacks with the largest allocation growth, as folded
+    stacks weighted by bytes (default) or as JSON with size/count diffs.
+    
+    Headers:
+    - X-Admin-Token: must match ADMIN_TOKEN
+    
+    Query Parameters:
+    - duration: Seconds between snapshots (default: 10)
+    - top: Number of tracebacks to return (default: 50)
+    - format: folded or json
+    """
+    _check_duration(duration)
+    if format not in ("folded", "json"):
+        raise HTTPException(status_code=400, detail="format must be folded or json")
+    try:
+        stats = await allocation_diff(duration, top)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if format == "json":
+        return {"duration_s": duration, "allocations": stats}
+    return _folded_response(allocations_to_folded(stats), "alloc")
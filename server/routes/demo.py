@@ -1,6 +1,8 @@
-from fastapi import APIRouter
-from services.devices import device_manager
-from services.llm_insight import llm_insight_service
+from fastapi import APIRouter, Depends, HTTPException
+from services.devices import DeviceManager
+from routes.sites import get_site
+from services.control import apply_operations, parse_operations
+from services.timelines import load_timeline, timeline_files, timeline_runner
 
 router = APIRouter()
 
@@ -38,68 +40,36 @@ SCENARIOS = {
 }
 
 
-def _apply_surge():
-    motor = device_manager.get_device("motor_001")
-    hvac = device_manager.get_device("hvac_001")
-    compressor = device_manager.get_device("compressor_001")
-    lighting = device_manager.get_device("lighting_001")
-    motor.turn_on()
-    hvac.turn_on()
-    compressor.turn_on()
-    lighting.turn_on()
-    motor.inject_fault()
-    llm_insight_service.trigger_urgent()
-
-
-def _apply_motor_inrush():
-    motor = device_manager.get_device("motor_001")
-    motor.turn_off()
-    motor.start()
-
-
-def _apply_high_load():
-    motor = device_manager.get_device("motor_001")
-    hvac = device_manager.get_device("hvac_001")
-    compressor = device_manager.get_device("compressor_001")
-    lighting = device_manager.get_device("lighting_001")
-    lighting.turn_off()
-    if motor.status == "off":
-        motor.start()
-    hvac.turn_on()
-    compressor.turn_on()
-
-
-def _apply_normal():
-    motor = device_manager.get_device("motor_001")
-    compressor = device_manager.get_device("compressor_001")
-    hvac = device_manager.get_device("hvac_001")
-    lighting = device_manager.get_device("lighting_001")
-    motor.turn_off()
-    compressor.turn_off()
-    hvac.turn_on()
-    lighting.turn_on()
-
-
-def _apply_fault():
-    motor = device_manager.get_device("motor_001")
-    if motor.status == "off":
-        motor.start()
-    motor.inject_fault()
-    llm_insight_service.trigger_urgent()
-
-
-def _apply_reset():
-    for device in device_manager.devices.values():
-        device.turn_off()
-
-
-_SCENARIO_FNS = {
-    "surge": _apply_surge,
-    "motor_inrush": _apply_motor_inrush,
-    "high_load": _apply_high_load,
-    "normal": _apply_normal,
-    "fault": _apply_fault,
-    "reset": _apply_reset,
+# Selector operations (see services.control), applied by device type so
+# they work on any site
+SCENARIO_OPERATIONS = {
+    "surge": [
+        {"selector": {}, "action": "on"},
+        {"selector": {"type": "motor"}, "action": "inject-fault"},
+    ],
+    "motor_inrush": [
+        {"selector": {"type": "motor"}, "action": "off"},
+        {"selector": {"type": "motor"}, "action": "start"},
+    ],
+    "high_load": [
+        {"selector": {"type": "lighting"}, "action": "off"},
+        {"selector": {"type": "motor", "status": "off"}, "action": "start"},
+        {"selector": {"type": "hvac"}, "action": "on"},
+        {"selector": {"type": "compressor"}, "action": "on"},
+    ],
+    "normal": [
+        {"selector": {"type": "motor"}, "action": "off"},
+        {"selector": {"type": "compressor"}, "action": "off"},
+        {"selector": {"type": "hvac"}, "action": "on"},
+        {"selector": {"type": "lighting"}, "action": "on"},
+    ],
+    "fault": [
+        {"selector": {"type": "motor", "status": "off"}, "action": "start"},
+        {"selector": {"type": "motor"}, "action": "inject-fault"},
+    ],
+    "reset": [
+        {"selector": {}, "action": "off"},
+    ],
 }
 
 
@@ -109,14 +79,73 @@ def list_scenarios():
 
 
 @router.post("/scenarios/{scenario_id}")
-def run_scenario(scenario_id: str):
+async def run_scenario(scenario_id: str, manager: DeviceManager = Depends(get_site)):
     if scenario_id not in SCENARIOS:
         return {"status": "error", "message": f"Unknown scenario: {scenario_id}"}
 
-    _SCENARIO_FNS[scenario_id]()
+    result = await apply_operations(parse_operations(SCENARIO_OPERATIONS[scenario_id]), manager.site_id)
+    if not result["applied"] and scenario_id != "reset":
+        return {"status": "error", "message": f"Site {manager.site_id} has no devices for scenario {scenario_id}"}
 
     return {
         "status": "success",
         "scenario": scenario_id,
+        "devices_changed": result["applied"],
         **SCENARIOS[scenario_id],
     }
+
+
+@router.get("/timelines")
+def list_timelines():
+    """
+    List scripted timelines from TIMELINES_DIR (invalid files are listed with their error).
+    """
+    timelines = {}
+    for name, path in timeline_files().items():
+        try:
+            timelines[name] = load_timeline(path).summary()
+        except (OSError, ValueError) as e:
+            timelines[name] = {"name": name, "error": str(e)}
+    return {"timelines": timelines}
+
+
+@router.get("/timelines/run")
+def get_timeline_run():
+    """
+    State and event log of the current or latest timeline run.
+    
+    Each event has the step index, its offset in simulated seconds, the
+    simulated and wall time it was applied, and per control step the device
+    count and the tick it landed after (match against tick_id in Pathway
+    output and WebSocket messages).
+    """
+    return timeline_runner.status()
+
+
+@router.post("/timelines/run/stop")
+async def stop_timeline_run():
+    """
+    Stop the running timeline. Devices keep their state; grid overrides are cleared.
+    """
+    await timeline_runner.stop_background_task()
+    return timeline_runner.status()
+
+
+@router.post("/timelines/{name}/run")
+async def run_timeline(name: str, manager: DeviceManager = Depends(get_site)):
+    """
+    Start a scripted timeline on the simulation clock.
+    
+    Query Parameters:
+    - site: Site of selectors without a site pattern (default: default site)
+    """
+    path = timeline_files().get(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Unknown timeline: {name}")
+    try:
+        timeline_runner.start(load_timeline(path), manager.site_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return timeline_runner.status()
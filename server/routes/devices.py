@@ -1,17 +1,33 @@
-from fastapi import APIRouter, HTTPException
-from services.devices import device_manager
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import Response
+from pydantic import BaseModel
+from services.clock import clock
+from services.control import apply_operations, parse_operations
+from services.devices import DeviceManager
+from routes.sites import get_site
 from services.llm_insight import llm_insight_service
 
 router = APIRouter()
 
 
+class ControlOperationSpec(BaseModel):
+    selector: Dict[str, Any] = {}
+    action: str
+    value: Optional[Any] = None
+
+
+class BulkControlRequest(BaseModel):
+    operations: List[ControlOperationSpec]
+
+
 @router.get("")
-def list_devices():
+def list_devices(manager: DeviceManager = Depends(get_site)):
     """
     List all available devices.
     Returns device IDs and types.
     """
-    devices = device_manager.get_all_telemetry()
+    devices = manager.get_all_telemetry()
     return {
         "device_count": len(devices),
         "devices": [
@@ -26,31 +42,79 @@ def list_devices():
 
 
 @router.get("/telemetry")
-def get_all_device_telemetry():
+def get_all_device_telemetry(manager: DeviceManager = Depends(get_site)):
     """
     Get telemetry from all devices.
     High-frequency internal stream data.
     """
-    return device_manager.get_all_telemetry()
+    return Response(content=manager.get_telemetry_json(), media_type="application/json")
 
 
 @router.get("/{device_id}")
-def get_device_telemetry(device_id: str):
+def get_device_telemetry(device_id: str, manager: DeviceManager = Depends(get_site)):
     """
     Get telemetry from a specific device.
     """
-    telemetry = device_manager.get_device_telemetry(device_id)
+    telemetry = manager.get_device_telemetry(device_id)
     if "error" in telemetry:
         raise HTTPException(status_code=404, detail="Device not found")
     return telemetry
 
 
+@router.get("/{device_id}/history")
+def get_device_history(
+    device_id: str,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    step: Optional[float] = None,
+    manager: DeviceManager = Depends(get_site)
+):
+    """
+    Get telemetry history for a device as columns.
+    
+    With step >= 1 the response holds min/max/avg/last current and power plus
+    energy_wh per step-second bucket, served from the coarsest rollup tier
+    (1s, 1min, 15min) that fits, or a coarser one when the range starts
+    before that tier's retention. Smaller or no step returns raw samples.
+    truncated is true when part of the range was already dropped.
+    
+    Query Parameters:
+    - start: Unix timestamp (default: one hour before end)
+    - end: Unix timestamp (default: now)
+    - step: Bucket size in seconds
+    """
+    if not manager.get_device(device_id):
+        raise HTTPException(status_code=404, detail="Device not found")
+    
+    end = end if end is not None else clock.time()
+    start = start if start is not None else end - 3600
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if step is not None and step <= 0:
+        raise HTTPException(status_code=400, detail="step must be positive")
+    
+    if manager.history is None:
+        raise HTTPException(status_code=404, detail=f"History is disabled for site {manager.site_id}")
+    if manager.history.error is not None:
+        raise HTTPException(status_code=503, detail=f"History of site {manager.site_id} stopped: {manager.history.error}")
+    
+    history = manager.history.query(device_id, start, end, step)
+    return {
+        "device_id": device_id,
+        "start": start,
+        "end": end,
+        "step": step,
+        "count": len(history["timestamp"]),
+        **history
+    }
+
+
 @router.post("/{device_id}/control/on")
-def turn_device_on(device_id: str):
+def turn_device_on(device_id: str, manager: DeviceManager = Depends(get_site)):
     """
     Turn on a device.
     """
-    device = device_manager.get_device(device_id)
+    device = manager.get_device(device_id)
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
     
@@ -63,11 +127,11 @@ def turn_device_on(device_id: str):
 
 
 @router.post("/{device_id}/control/off")
-def turn_device_off(device_id: str):
+def turn_device_off(device_id: str, manager: DeviceManager = Depends(get_site)):
     """
     Turn off a device.
     """
-    device = device_manager.get_device(device_id)
+    device = manager.get_device(device_id)
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
     
@@ -80,11 +144,11 @@ def turn_device_off(device_id: str):
 
 
 @router.post("/{device_id}/control/brightness")
-def set_lighting_brightness(device_id: str, level: int):
+def set_lighting_brightness(device_id: str, level: int, manager: DeviceManager = Depends(get_site)):
     """
     Set brightness level for lighting devices (0-100).
     """
-    device = device_manager.get_device(device_id)
+    device = manager.get_device(device_id)
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
     
@@ -103,12 +167,12 @@ def set_lighting_brightness(device_id: str, level: int):
 
 
 @router.post("/{device_id}/control/start")
-def start_motor_device(device_id: str):
+def start_motor_device(device_id: str, manager: DeviceManager = Depends(get_site)):
     """
     Start motor device (triggers inrush current).
     Only works for motor devices.
     """
-    device = device_manager.get_device(device_id)
+    device = manager.get_device(device_id)
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
     
@@ -119,12 +183,12 @@ def start_motor_device(device_id: str):
 
 
 @router.post("/{device_id}/control/inject-fault")
-def inject_motor_fault(device_id: str):
+def inject_motor_fault(device_id: str, manager: DeviceManager = Depends(get_site)):
     """
     Inject locked rotor fault into motor device.
     Only works for motor devices.
     """
-    device = device_manager.get_device(device_id)
+    device = manager.get_device(device_id)
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
     
@@ -134,3 +198,31 @@ def inject_motor_fault(device_id: str):
     result = device.inject_fault()
     llm_insight_service.trigger_urgent()
     return result
+
+
+@router.post("/control")
+async def bulk_control(request: BulkControlRequest, manager: DeviceManager = Depends(get_site)):
+    """
+    Apply a list of (selector, action) operations in one simulation tick.
+    
+    Body: {"operations": [{"selector": {"type": "motor", "device": "motor_0*"}, "action": "off"}, ...]}
+    
+    - selector: Optional site, device (glob patterns), type, status and limit
+      (first N matches per site); an empty selector matches every device
+    - action: on, off, start (motors), inject-fault (motors), brightness
+      (lighting, value 0-100)
+    
+    The whole batch is validated first and rejected with 400 if any operation
+    is invalid. Each site applies it at the start of its next tick, in order.
+    Devices an action does not fit (wrong type, motor not off for start) are
+    counted as skipped.
+    
+    Query Parameters:
+    - site: Site of selectors without a site pattern (default: default site)
+    """
+    try:
+        operations = parse_operations(operation.model_dump() for operation in request.operations)
+        result = await apply_operations(operations, manager.site_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "success", **result}
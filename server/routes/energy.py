@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, HTTPException
+from services.devices import DeviceManager
+from routes.sites import get_site
+
+router = APIRouter()
+
+
+@router.get("")
+def get_energy_totals(manager: DeviceManager = Depends(get_site)):
+    """
+    Get energy, cost and carbon totals for all devices.
+    
+    Each device reports lifetime, current day and current shift totals:
+    - kwh: Energy consumed (trapezoidal integration of power)
+    - cost: Cost in $ at the tariff in effect at each moment
+    - carbon_g: Emissions in gCO2 at the carbon intensity in effect
+    """
+    return {
+        device_id: manager.energy.snapshot(device_id)
+        for device_id in manager.energy.device_ids()
+    }
+
+
+@router.get("/{device_id}")
+def get_device_energy(device_id: str, manager: DeviceManager = Depends(get_site)):
+    """
+    Get lifetime, per-day and per-shift energy totals for a device.
+    """
+    report = manager.energy.report(device_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Device not found")
+    return {"device_id": device_id, **report}
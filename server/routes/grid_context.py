@@ -1,11 +1,13 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from services.grid_context import grid_context_service
 
 router = APIRouter()
 
+MAX_FORECAST_HOURS = 48
+
 
 @router.get("")
-def get_grid_context():
+def get_grid_context(horizon: float = 0):
     """
     Get current grid context (external stream).
     
@@ -15,5 +17,28 @@ def get_grid_context():
     - Renewable energy percentage
     
     Updates every 15 minutes.
+    
+    Query Parameters:
+    - horizon: Hours of 5-minute forecast slots to include (default: 0, max: 48)
+    """
+    if not 0 <= horizon <= MAX_FORECAST_HOURS:
+        raise HTTPException(status_code=400, detail=f"horizon must be between 0 and {MAX_FORECAST_HOURS}")
+    
+    context = grid_context_service.get_context()
+    if horizon:
+        context["forecast"] = grid_context_service.forecast(horizon * 3600)
+    return context
+
+
+@router.get("/at")
+def get_grid_context_at(timestamp: float):
+    """
+    Get the grid context in effect at a Unix timestamp (past or future).
+    
+    Query Parameters:
+    - timestamp: Unix timestamp between 1970 and 2100
     """
-    return grid_context_service.get_context()
+    try:
+        return grid_context_service.context_at(timestamp)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,8 +1,29 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 from services.health import health_service
 router = APIRouter()
 
+
+def _respond(report: dict) -> JSONResponse:
+    return JSONResponse(report, status_code=503 if report["status"] == "fail" else 200)
+
+
 @router.get("/")
 async def get_health():
-    status_report = health_service.check_system_status()
-    return status_report
\ No newline at end of file
+    """
+    Full component report: simulator tick age, grid context age, Pathway
+    output lag, LLM backoff and event-loop lag. 503 if any check fails.
+    """
+    return _respond(await health_service.check_system_status())
+
+
+@router.get("/live")
+async def get_liveness():
+    """Liveness probe: simulator loop alive and ticking"""
+    return _respond(await health_service.liveness())
+
+
+@router.get("/ready")
+async def get_readiness():
+    """Readiness probe: liveness plus fresh grid context, sustained event-loop lag in budget (and Pathway output if required)"""
+    return _respond(await health_service.readiness())
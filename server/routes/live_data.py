@@ -1,11 +1,13 @@
-from fastapi import APIRouter
-from services.devices import device_manager
+from fastapi import APIRouter, Depends
+from fastapi.responses import Response
+from services.devices import DeviceManager
+from routes.sites import get_site
 
 router = APIRouter()
 
 
 @router.get("")
-def get_live_data():
+def get_live_data(manager: DeviceManager = Depends(get_site)):
     """
     Get real-time telemetry data from all devices.
     
@@ -27,4 +29,4 @@ def get_live_data():
     Poll this endpoint at 1Hz (every second) for dashboard updates.
     Internal data stream updates at 10Hz (100ms intervals).
     """
-    return device_manager.get_all_telemetry()
+    return Response(content=manager.get_telemetry_json(), media_type="application/json")
@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from services.metrics import registry
+
+router = APIRouter()
+
+
+@router.get("", response_class=PlainTextResponse)
+def get_metrics():
+    """
+    Prometheus text exposition of all registered metrics
+    
+    Includes simulator tick timing, per-route HTTP latency, WebSocket
+    connections and send latency, Pathway output file sizes and read times,
+    and LLM call latency, rate limits and fingerprint cache hits.
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -7,21 +7,68 @@ Provides endpoints to access Pathway processing results:
 - Optimization recommendations
 """
 
-from fastapi import APIRouter
-from typing import List, Dict, Any
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Any, Optional
 import json
 import os
+import time
 from pathlib import Path
+from services.clock import clock
+from services.devices import DEFAULT_SITE
+from services.pathway.columnar import columnar_available, export_arrow_stream
+from services.pathway.counters import output_counts
+from services.pathway.follower import FOLLOW_TABLES, pathway_follower
+from services.pathway.query import read_rows
+from services.pathway.sink import tail_lines
+from services.metrics import PIPELINE_STAGE_SECONDS, registry
 
 router = APIRouter()
 
 PATHWAY_OUTPUT_DIR = Path("pathway_output")
+EXPORT_TABLES = ("anomalies", "device_stats", "recommendations")
+MAX_READ_LIMIT = 1000  # rows per request
+
+
+def _output_sizes():
+    for filepath in PATHWAY_OUTPUT_DIR.glob("*.jsonl"):
+        try:
+            yield (filepath.name,), filepath.stat().st_size
+        except FileNotFoundError:
+            continue
+
+
+OUTPUT_BYTES = registry.gauge(
+    "gridsense_pathway_output_bytes", "Size of the active Pathway output segment", ["file"], collect=_output_sizes
+)
+READ_SECONDS = registry.histogram("gridsense_pathway_read_seconds", "Time to read the tail of a Pathway output file", ["file"])
+
+# Newest traced origin_ts per output file, so each row is traced once
+_traced_origin: Dict[str, float] = {}
+
+
+def _trace_rows(name: str, rows: List[Dict[str, Any]]):
+    """Record ingest, write and read stage latency of rows not seen before"""
+    last = _traced_origin.get(name, 0.0)
+    now = time.time()
+    for row in rows:
+        origin = row.get("origin_ts")
+        if origin is None or origin <= last or "written_at" not in row:
+            continue
+        PIPELINE_STAGE_SECONDS.observe(row["ingest_ts"] - origin, stage="ingest")
+        PIPELINE_STAGE_SECONDS.observe(row["written_at"] - row["ingest_ts"], stage="write")
+        PIPELINE_STAGE_SECONDS.observe(now - row["written_at"], stage="read")
+        last = origin
+    _traced_origin[name] = last
 
 
 def read_latest_jsonl(filepath: Path, max_lines: int = 100) -> List[Dict[str, Any]]:
     """
     Read the latest entries from a JSONL file
     
+    Only the tail of the active segment is read; sealed segments are
+    consulted when it holds fewer than max_lines rows.
+    
     Args:
         filepath: Path to the JSONL file
         max_lines: Maximum number of lines to return (from end of file)
@@ -29,15 +76,10 @@ def read_latest_jsonl(filepath: Path, max_lines: int = 100) -> List[Dict[str, An
     Returns:
         List of dictionaries containing the parsed JSON data
     """
-    if not filepath.exists():
-        return []
-    
     try:
-        with open(filepath, 'r') as f:
-            lines = f.readlines()
-            
-        # Get the last N lines
-        recent_lines = lines[-max_lines:] if len(lines) > max_lines else lines
+        start = time.perf_counter()
+        recent_lines = tail_lines(filepath, max_lines)
+        READ_SECONDS.observe(time.perf_counter() - start, file=Path(filepath).name)
         
         # Parse JSON and filter out deleted entries (Pathway marks deletes with diff=-1)
         results = []
@@ -51,14 +93,74 @@ def read_latest_jsonl(filepath: Path, max_lines: int = 100) -> List[Dict[str, An
             except json.JSONDecodeError:
                 continue
         
+        _trace_rows(Path(filepath).name, results)
         return results
     except Exception as e:
         print(f"Error reading {filepath}: {e}")
         return []
 
 
+def for_site(rows: List[Dict[str, Any]], site_id: str) -> List[Dict[str, Any]]:
+    """Rows of one site; rows without site_id belong to the default site"""
+    return [row for row in rows if row.get("site_id", DEFAULT_SITE) == site_id]
+
+
+def read_latest_by_key(
+    filepath: Path,
+    key: str,
+    max_lines: int = 100,
+    site_id: Optional[str] = None
+) -> Dict[str, Dict[str, Any]]:
+    """Latest entry per distinct value of key among the last max_lines rows (of one site if given)"""
+    entries = read_latest_jsonl(filepath, max_lines=max_lines)
+    if site_id is not None:
+        entries = for_site(entries, site_id)
+    latest = {}
+    for entry in entries:
+        value = entry.get(key)
+        if value:
+            latest[value] = entry
+    return latest
+
+
+def read_page(
+    filepath: Path,
+    key: str,
+    limit: int,
+    since_cursor: Optional[int],
+    start: Optional[float],
+    end: Optional[float]
+) -> Dict[str, Any]:
+    """
+    Latest rows, or rows after a cursor / within a time range
+    
+    Without since_cursor, start or end the newest `limit` rows are returned
+    as before. Every response carries next_cursor; passing it back as
+    since_cursor returns only rows written since.
+    """
+    if since_cursor is None and start is None and end is None:
+        rows = read_latest_jsonl(filepath, max_lines=limit)
+        counts = output_counts(filepath)
+        return {"count": len(rows), key: rows, "next_cursor": counts["total_rows"] if counts else 0}
+    
+    if start is not None and end is not None and start > end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    page = read_rows(filepath, since=since_cursor, start=start, end=end, limit=limit)
+    return {
+        "count": len(page["rows"]),
+        key: page["rows"],
+        "next_cursor": page["next_cursor"],
+        "truncated": page["truncated"]
+    }
+
+
 @router.get("/anomalies")
-def get_anomalies(limit: int = 50):
+def get_anomalies(
+    limit: int = Query(50, ge=1, le=MAX_READ_LIMIT),
+    since_cursor: Optional[int] = None,
+    start: Optional[float] = None,
+    end: Optional[float] = None
+):
     """
     Get recent anomalies detected by Pathway
     
@@ -69,19 +171,17 @@ def get_anomalies(limit: int = 50):
     - Voltage anomalies
     
     Query Parameters:
-    - limit: Maximum number of anomalies to return (default: 50)
+    - limit: Maximum number of anomalies to return (default: 50, max: 1000)
+    - since_cursor: Only rows at or after this cursor (next_cursor of a previous call)
+    - start: Only rows with timestamp >= start (Unix seconds)
+    - end: Only rows with timestamp <= end (Unix seconds)
     """
     filepath = PATHWAY_OUTPUT_DIR / "anomalies.jsonl"
-    anomalies = read_latest_jsonl(filepath, max_lines=limit)
-    
-    return {
-        "count": len(anomalies),
-        "anomalies": anomalies
-    }
+    return read_page(filepath, "anomalies", limit, since_cursor, start, end)
 
 
 @router.get("/statistics")
-def get_device_statistics():
+def get_device_statistics(site: Optional[str] = None):
     """
     Get real-time device statistics computed by Pathway
     
@@ -91,16 +191,12 @@ def get_device_statistics():
     - Sample count
     
     Updated continuously as new data arrives.
+    
+    Query Parameters:
+    - site: Site id (default: default site)
     """
     filepath = PATHWAY_OUTPUT_DIR / "device_stats.jsonl"
-    stats = read_latest_jsonl(filepath, max_lines=100)
-    
-    # Group by device type (get latest for each)
-    latest_stats = {}
-    for entry in stats:
-        device_type = entry.get('device_type')
-        if device_type:
-            latest_stats[device_type] = entry
+    latest_stats = read_latest_by_key(filepath, 'device_type', max_lines=100, site_id=site or DEFAULT_SITE)
     
     return {
         "device_types": list(latest_stats.keys()),
@@ -109,7 +205,12 @@ def get_device_statistics():
 
 
 @router.get("/recommendations")
-def get_recommendations(limit: int = 50):
+def get_recommendations(
+    limit: int = Query(50, ge=1, le=MAX_READ_LIMIT),
+    since_cursor: Optional[int] = None,
+    start: Optional[float] = None,
+    end: Optional[float] = None
+):
     """
     Get optimization recommendations from Pathway
     
@@ -124,19 +225,37 @@ def get_recommendations(limit: int = 50):
     - Cost per hour calculations
     
     Query Parameters:
-    - limit: Maximum number of recommendations to return (default: 50)
+    - limit: Maximum number of recommendations to return (default: 50, max: 1000)
+    - since_cursor: Only rows at or after this cursor (next_cursor of a previous call)
+    - start: Only rows with timestamp >= start (Unix seconds)
+    - end: Only rows with timestamp <= end (Unix seconds)
     """
     filepath = PATHWAY_OUTPUT_DIR / "recommendations.jsonl"
-    recommendations = read_latest_jsonl(filepath, max_lines=limit)
+    return read_page(filepath, "recommendations", limit, since_cursor, start, end)
+
+
+@router.get("/energy")
+def get_energy_totals(site: Optional[str] = None):
+    """
+    Get per-device energy, cost and carbon totals computed by Pathway
+    
+    Returns the latest lifetime, current day and current shift totals
+    (kwh, cost, carbon_g) for each device.
+    
+    Query Parameters:
+    - site: Site id (default: default site)
+    """
+    filepath = PATHWAY_OUTPUT_DIR / "energy.jsonl"
+    totals = read_latest_by_key(filepath, 'device_id', max_lines=200, site_id=site or DEFAULT_SITE)
     
     return {
-        "count": len(recommendations),
-        "recommendations": recommendations
+        "device_ids": list(totals.keys()),
+        "energy": totals
     }
 
 
 @router.get("/total-power")
-def get_total_power(limit: int = 100):
+def get_total_power(limit: int = Query(100, ge=1, le=MAX_READ_LIMIT)):
     """
     Get total power consumption over time
     
@@ -144,7 +263,7 @@ def get_total_power(limit: int = 100):
     across all devices (computed in 1-second tumbling windows).
     
     Query Parameters:
-    - limit: Maximum number of data points to return (default: 100)
+    - limit: Maximum number of data points to return (default: 100, max: 1000)
     """
     filepath = PATHWAY_OUTPUT_DIR / "total_power.jsonl"
     power_data = read_latest_jsonl(filepath, max_lines=limit)
@@ -155,6 +274,69 @@ def get_total_power(limit: int = 100):
     }
 
 
+@router.get("/export")
+def export_results(
+    table: str = "recommendations",
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    device_type: Optional[str] = None
+):
+    """
+    Stream a time range of Pathway results as an Arrow IPC stream
+    
+    Reads the hour/device_type partitions written when COLUMNAR_FORMAT is set.
+    
+    Query Parameters:
+    - table: anomalies, device_stats or recommendations (default: recommendations)
+    - start: Unix timestamp (default: one hour before end)
+    - end: Unix timestamp (default: now)
+    - device_type: Only export this device type
+    """
+    if table not in EXPORT_TABLES:
+        raise HTTPException(status_code=400, detail=f"Unknown table: {table}")
+    if not columnar_available():
+        raise HTTPException(status_code=501, detail="pyarrow is not installed")
+    
+    end = end if end is not None else clock.time()
+    start = start if start is not None else end - 3600
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    
+    return StreamingResponse(
+        export_arrow_stream(table, start, end, device_type),
+        media_type="application/vnd.apache.arrow.stream",
+        headers={"Content-Disposition": f'attachment; filename="{table}-{int(start)}-{int(end)}.arrows"'}
+    )
+
+
+@router.get("/stream")
+def stream_results(
+    tables: str = ",".join(FOLLOW_TABLES),
+    last_event_id: Optional[str] = Header(None)
+):
+    """
+    Stream new Pathway rows as Server-Sent Events
+    
+    Each row is sent as an event named after its table. All clients share
+    one background reader, so rows are read once however many are connected.
+    Reconnecting with the Last-Event-ID header (sent automatically by
+    EventSource) replays the rows missed while disconnected.
+    
+    Query Parameters:
+    - tables: Comma-separated subset of anomalies, recommendations, device_stats (default: all)
+    """
+    selected = tuple(t.strip() for t in tables.split(",") if t.strip())
+    unknown = [t for t in selected if t not in FOLLOW_TABLES]
+    if unknown or not selected:
+        raise HTTPException(status_code=400, detail=f"Unknown table: {', '.join(unknown) or tables}")
+    
+    return StreamingResponse(
+        pathway_follower.events(selected, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/status")
 def get_pathway_status():
     """
@@ -164,24 +346,14 @@ def get_pathway_status():
     - Whether output files exist
     - Last update timestamps
     - File sizes
+    - Row, insert and retract counts of the active segment and of all
+      segments (counted incrementally; only appended bytes are scanned)
     """
     files_info = {}
     
     for filename in ['anomalies.jsonl', 'device_stats.jsonl', 'recommendations.jsonl', 'total_power.jsonl']:
-        filepath = PATHWAY_OUTPUT_DIR / filename
-        
-        if filepath.exists():
-            stat = filepath.stat()
-            files_info[filename] = {
-                'exists': True,
-                'size_bytes': stat.st_size,
-                'last_modified': stat.st_mtime,
-                'line_count': sum(1 for _ in open(filepath))
-            }
-        else:
-            files_info[filename] = {
-                'exists': False
-            }
+        counts = output_counts(PATHWAY_OUTPUT_DIR / filename)
+        files_info[filename] = {'exists': True, **counts} if counts else {'exists': False}
     
     # Check if any files exist
     is_active = any(info['exists'] for info in files_info.values())
@@ -0,0 +1,81 @@
+from pathlib import Path
+from fastapi import APIRouter, HTTPException
+from services.clock import clock
+from services.devices import device_manager
+from services.grid_context import grid_context_service
+from services.recorder import RECORDINGS_DIR, recording_service
+
+router = APIRouter()
+
+
+def _recording_path(name: str) -> Path:
+    if not name or Path(name).name != name:
+        raise HTTPException(status_code=400, detail="Recording name must be a plain file name")
+    return Path(RECORDINGS_DIR) / name
+
+
+@router.get("")
+def list_recordings():
+    """
+    List captured recordings and the current record/replay state.
+    """
+    directory = Path(RECORDINGS_DIR)
+    files = sorted(directory.glob("*")) if directory.exists() else []
+    return {
+        "recordings": [{"name": f.name, "size_bytes": f.stat().st_size} for f in files if f.is_file()],
+        **recording_service.status()
+    }
+
+
+# Recording routes run on the event loop, between simulator ticks: the tick
+# writes to the recorder, so swapping or closing it from a threadpool thread
+# could hit a closed file mid-write
+@router.post("/start")
+async def start_recording(name: str = ""):
+    """
+    Start capturing device snapshots (every tick) and grid context changes.
+    
+    Names ending in .zst are zstd-compressed. Defaults to a timestamped name.
+    
+    Query Parameters:
+    - name: Recording file name (default: capture-<timestamp>.gsrec.zst)
+    """
+    name = name or f"capture-{int(clock.time())}.gsrec.zst"
+    return recording_service.start_recording(_recording_path(name), grid_context_service.get_context())
+
+
+@router.post("/stop")
+async def stop_recording():
+    """
+    Stop the active recording and close its file.
+    """
+    return recording_service.stop_recording()
+
+
+@router.post("/replay")
+async def start_replay(name: str, speed: float = 1.0, loop: bool = False):
+    """
+    Replay a recording through the live device and grid state.
+    
+    While replaying, the simulators are paused and every consumer
+    (/api/stream/*, WebSocket, Pathway connectors) sees the captured traffic.
+    
+    Query Parameters:
+    - name: Recording file name
+    - speed: Replay speed multiplier (default: 1.0)
+    - loop: Restart from the beginning when the recording ends
+    """
+    path = _recording_path(name)
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Recording not found")
+    if speed <= 0:
+        raise HTTPException(status_code=400, detail="speed must be positive")
+    return recording_service.start_replay(path, device_manager, grid_context_service, speed, loop)
+
+
+@router.post("/replay/stop")
+async def stop_replay():
+    """
+    Stop replay and resume simulation.
+    """
+    return recording_service.stop_replay()
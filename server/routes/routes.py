@@ -8,6 +8,11 @@ from routes.control_panel import router as control_panel_router
 from routes.pathway_routes import router as pathway_router
 from routes.websocket import router as websocket_router
 from routes.demo import router as demo_router
+from routes.energy import router as energy_router
+from routes.recording import router as recording_router
+from routes.metrics import router as metrics_router
+from routes.debug import router as debug_router
+from routes.sites import router as sites_router
 
 router = APIRouter()
 
@@ -17,12 +22,17 @@ def read_root():
 
 
 router.include_router(health_router, prefix="/health", tags=["Health"])
+router.include_router(metrics_router, prefix="/metrics", tags=["Metrics"])
 router.include_router(live_data_router, prefix="/api/live", tags=["Live Data"])
+router.include_router(sites_router, prefix="/api/sites", tags=["Sites"])
 router.include_router(devices_router, prefix="/api/devices", tags=["Devices"])
 router.include_router(grid_router, prefix="/api/grid", tags=["Grid Context"])
+router.include_router(energy_router, prefix="/api/energy", tags=["Energy"])
 router.include_router(combined_router, prefix="/api/stream", tags=["Data Streams"])
 router.include_router(pathway_router, prefix="/api/pathway", tags=["Pathway Analytics"])
 router.include_router(control_panel_router, tags=["Testing"])
 router.include_router(websocket_router, tags=["WebSocket"])
 router.include_router(demo_router, prefix="/api/demo", tags=["Demo"])
+router.include_router(recording_router, prefix="/api/recording", tags=["Recording"])
+router.include_router(debug_router, prefix="/api/debug", tags=["Debug"])
 
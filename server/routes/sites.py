@@ -0,0 +1,76 @@
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from services.devices import DeviceManager
+from services.sites import site_manager
+
+router = APIRouter()
+
+
+class SiteSpec(BaseModel):
+    site_id: str
+    devices: List[Dict[str, Any]] = []
+    seed: Optional[int] = None
+    history: bool = True
+
+
+def get_site(site: Optional[str] = None) -> DeviceManager:
+    """Resolve the ?site= query parameter (the default site when omitted)"""
+    manager = site_manager.get(site)
+    if manager is None:
+        raise HTTPException(status_code=404, detail=f"Unknown site: {site}")
+    return manager
+
+
+def _site_summary(manager: DeviceManager) -> dict:
+    return {
+        "site_id": manager.site_id,
+        "device_count": len(manager.devices),
+        "pending_devices": manager.pending_count,
+        "running": manager._task is not None and not manager._task.done(),
+        **manager.get_trace()
+    }
+
+
+@router.get("")
+def list_sites():
+    """
+    List all sites with their device count and latest tick.
+    """
+    sites = [_site_summary(manager) for manager in list(site_manager.sites.values())]
+    return {"site_count": len(sites), "sites": sites}
+
+
+@router.post("")
+async def create_site(spec: SiteSpec):
+    """
+    Create a site with its own simulation task.
+
+    Body: {"site_id": "plant_01", "seed": 7, "history": true, "devices": [...]}
+    where each device entry is {"device_id", "device_type"} or a fleet group
+    {"type", "count", "name", "params"} (see services.fleet). Sites with more
+    than SITE_HISTORY_MAX_DEVICES devices need "history": false.
+    """
+    try:
+        manager = site_manager.create_site(spec.site_id, spec.devices, spec.seed, spec.history)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "success", **_site_summary(manager)}
+
+
+@router.get("/{site_id}")
+def get_site_summary(site_id: str):
+    """
+    Get device count and latest tick of a site.
+    """
+    return _site_summary(get_site(site_id))
+
+
+@router.delete("/{site_id}")
+async def delete_site(site_id: str):
+    """
+    Stop a site's simulation and remove it. The default site cannot be removed.
+    """
+    if not await site_manager.remove_site(site_id):
+        raise HTTPException(status_code=404, detail=f"Unknown or default site: {site_id}")
+    return {"status": "success", "site_id": site_id}
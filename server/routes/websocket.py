@@ -1,10 +1,14 @@
 import asyncio
 import json
+import time
+from typing import Optional
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from services.devices import device_manager
+from services.devices import DeviceManager
 from services.grid_context import grid_context_service
 from services.llm_insight import llm_insight_service
-from routes.pathway_routes import read_latest_jsonl
+from services.metrics import PIPELINE_AGE_SECONDS, PIPELINE_STAGE_SECONDS, registry
+from services.sites import site_manager
+from routes.pathway_routes import for_site, read_latest_by_key, read_latest_jsonl
 from pathlib import Path
 
 router = APIRouter()
@@ -16,94 +20,126 @@ GRID_CONTEXT_INTERVAL = 60.0
 PATHWAY_INTERVAL = 2.0
 LLM_INSIGHT_POLL = 1.0
 
+WS_CONNECTIONS = registry.gauge("gridsense_ws_connections", "Open WebSocket connections")
+WS_SENDS_IN_FLIGHT = registry.gauge("gridsense_ws_sends_in_flight", "WebSocket sends waiting on the socket (queue depth)")
+WS_SEND_SECONDS = registry.histogram("gridsense_ws_send_seconds", "WebSocket send latency by message type", ["type"])
 
-async def push_live_data(ws: WebSocket, stop: asyncio.Event):
+
+async def send_message(ws: WebSocket, message: dict, raw_data: Optional[str] = None):
+    """Send a message; raw_data is pre-serialized JSON sent as its "data" field"""
+    WS_SENDS_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    try:
+        if raw_data is None:
+            await ws.send_json(message)
+        else:
+            await ws.send_text(f'{json.dumps(message)[:-1]}, "data": {raw_data}}}')
+    finally:
+        WS_SENDS_IN_FLIGHT.dec()
+        elapsed = time.perf_counter() - start
+        WS_SEND_SECONDS.observe(elapsed, type=message["type"])
+    if message.get("origin_ts"):
+        PIPELINE_STAGE_SECONDS.observe(elapsed, stage="send")
+        PIPELINE_AGE_SECONDS.observe(time.time() - message["origin_ts"], message=message["type"])
+
+
+async def push_live_data(ws: WebSocket, stop: asyncio.Event, manager: DeviceManager):
     while not stop.is_set():
         try:
-            telemetry = device_manager.get_all_telemetry()
-            await ws.send_json({"type": "live_data", "data": telemetry})
+            trace = manager.get_trace()
+            await send_message(ws, {"type": "live_data", **trace}, manager.get_telemetry_json())
         except (WebSocketDisconnect, RuntimeError):
             break
         await asyncio.sleep(LIVE_DATA_INTERVAL)
 
 
-async def push_grid_context(ws: WebSocket, stop: asyncio.Event):
+async def push_grid_context(ws: WebSocket, stop: asyncio.Event, grid=grid_context_service):
     while not stop.is_set():
         try:
-            ctx = grid_context_service.get_context()
-            await ws.send_json({"type": "grid_context", "data": ctx})
+            ctx = grid.get_context()
+            await send_message(ws, {"type": "grid_context", "data": ctx})
         except (WebSocketDisconnect, RuntimeError):
             break
         await asyncio.sleep(GRID_CONTEXT_INTERVAL)
 
 
-async def push_pathway_data(ws: WebSocket, stop: asyncio.Event):
-    while not stop.is_set():
-        try:
-            anomalies_file = PATHWAY_OUTPUT_DIR / "anomalies.jsonl"
-            stats_file = PATHWAY_OUTPUT_DIR / "device_stats.jsonl"
-            recommendations_file = PATHWAY_OUTPUT_DIR / "recommendations.jsonl"
+def read_pathway_message(site_id: str) -> dict:
+    """Build a pathway_data message for one site (blocking file reads; run off the event loop)"""
+    anomalies_file = PATHWAY_OUTPUT_DIR / "anomalies.jsonl"
+    stats_file = PATHWAY_OUTPUT_DIR / "device_stats.jsonl"
+    recommendations_file = PATHWAY_OUTPUT_DIR / "recommendations.jsonl"
+
+    is_active = any(
+        (PATHWAY_OUTPUT_DIR / f).exists()
+        for f in ["anomalies.jsonl", "device_stats.jsonl", "recommendations.jsonl", "total_power.jsonl"]
+    )
 
-            is_active = any(
-                (PATHWAY_OUTPUT_DIR / f).exists()
-                for f in ["anomalies.jsonl", "device_stats.jsonl", "recommendations.jsonl", "total_power.jsonl"]
-            )
+    payload = {"pathway_active": is_active}
+    trace = {}
 
-            payload = {"pathway_active": is_active}
+    if is_active:
+        anomalies = for_site(read_latest_jsonl(anomalies_file, max_lines=20), site_id)
+        recommendations = for_site(read_latest_jsonl(recommendations_file, max_lines=20), site_id)
 
-            if is_active:
-                anomalies = read_latest_jsonl(anomalies_file, max_lines=20)
-                recommendations = read_latest_jsonl(recommendations_file, max_lines=20)
+        payload["anomalies"] = anomalies
+        payload["recommendations"] = recommendations
+        payload["statistics"] = read_latest_by_key(stats_file, "device_type", max_lines=100, site_id=site_id)
+        if recommendations:
+            newest = recommendations[-1]
+            trace = {"tick_id": newest.get("tick_id"), "origin_ts": newest.get("origin_ts")}
 
-                stats_raw = read_latest_jsonl(stats_file, max_lines=100)
-                latest_stats = {}
-                for entry in stats_raw:
-                    device_type = entry.get("device_type")
-                    if device_type:
-                        latest_stats[device_type] = entry
+    return {"type": "pathway_data", "data": payload, **trace}
 
-                payload["anomalies"] = anomalies
-                payload["recommendations"] = recommendations
-                payload["statistics"] = latest_stats
 
-            await ws.send_json({"type": "pathway_data", "data": payload})
+async def push_pathway_data(ws: WebSocket, stop: asyncio.Event, site_id: str):
+    while not stop.is_set():
+        try:
+            message = await asyncio.to_thread(read_pathway_message, site_id)
+            await send_message(ws, message)
         except (WebSocketDisconnect, RuntimeError):
             break
         await asyncio.sleep(PATHWAY_INTERVAL)
 
 
-async def push_llm_insight(ws: WebSocket, stop: asyncio.Event):
+async def push_llm_insight(ws: WebSocket, stop: asyncio.Event, insights=llm_insight_service):
     """Push LLM insight as soon as a new version is available."""
     last_version = 0
     while not stop.is_set():
         try:
-            if llm_insight_service.version != last_version:
-                insight = llm_insight_service.latest_insight
+            version = insights.version
+            if version != last_version:
+                insight = insights.latest_insight
                 if insight:
-                    await ws.send_json({"type": "llm_insight", "data": insight})
-                    last_version = llm_insight_service.version
+                    await send_message(ws, {"type": "llm_insight", "data": insight})
+                    last_version = version
         except (WebSocketDisconnect, RuntimeError):
             break
         await asyncio.sleep(LLM_INSIGHT_POLL)
 
 
-@router.websocket("/ws")
-async def websocket_endpoint(ws: WebSocket):
+async def serve_websocket(ws: WebSocket, manager, grid=grid_context_service, insights=llm_insight_service):
+    """
+    Push loop of one connection
+
+    manager, grid and insights are the in-process services, or in a worker
+    process the shared-memory views (see services.shared_state).
+    """
     await ws.accept()
+    WS_CONNECTIONS.inc()
     stop = asyncio.Event()
 
     tasks = [
-        asyncio.create_task(push_live_data(ws, stop)),
-        asyncio.create_task(push_grid_context(ws, stop)),
-        asyncio.create_task(push_pathway_data(ws, stop)),
-        asyncio.create_task(push_llm_insight(ws, stop)),
+        asyncio.create_task(push_live_data(ws, stop, manager)),
+        asyncio.create_task(push_grid_context(ws, stop, grid)),
+        asyncio.create_task(push_pathway_data(ws, stop, manager.site_id)),
+        asyncio.create_task(push_llm_insight(ws, stop, insights)),
     ]
 
     try:
         while True:
             data = await ws.receive_text()
             if data == "ping":
-                await ws.send_json({"type": "pong"})
+                await send_message(ws, {"type": "pong"})
     except WebSocketDisconnect:
         pass
     finally:
@@ -111,3 +147,14 @@ async def websocket_endpoint(ws: WebSocket):
         for t in tasks:
             t.cancel()
         await asyncio.gather(*tasks, return_exceptions=True)
+        WS_CONNECTIONS.dec()
+
+
+@router.websocket("/ws")
+async def websocket_endpoint(ws: WebSocket, site: Optional[str] = None):
+    """Live data, grid context, Pathway results and LLM insights for one site (?site=, default site when omitted)"""
+    manager = site_manager.get(site)
+    if manager is None:
+        await ws.close(code=1008, reason=f"Unknown site: {site}")
+        return
+    await serve_websocket(ws, manager)
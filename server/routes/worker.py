@@ -0,0 +1,162 @@
+"""
+Routes of a SERVER_ROLE=worker process
+
+Live reads come from the owner's shared-memory snapshot (services.shared_state),
+Pathway results and metrics are served locally, and every other request is
+forwarded to the owner at OWNER_URL.
+"""
+
+import json
+import os
+from typing import Optional
+
+import httpx
+from fastapi import APIRouter, HTTPException, Request, WebSocket
+from fastapi.responses import Response
+
+from routes.combined import sites_json, snapshot_json
+from routes.metrics import router as metrics_router
+from routes.pathway_routes import router as pathway_router
+from routes.websocket import serve_websocket
+from services.shared_state import SiteView, shared_state_reader
+
+OWNER_URL = os.getenv("OWNER_URL", "http://127.0.0.1:8001")
+PROXY_TIMEOUT = 30.0  # seconds; covers on-demand LLM calls on the owner
+
+# Not forwarded: connection-specific, or recomputed for the re-sent body. Host is kept
+# so redirects from the owner point back at the worker
+HOP_HEADERS = {"connection", "keep-alive", "transfer-encoding", "content-length", "content-encoding", "upgrade"}
+
+router = APIRouter()
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _json(content: str) -> Response:
+    return Response(content=content, media_type="application/json")
+
+
+def _require_snapshot():
+    if not shared_state_reader.ready:
+        raise HTTPException(status_code=503, detail="Owner process has not published a snapshot yet")
+
+
+def get_view(site: Optional[str] = None) -> SiteView:
+    """Resolve ?site= against the shared snapshot"""
+    _require_snapshot()
+    view = shared_state_reader.get(site)
+    if view is None:
+        raise HTTPException(status_code=404, detail=f"Unknown site: {site}")
+    return view
+
+
+async def forward(request: Request) -> Response:
+    """Send a request to the owner process and relay its response"""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(base_url=OWNER_URL, timeout=PROXY_TIMEOUT)
+    try:
+        upstream = await _client.request(
+            request.method,
+            request.url.path,
+            params=request.query_params,
+            content=await request.body(),
+            headers=[(key, value) for key, value in request.headers.items() if key.lower() not in HOP_HEADERS]
+        )
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=502, detail=f"Owner process unreachable: {e}")
+    headers = {key: value for key, value in upstream.headers.items() if key.lower() not in HOP_HEADERS}
+    return Response(content=upstream.content, status_code=upstream.status_code, headers=headers)
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+@router.get("/api/live")
+@router.get("/api/devices/telemetry")
+def get_live_data(site: Optional[str] = None):
+    """
+    Telemetry of all devices of a site, from the owner's snapshot.
+
+    Query Parameters:
+    - site: Site id (default: default site)
+    """
+    return _json(get_view(site).get_telemetry_json())
+
+
+@router.get("/api/stream/internal")
+def get_internal_stream(site: Optional[str] = None):
+    """
+    Internal stream from the owner's snapshot (see /api/stream/internal on the owner).
+
+    Query Parameters:
+    - site: Site id (default: default site), or * for every site
+    """
+    if site == "*":
+        _require_snapshot()
+        views = [SiteView(shared_state_reader, site_id) for site_id in shared_state_reader.site_ids()]
+        return _json(sites_json({
+            view.site_id: snapshot_json(view.get_telemetry_json(), view.timestamp, view.get_trace())
+            for view in views
+        }))
+    view = get_view(site)
+    return _json(snapshot_json(view.get_telemetry_json(), view.timestamp, view.get_trace()))
+
+
+@router.get("/api/stream/combined")
+def get_combined_stream(site: Optional[str] = None):
+    """
+    Internal and external streams from the owner's snapshot.
+
+    Query Parameters:
+    - site: Site id (default: default site)
+    """
+    view = get_view(site)
+    external = json.dumps(shared_state_reader.get_context())
+    return _json(f'{{"internal_stream": {view.get_telemetry_json()}, "external_stream": {external}, "timestamp": {json.dumps(view.timestamp)}}}')
+
+
+@router.get("/api/stream/external")
+def get_external_stream():
+    """
+    Grid context from the owner's snapshot.
+    """
+    _require_snapshot()
+    return shared_state_reader.get_context()
+
+
+@router.get("/api/grid")
+async def get_grid_context(request: Request, horizon: float = 0):
+    """
+    Current grid context from the owner's snapshot; forecasts are forwarded to the owner.
+
+    Query Parameters:
+    - horizon: Hours of 5-minute forecast slots to include (default: 0, max: 48)
+    """
+    if horizon:
+        return await forward(request)
+    _require_snapshot()
+    return shared_state_reader.get_context()
+
+
+@router.websocket("/ws")
+async def websocket_endpoint(ws: WebSocket, site: Optional[str] = None):
+    """Same messages as the owner's /ws, read from the shared snapshot"""
+    view = shared_state_reader.get(site)
+    if view is None:
+        await ws.close(code=1008, reason=f"Unknown site: {site}")
+        return
+    await serve_websocket(ws, view, shared_state_reader, shared_state_reader)
+
+
+router.include_router(metrics_router, prefix="/metrics", tags=["Metrics"])
+router.include_router(pathway_router, prefix="/api/pathway", tags=["Pathway Analytics"])
+
+
+@router.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"], include_in_schema=False)
+async def forward_to_owner(request: Request):
+    """Everything that reads or changes simulation state lives on the owner"""
+    return await forward(request)
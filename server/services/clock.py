@@ -0,0 +1,100 @@
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import time
+from datetime import datetime
+from typing import Optional
+
+
+def _parse_start(value: str) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+class SimulationClock:
+    """
+    Shared time and randomness source for the simulators
+
+    - seed: seeds `rng` so simulated telemetry and grid signals are reproducible
+    - speed: simulated seconds per wall second
+    - fast_forward: ignore wall time; each sleep jumps the clock straight to
+      the earliest pending wake-up, so ticks run as fast as the CPU allows
+    """
+
+    def __init__(
+        self,
+        seed: Optional[int] = None,
+        speed: float = 1.0,
+        fast_forward: bool = False,
+        start: Optional[float] = None,
+    ):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.speed = speed
+        self.fast_forward = fast_forward
+        self._origin = start if start is not None else time.time()
+        self._mono = time.monotonic()
+        self._virtual = 0.0
+        self._sleepers = []
+        self._seq = itertools.count()
+        self._driver: Optional[asyncio.Task] = None
+
+    @property
+    def realtime(self) -> bool:
+        return self.speed == 1.0 and not self.fast_forward
+
+    def time(self) -> float:
+        """Current simulated Unix timestamp"""
+        if self.fast_forward:
+            return self._origin + self._virtual
+        return self._origin + (time.monotonic() - self._mono) * self.speed
+
+    def now(self) -> datetime:
+        return datetime.fromtimestamp(self.time())
+
+    def derive_rng(self, key) -> random.Random:
+        """Independent RNG for a sub-stream (e.g. one day of grid signals)"""
+        return random.Random(f"{self.seed}:{key}" if self.seed is not None else key)
+
+    async def sleep(self, seconds: float):
+        """Sleep for simulated seconds"""
+        if not self.fast_forward:
+            await asyncio.sleep(seconds / self.speed)
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._sleepers, (self._virtual + seconds, next(self._seq), future))
+        if self._driver is None or self._driver.done():
+            self._driver = asyncio.create_task(self._drive())
+        await future
+
+    async def _drive(self):
+        while self._sleepers:
+            # Let woken tasks run up to their next sleep before advancing
+            await asyncio.sleep(0)
+            deadline, _, future = heapq.heappop(self._sleepers)
+            if future.done():
+                continue
+            self._virtual = max(self._virtual, deadline)
+            future.set_result(None)
+
+    def describe(self) -> dict:
+        return {
+            "seed": self.seed,
+            "speed": self.speed,
+            "fast_forward": self.fast_forward,
+            "time": self.time(),
+        }
+
+
+clock = SimulationClock(
+    seed=int(os.environ["SIM_SEED"]) if os.getenv("SIM_SEED") else None,
+    speed=float(os.getenv("SIM_SPEED", "1")),
+    fast_forward=os.getenv("SIM_FAST_FORWARD", "0") == "1",
+    start=_parse_start(os.getenv("SIM_START", "")),
+)
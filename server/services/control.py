@@ -0,0 +1,169 @@
+"""
+Bulk device control
+
+An operation applies one action to every device matching a selector:
+
+    {"selector": {"site": "plant_*", "type": "motor", "device": "motor_00*", "status": "running", "limit": 100},
+     "action": "off"}
+
+Selector fields are optional and combined with AND. site and device are
+glob patterns; site defaults to the site of the request. fraction keeps a
+random share (0-1) of the matches and limit the first N of each site in
+device order.
+
+A batch is validated as a whole before anything changes, then each site
+applies its share back to back at the start of its next tick
+(DeviceManager.submit). No snapshot shows the batch half applied, and a
+1,000-device load shed is one request.
+"""
+
+import asyncio
+import random
+from fnmatch import fnmatchcase
+from functools import partial
+from typing import Any, Dict, Iterable, List, Optional
+
+from services.clock import clock
+from services.devices import DEVICE_CLASSES, Device, DeviceManager
+from services.llm_insight import llm_insight_service
+from services.sites import site_manager
+
+# action -> (device type it is limited to, apply(device, value))
+ACTIONS = {
+    "on": (None, lambda device, value: device.turn_on()),
+    "off": (None, lambda device, value: device.turn_off()),
+    "start": ("motor", lambda device, value: device.start()),
+    "inject-fault": ("motor", lambda device, value: device.inject_fault()),
+    "brightness": ("lighting", lambda device, value: device.set_brightness(value)),
+}
+
+
+class Selector:
+    FIELDS = ("site", "type", "device", "status", "fraction", "limit")
+
+    def __init__(self, site: Optional[str] = None, type: Optional[str] = None, device: Optional[str] = None,
+                 status: Optional[str] = None, fraction: Optional[float] = None, limit: Optional[int] = None):
+        for name, value in (("site", site), ("type", type), ("device", device), ("status", status)):
+            if value is not None and not isinstance(value, str):
+                raise ValueError(f"{name} must be a string")
+        if fraction is not None and (isinstance(fraction, bool) or not isinstance(fraction, (int, float))):
+            raise ValueError("fraction must be a number")
+        if limit is not None and (isinstance(limit, bool) or not isinstance(limit, int)):
+            raise ValueError("limit must be an integer")
+        if type is not None and type not in DEVICE_CLASSES:
+            raise ValueError(f"Unknown device type: {type}")
+        if fraction is not None and not 0 <= fraction <= 1:
+            raise ValueError("fraction must be between 0 and 1")
+        if limit is not None and limit < 0:
+            raise ValueError("limit must not be negative")
+        self.site = site
+        self.type = type
+        self.device = device
+        self.status = status
+        self.fraction = fraction
+        self.limit = limit
+
+    @classmethod
+    def from_spec(cls, spec: Dict[str, Any]) -> "Selector":
+        if not isinstance(spec, dict):
+            raise ValueError("selector must be an object")
+        unknown = [key for key in spec if key not in cls.FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown selector fields: {', '.join(unknown)}")
+        return cls(**spec)
+
+    def site_ids(self, default_site: str) -> List[str]:
+        pattern = self.site or default_site
+        return [site_id for site_id in list(site_manager.sites) if fnmatchcase(site_id, pattern)]
+
+    def select(self, manager: DeviceManager, rng: Optional[random.Random] = None) -> List[Device]:
+        """Matching devices of a site; rng draws the fraction sample (default: the clock's RNG)"""
+        manager.materialize()
+        matches = [
+            device for device in list(manager.devices.values())
+            if (self.type is None or device.device_type == self.type)
+            and (self.device is None or fnmatchcase(device.device_id, self.device))
+            and (self.status is None or device.status == self.status)
+        ]
+        if self.fraction is not None:
+            sample = set((rng or clock.rng).sample(range(len(matches)), round(len(matches) * self.fraction)))
+            matches = [device for index, device in enumerate(matches) if index in sample]
+        return matches if self.limit is None else matches[:self.limit]
+
+
+class ControlOperation:
+    def __init__(self, selector: Selector, action: str, value: Any = None):
+        if action not in ACTIONS:
+            raise ValueError(f"Unknown action: {action} (expected one of {', '.join(ACTIONS)})")
+        if action == "brightness" and not (isinstance(value, int) and 0 <= value <= 100):
+            raise ValueError("brightness needs an integer value between 0 and 100")
+        self.selector = selector
+        self.action = action
+        self.value = value
+
+    @classmethod
+    def from_spec(cls, spec: Dict[str, Any]) -> "ControlOperation":
+        return cls(Selector.from_spec(spec.get("selector") or {}), spec.get("action"), spec.get("value"))
+
+    def apply(self, manager: DeviceManager) -> Dict[str, int]:
+        """Apply to the matching devices of one site"""
+        return self.apply_to(self.selector.select(manager))
+
+    def apply_to(self, matched: List[Device]) -> Dict[str, int]:
+        """Apply to the given devices; devices the action does not fit are skipped"""
+        device_type, apply = ACTIONS[self.action]
+        applied = 0
+        for device in matched:
+            if device_type is not None and device.device_type != device_type:
+                continue
+            result = apply(device, self.value)
+            if not (isinstance(result, dict) and result.get("status") == "error"):
+                applied += 1
+        return {"matched": len(matched), "applied": applied, "skipped": len(matched) - applied}
+
+
+def parse_operations(specs: Iterable[Dict[str, Any]]) -> List[ControlOperation]:
+    """Operations from request or scenario dicts; raises ValueError if any is invalid"""
+    return [ControlOperation.from_spec(spec) for spec in specs]
+
+
+def _apply_site(manager: DeviceManager, operations: List[ControlOperation]) -> dict:
+    return {"after_tick_id": manager.tick_id, "results": [operation.apply(manager) for operation in operations]}
+
+
+async def apply_operations(operations: List[ControlOperation], default_site: str) -> dict:
+    """
+    Apply a batch at the next tick of every site it touches
+
+    Raises ValueError when an operation's site pattern matches no site.
+    """
+    by_site: Dict[str, List[int]] = {}
+    for index, operation in enumerate(operations):
+        site_ids = operation.selector.site_ids(default_site)
+        if not site_ids:
+            raise ValueError(f"No site matches {operation.selector.site or default_site}")
+        for site_id in site_ids:
+            by_site.setdefault(site_id, []).append(index)
+
+    site_ids = list(by_site)
+    results = await asyncio.gather(*(
+        site_manager.sites[site_id].submit(partial(
+            _apply_site, site_manager.sites[site_id], [operations[index] for index in by_site[site_id]]
+        ))
+        for site_id in site_ids
+    ))
+
+    totals = [{"action": operation.action, "matched": 0, "applied": 0, "skipped": 0} for operation in operations]
+    for site_id, result in zip(site_ids, results):
+        for index, counts in zip(by_site[site_id], result["results"]):
+            for key, count in counts.items():
+                totals[index][key] += count
+
+    if any(total["action"] == "inject-fault" and total["applied"] for total in totals):
+        llm_insight_service.trigger_urgent()
+
+    return {
+        "applied": sum(total["applied"] for total in totals),
+        "operations": totals,
+        "sites": {site_id: result["after_tick_id"] for site_id, result in zip(site_ids, results)}
+    }
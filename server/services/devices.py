@@ -1,30 +1,100 @@
 import asyncio
+import itertools
 import math
-import random
+import os
+import threading
 import time
-from typing import Literal
+import json
+from typing import Any, Callable, Iterable, Iterator, List, Literal, NamedTuple, Optional, Tuple
+from services.clock import clock
+from services.energy import EnergyAccumulator
+from services.grid_context import grid_context_service
+from services.history import HISTORY_DIR, HistoryStore
+from services.metrics import PIPELINE_STAGE_SECONDS, registry
+from services.recorder import recording_service
+
+TICK_INTERVAL = 0.1  # 10Hz update rate
+DEFAULT_SITE = os.getenv("DEFAULT_SITE", "default")
+FLEET_BATCH_SIZE = int(os.getenv("FLEET_BATCH_SIZE", "2000"))  # pending devices built per tick
+
+TICK_SECONDS = registry.histogram("gridsense_sim_tick_seconds", "Time spent updating all devices of a site in one simulator tick", ["site"])
+TICK_LAG_SECONDS = registry.histogram(
+    "gridsense_sim_tick_lag_seconds", "Wall-clock delay of a simulator tick beyond its scheduled wake-up", ["site"]
+)
 
 DeviceType = Literal["motor", "hvac", "compressor", "lighting"]
 DeviceStatus = Literal["off", "starting", "running", "fault"]
 
 
+class TelemetryRecord(NamedTuple):
+    """Immutable telemetry sample of one device"""
+    device_id: str
+    device_type: str
+    site_id: str
+    status: str
+    voltage: float
+    current: float
+    power: float
+    timestamp: float
+
+
+_encode_str = json.encoder.encode_basestring_ascii
+
+
+def _encode_float(value) -> str:
+    """JSON number, or null for NaN and infinities (which have no JSON form)"""
+    value = float(value)
+    return repr(value) if math.isfinite(value) else "null"
+
+
+def telemetry_json(records: Iterable[TelemetryRecord]) -> str:
+    """
+    JSON object {device_id: telemetry} written straight from records
+    
+    Same output as json.dumps of the get_telemetry() dicts with non-finite
+    values replaced by None, without building them: at 10k devices that is
+    one string per poll instead of 10k dicts. tests/telemetry_json_check.py
+    compares the two.
+    """
+    return "{" + ", ".join(
+        f'{_encode_str(r.device_id)}: {{"device_id": {_encode_str(r.device_id)}, '
+        f'"device_type": {_encode_str(r.device_type)}, "site_id": {_encode_str(r.site_id)}, '
+        f'"status": {_encode_str(r.status)}, "voltage": {_encode_float(r.voltage)}, '
+        f'"current": {_encode_float(r.current)}, "power": {_encode_float(r.power)}, '
+        f'"timestamp": {_encode_float(r.timestamp)}}}'
+        for r in records
+    ) + "}"
+
+
 class Device:
     """Base class for all device simulators"""
     
+    # Slotted: no per-instance __dict__, which matters at thousands of devices
+    __slots__ = ("device_id", "device_type", "site_id", "status", "voltage", "current", "power", "timestamp")
+    
     def __init__(self, device_id: str, device_type: DeviceType):
         self.device_id = device_id
         self.device_type = device_type
+        self.site_id = DEFAULT_SITE
         self.status = "off"
         self.voltage = 230.0
         self.current = 0.0
         self.power = 0.0
-        self.timestamp = time.time()
+        self.timestamp = clock.time()
+    
+    def record(self) -> TelemetryRecord:
+        """Current telemetry as an immutable record"""
+        return TelemetryRecord(
+            self.device_id, self.device_type, self.site_id, self.status,
+            self.voltage, self.current, self.power, self.timestamp
+        )
     
     def get_telemetry(self) -> dict:
         """Get current telemetry for this device"""
         return {
             "device_id": self.device_id,
             "device_type": self.device_type,
+            "site_id": self.site_id,
             "status": self.status,
             "voltage": self.voltage,
             "current": self.current,
@@ -50,6 +120,11 @@ class MotorDevice(Device):
     - fault: Locked rotor condition (110A sustained)
     """
     
+    __slots__ = (
+        "startup_elapsed", "inrush_peak", "steady_nominal", "locked_rotor_current",
+        "startup_duration", "peak_hold_duration", "time_constant"
+    )
+    
     def __init__(self, device_id: str):
         super().__init__(device_id, "motor")
         self.startup_elapsed = 0.0
@@ -61,7 +136,7 @@ class MotorDevice(Device):
         self.time_constant = 0.8
     
     def update(self):
-        self.timestamp = time.time()
+        self.timestamp = clock.time()
         self.voltage = 230.0 if self.status != "off" else 0.0
         
         if self.status == "off":
@@ -75,7 +150,7 @@ class MotorDevice(Device):
             
             if t < self.peak_hold_duration:
                 # Phase 1: Hold at peak inrush current (0-0.5s)
-                self.current = round(self.inrush_peak + random.uniform(-0.5, 0.5), 2)
+                self.current = round(self.inrush_peak + clock.rng.uniform(-0.5, 0.5), 2)
             else:
                 # Phase 2: Exponential decay (0.5s onwards)
                 # Adjust time for decay calculation
@@ -88,7 +163,7 @@ class MotorDevice(Device):
                 if self.current <= 45:
                     self.current = self.steady_nominal
             
-            self.voltage = 230.0 + random.gauss(0, 2)
+            self.voltage = 230.0 + clock.rng.gauss(0, 2)
             self.power = round(self.voltage * self.current, 2)
             
             # Auto-transition to running after total startup duration
@@ -99,16 +174,16 @@ class MotorDevice(Device):
                 
         elif self.status == "running":
             # Normal operation with Gaussian noise
-            self.current = random.gauss(self.steady_nominal, 1.0)
+            self.current = clock.rng.gauss(self.steady_nominal, 1.0)
             self.current = max(40.0, min(45.0, self.current))
             self.current = round(self.current, 2)
-            self.voltage = 230.0 + random.gauss(0, 2)
+            self.voltage = 230.0 + clock.rng.gauss(0, 2)
             self.power = round(self.voltage * self.current, 2)
             
         elif self.status == "fault":
             # Locked rotor: sustained high current
-            self.current = round(self.locked_rotor_current + random.uniform(-0.5, 0.5), 2)
-            self.voltage = 230.0 + random.gauss(0, 2)
+            self.current = round(self.locked_rotor_current + clock.rng.uniform(-0.5, 0.5), 2)
+            self.voltage = 230.0 + clock.rng.gauss(0, 2)
             self.power = round(self.voltage * self.current, 2)
     
     def start(self):
@@ -146,6 +221,8 @@ class MotorDevice(Device):
 class HVACDevice(Device):
     """HVAC system simulator"""
     
+    __slots__ = ("target_temp", "current_temp", "compressor_speed")
+    
     def __init__(self, device_id: str):
         super().__init__(device_id, "hvac")
         self.target_temp = 22.0
@@ -153,7 +230,7 @@ class HVACDevice(Device):
         self.compressor_speed = 0  # 0-100%
     
     def update(self):
-        self.timestamp = time.time()
+        self.timestamp = clock.time()
         
         if self.status == "off":
             self.current = 0.0
@@ -165,8 +242,8 @@ class HVACDevice(Device):
             self.compressor_speed = min(100, temp_diff * 20)
             
             self.current = 5.0 + (self.compressor_speed / 100) * 15.0  # 5-20A
-            self.current += random.gauss(0, 0.3)  # Noise
-            self.voltage = 230.0 + random.gauss(0, 2)
+            self.current += clock.rng.gauss(0, 0.3)  # Noise
+            self.voltage = 230.0 + clock.rng.gauss(0, 2)
             self.power = self.voltage * self.current
             
             # Temperature gradually approaches target
@@ -186,13 +263,15 @@ class HVACDevice(Device):
 class CompressorDevice(Device):
     """Industrial air compressor simulator"""
     
+    __slots__ = ("pressure", "target_pressure")
+    
     def __init__(self, device_id: str):
         super().__init__(device_id, "compressor")
         self.pressure = 0.0  # PSI
         self.target_pressure = 120.0
     
     def update(self):
-        self.timestamp = time.time()
+        self.timestamp = clock.time()
         
         if self.status == "off":
             self.current = 0.0
@@ -201,13 +280,13 @@ class CompressorDevice(Device):
         elif self.status == "running":
             # Compressor draws high current when building pressure
             if self.pressure < self.target_pressure:
-                self.current = random.uniform(25, 30)  # Building pressure
+                self.current = clock.rng.uniform(25, 30)  # Building pressure
                 self.pressure += 2
             else:
-                self.current = random.uniform(5, 8)  # Maintaining pressure
-                self.pressure += random.uniform(-0.5, 0.5)
+                self.current = clock.rng.uniform(5, 8)  # Maintaining pressure
+                self.pressure += clock.rng.uniform(-0.5, 0.5)
             
-            self.voltage = 230.0 + random.gauss(0, 2)
+            self.voltage = 230.0 + clock.rng.gauss(0, 2)
             self.power = self.voltage * self.current
     
     def turn_on(self):
@@ -220,12 +299,14 @@ class CompressorDevice(Device):
 class LightingDevice(Device):
     """Lighting system simulator"""
     
+    __slots__ = ("brightness",)
+    
     def __init__(self, device_id: str):
         super().__init__(device_id, "lighting")
         self.brightness = 100  # 0-100%
     
     def update(self):
-        self.timestamp = time.time()
+        self.timestamp = clock.time()
         
         if self.status == "off":
             self.current = 0.0
@@ -233,8 +314,8 @@ class LightingDevice(Device):
         elif self.status == "running":
             # Lighting current proportional to brightness
             self.current = (self.brightness / 100) * 2.5  # Max 2.5A at 100%
-            self.current += random.gauss(0, 0.05)  # Small noise
-            self.voltage = 230.0 + random.gauss(0, 1)
+            self.current += clock.rng.gauss(0, 0.05)  # Small noise
+            self.voltage = 230.0 + clock.rng.gauss(0, 1)
             self.power = self.voltage * self.current
     
     def turn_on(self):
@@ -248,56 +329,189 @@ class LightingDevice(Device):
         self.brightness = max(0, min(100, level))
 
 
+DEVICE_CLASSES = {
+    "motor": MotorDevice,
+    "hvac": HVACDevice,
+    "compressor": CompressorDevice,
+    "lighting": LightingDevice,
+}
+
+
 class DeviceManager:
     """
-    Manages multiple device simulators
+    Manages the device simulators of one site
     Provides centralized access to all device telemetry
+    
+    Each site runs its own simulation task and keeps its own history and
+    energy totals; the default site's history stays in HISTORY_DIR, other
+    sites use HISTORY_DIR/<site_id>. history=False skips the per-device
+    history rings (large capacity-test fleets).
     """
     
-    def __init__(self):
+    def __init__(self, site_id: str = DEFAULT_SITE, default_devices: bool = True, history: bool = True):
+        self.site_id = site_id
         self.devices = {}
         self._task = None
+        history_dir = HISTORY_DIR if site_id == DEFAULT_SITE else os.path.join(HISTORY_DIR, site_id)
+        self.history = HistoryStore(history_dir) if history else None
+        self.energy = EnergyAccumulator()
+        self.replaying = False
+        self.last_tick = None  # time.monotonic() of the last completed tick
+        self.tick_id = 0
+        self.tick_origin = None  # wall time the latest snapshot was completed
+        self.pending_count = 0  # devices of a fleet definition not built yet
+        self._pending: Optional[Iterator[Device]] = None
+        self._pending_lock = threading.Lock()
+        self._controls: List[Tuple[Callable[[], Any], asyncio.Future]] = []
         
-        # Initialize default devices
-        self.add_device(MotorDevice("motor_001"))
-        self.add_device(HVACDevice("hvac_001"))
-        self.add_device(CompressorDevice("compressor_001"))
-        self.add_device(LightingDevice("lighting_001"))
+        if default_devices:
+            self.add_device(MotorDevice("motor_001"))
+            self.add_device(HVACDevice("hvac_001"))
+            self.add_device(CompressorDevice("compressor_001"))
+            self.add_device(LightingDevice("lighting_001"))
     
     def add_device(self, device: Device):
         """Add a device to the manager"""
+        device.site_id = self.site_id
         self.devices[device.device_id] = device
     
+    def add_pending(self, devices: Iterator[Device], count: int):
+        """Queue devices to be built lazily, FLEET_BATCH_SIZE per tick"""
+        with self._pending_lock:
+            self._pending = devices if self._pending is None else itertools.chain(self._pending, devices)
+            self.pending_count += count
+    
+    def materialize(self, limit: Optional[int] = None):
+        """Build up to limit (default: all) pending devices"""
+        with self._pending_lock:
+            if self._pending is None:
+                return
+            built = 0
+            for device in itertools.islice(self._pending, limit):
+                self.add_device(device)
+                built += 1
+            self.pending_count -= built
+            if limit is None or built < limit:
+                self._pending = None
+                self.pending_count = 0
+    
+    def submit(self, apply: Callable[[], Any]) -> asyncio.Future:
+        """
+        Run apply() at the start of the next tick, before devices update
+        
+        Everything submitted between two ticks runs back to back in that tick,
+        so a batch of control changes is seen by all consumers at once.
+        Runs immediately when the simulation is not running, including when
+        its task has died and nothing would apply the queue.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._controls.append((apply, future))
+        if self._task is None or self._task.done():
+            self._apply_controls()
+        return future
+    
+    def _apply_controls(self):
+        controls, self._controls = self._controls, []
+        for apply, future in controls:
+            try:
+                result = apply()
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+    
     def get_device(self, device_id: str) -> Device:
-        """Get a specific device"""
-        return self.devices.get(device_id)
+        """
+        Get a specific device (building pending devices if it is not found)
+
+        May run on a threadpool thread; readers of self.devices on the loop
+        iterate over a copy.
+        """
+        device = self.devices.get(device_id)
+        if device is None and self._pending is not None:
+            self.materialize()
+            device = self.devices.get(device_id)
+        return device
     
     def get_all_telemetry(self) -> dict:
         """Get telemetry from all devices"""
         return {
             device_id: device.get_telemetry()
-            for device_id, device in self.devices.items()
+            for device_id, device in list(self.devices.items())
         }
     
+    def get_all_records(self) -> Iterator[TelemetryRecord]:
+        """Telemetry records of all devices (see telemetry_json)"""
+        return (device.record() for device in list(self.devices.values()))
+    
+    def get_telemetry_json(self) -> str:
+        """get_all_telemetry() as a JSON string, without the per-device dicts"""
+        return telemetry_json(self.get_all_records())
+    
+    def get_trace(self) -> dict:
+        """Tick id and wall-clock origin of the current snapshot"""
+        return {"tick_id": self.tick_id, "origin_ts": self.tick_origin}
+    
     def get_device_telemetry(self, device_id: str) -> dict:
         """Get telemetry from a specific device"""
-        device = self.devices.get(device_id)
+        device = self.get_device(device_id)
         if device:
             return device.get_telemetry()
         return {"error": "Device not found"}
     
+    def apply_snapshot(self, rows):
+        """Overwrite device state with a recorded snapshot (replay mode)"""
+        now = clock.time()
+        for device_id, device_type, status, voltage, current, power in rows:
+            device = self.devices.get(device_id)
+            if device is None:
+                device = DEVICE_CLASSES[device_type](device_id)
+                self.add_device(device)
+            device.status = status
+            device.voltage = voltage
+            device.current = current
+            device.power = power
+            device.timestamp = now
+    
     async def run_simulation(self):
         """Background task that updates all devices"""
         while True:
-            for device in self.devices.values():
-                device.update()
-            await asyncio.sleep(0.1)  # 10Hz update rate
+            started = time.perf_counter()
+            if self._pending is not None:
+                self.materialize(FLEET_BATCH_SIZE)
+            if self._controls:
+                self._apply_controls()
+            # get_device may build pending devices from a threadpool route
+            # while the tick runs, so iterate over a copy
+            devices = list(self.devices.values())
+            for device in devices:
+                if not self.replaying:
+                    device.update()
+                if self.history is not None:
+                    self.history.append(device)
+                price, carbon = grid_context_service.rates_at(device.timestamp)
+                self.energy.add(device.device_id, device.timestamp, device.power, price, carbon)
+            if self.site_id == DEFAULT_SITE:
+                recording_service.on_snapshot(clock.time(), devices)
+            self.tick_id += 1
+            self.tick_origin = time.time()
+            sleep_start = time.perf_counter()
+            TICK_SECONDS.observe(sleep_start - started, site=self.site_id)
+            PIPELINE_STAGE_SECONDS.observe(sleep_start - started, stage="simulate")
+            self.last_tick = time.monotonic()
+            await clock.sleep(TICK_INTERVAL)
+            if not clock.fast_forward:
+                TICK_LAG_SECONDS.observe(
+                    max(0.0, time.perf_counter() - sleep_start - TICK_INTERVAL / clock.speed), site=self.site_id
+                )
     
     def start_background_task(self):
         """Start the device simulation loop"""
         if self._task is None:
             self._task = asyncio.create_task(self.run_simulation())
-            print(f"Device manager initialized with {len(self.devices)} devices")
+            print(f"Device manager for site {self.site_id} initialized with {len(self.devices) + self.pending_count} devices")
     
     async def stop_background_task(self):
         """Stop the device simulation loop"""
@@ -307,7 +521,11 @@ class DeviceManager:
                 await self._task
             except asyncio.CancelledError:
                 pass
-            print("Device manager stopped")
+            self._task = None
+            self._apply_controls()
+            if self.history is not None:
+                self.history.close()
+            print(f"Device manager for site {self.site_id} stopped")
 
 
 device_manager = DeviceManager()
@@ -0,0 +1,133 @@
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from services.history import MAX_INTEGRATION_GAP, trapezoid_wh
+
+SHIFT_HOURS = int(os.getenv("SHIFT_HOURS", "8"))
+ENERGY_RETAIN_DAYS = int(os.getenv("ENERGY_RETAIN_DAYS", "31"))
+
+
+class EnergyTotals:
+    __slots__ = ("kwh", "cost", "carbon_g")
+
+    def __init__(self):
+        self.kwh = 0.0
+        self.cost = 0.0
+        self.carbon_g = 0.0
+
+    def add(self, kwh: float, cost: float, carbon_g: float):
+        self.kwh += kwh
+        self.cost += cost
+        self.carbon_g += carbon_g
+
+    def to_dict(self) -> dict:
+        return {
+            "kwh": round(self.kwh, 6),
+            "cost": round(self.cost, 6),
+            "carbon_g": round(self.carbon_g, 3),
+        }
+
+
+class _DeviceEnergy:
+    __slots__ = ("last", "total", "days", "shifts")
+
+    def __init__(self):
+        self.last: Optional[Tuple[float, float, float, float]] = None
+        self.total = EnergyTotals()
+        self.days: Dict[str, EnergyTotals] = {}
+        self.shifts: Dict[str, EnergyTotals] = {}
+
+
+class EnergyAccumulator:
+    """
+    Streaming kWh, cost and gCO2 totals per device, per shift and per day
+
+    Power is integrated with the trapezoidal rule between consecutive samples.
+    Each interval is priced at the tariff and carbon intensity in effect at
+    its start. Updates are O(1) per sample.
+    """
+
+    def __init__(self):
+        self._devices: Dict[str, _DeviceEnergy] = {}
+        self._period: Tuple[float, float, str, str] = (0.0, 0.0, "", "")
+
+    def _period_keys(self, ts: float) -> Tuple[str, str]:
+        start, end, day, shift = self._period
+        if not start <= ts < end:
+            moment = datetime.fromtimestamp(ts)
+            index = moment.hour // SHIFT_HOURS
+            shift_start = moment.replace(hour=index * SHIFT_HOURS, minute=0, second=0, microsecond=0)
+            day = moment.date().isoformat()
+            shift = f"{day}/{index + 1}"
+            self._period = (
+                shift_start.timestamp(),
+                (shift_start + timedelta(hours=SHIFT_HOURS)).timestamp(),
+                day,
+                shift,
+            )
+        return self._period[2], self._period[3]
+
+    def add(self, device_id: str, ts: float, power: float, price: float, carbon_intensity: float):
+        state = self._devices.get(device_id)
+        if state is None:
+            state = self._devices[device_id] = _DeviceEnergy()
+
+        last = state.last
+        if last is not None and ts <= last[0]:
+            return
+        state.last = (ts, power, price, carbon_intensity)
+        if last is None or ts - last[0] > MAX_INTEGRATION_GAP:
+            return
+
+        kwh = trapezoid_wh(last[1], power, ts - last[0]) / 1000
+        cost = kwh * last[2]
+        carbon_g = kwh * last[3]
+
+        day, shift = self._period_keys(ts)
+        state.total.add(kwh, cost, carbon_g)
+        if day not in state.days:
+            state.days[day] = EnergyTotals()
+            self._prune(state)
+        state.days[day].add(kwh, cost, carbon_g)
+        if shift not in state.shifts:
+            state.shifts[shift] = EnergyTotals()
+        state.shifts[shift].add(kwh, cost, carbon_g)
+
+    def _prune(self, state: _DeviceEnergy):
+        while len(state.days) > ENERGY_RETAIN_DAYS:
+            oldest = next(iter(state.days))
+            del state.days[oldest]
+            for shift in [s for s in state.shifts if s.startswith(oldest)]:
+                del state.shifts[shift]
+
+    def device_ids(self):
+        return list(self._devices)
+
+    def snapshot(self, device_id: str) -> Optional[dict]:
+        """Lifetime, current day and current shift totals for one device"""
+        state = self._devices.get(device_id)
+        if state is None:
+            return None
+        result = {"total": state.total.to_dict()}
+        if state.days:
+            day = next(reversed(state.days))
+            shift = next(reversed(state.shifts))
+            result.update({
+                "day": day,
+                "today": state.days[day].to_dict(),
+                "shift": shift,
+                "current_shift": state.shifts[shift].to_dict(),
+            })
+        return result
+
+    def report(self, device_id: str) -> Optional[dict]:
+        """Lifetime totals plus every retained day and shift for one device"""
+        state = self._devices.get(device_id)
+        if state is None:
+            return None
+        return {
+            "total": state.total.to_dict(),
+            "days": {day: totals.to_dict() for day, totals in state.days.items()},
+            "shifts": {shift: totals.to_dict() for shift, totals in state.shifts.items()},
+        }
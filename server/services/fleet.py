@@ -0,0 +1,199 @@
+"""
+Declarative fleet definitions
+
+A fleet file (YAML or JSON) lists sites and their devices, either one by one
+or as groups with a count, a naming template and parameter distributions:
+
+    seed: 7
+    sites:
+      - site_id: "plant_{site:02d}"       # expanded `count` times, site = 1..count
+        count: 30
+        history: false                     # skip per-device history rings
+        devices:
+          - type: motor
+            count: 200
+            name: "motor_{index:04d}"      # fields: type, index (1..count), site_id
+            params:
+              inrush_peak: {normal: [120, 6]}
+              steady_nominal: {uniform: [40, 45]}
+          - type: hvac
+            count: 50
+            params:
+              target_temp: {choice: [20, 21, 22, 23]}
+          - {device_id: lighting_main, device_type: lighting}
+
+Parameters are device attributes; a value is a constant or one of
+{normal: [mean, std]}, {uniform: [low, high]}, {choice: [...]}. Sampling is
+seeded per site and group, so a fleet file always yields the same devices.
+
+Only the group specs are kept at load time. Devices are built lazily by
+their DeviceManager in batches between ticks (FLEET_BATCH_SIZE).
+"""
+
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+import yaml
+
+from services.devices import DEVICE_CLASSES, Device
+
+DEFAULT_NAME = "{type}_{index:03d}"
+
+DISTRIBUTIONS = {
+    "normal": lambda rng, args: rng.gauss(*args),
+    "uniform": lambda rng, args: rng.uniform(*args),
+    "choice": lambda rng, args: rng.choice(args),
+}
+
+
+def _sampler(name: str, value: Any):
+    """Function of rng returning the parameter value"""
+    if not isinstance(value, dict):
+        return lambda rng: value
+    if len(value) != 1 or next(iter(value)) not in DISTRIBUTIONS:
+        raise ValueError(f"Parameter {name}: expected a constant or one of {', '.join(DISTRIBUTIONS)}")
+    kind, args = next(iter(value.items()))
+    if not isinstance(args, list) or not args or (kind != "choice" and len(args) != 2):
+        raise ValueError(f"Parameter {name}: bad arguments for {kind}: {args}")
+    draw = DISTRIBUTIONS[kind]
+    return lambda rng: draw(rng, args)
+
+
+class DeviceGroup:
+    """`count` devices of one type sharing a naming template and parameter distributions"""
+
+    def __init__(self, device_type: str, count: int = 1, name: str = DEFAULT_NAME, params: Dict[str, Any] = None):
+        if device_type not in DEVICE_CLASSES:
+            raise ValueError(f"Unknown device type: {device_type}")
+        if count < 0:
+            raise ValueError(f"Negative device count for {device_type}")
+        self.device_class = DEVICE_CLASSES[device_type]
+        self.device_type = device_type
+        self.count = count
+        self.name = name
+        params = params or {}
+        prototype = self.device_class("prototype")
+        unknown = [key for key in params if not hasattr(prototype, key) or key in ("device_id", "device_type", "site_id")]
+        if unknown:
+            raise ValueError(f"Unknown {device_type} parameters: {', '.join(unknown)}")
+        self.samplers = [(key, _sampler(key, value)) for key, value in params.items()]
+
+        # Devices are built lazily, so template and parameter errors must surface here
+        try:
+            first, last = (self.device_id(index, "site") for index in (1, max(count, 1)))
+        except (AttributeError, IndexError, KeyError, ValueError) as e:
+            raise ValueError(f"Bad {device_type} name template {name!r}: {e!r}")
+        if count > 1 and first == last:
+            raise ValueError(f"Name template {name!r} gives all {count} {device_type} devices the same id")
+        rng = random.Random(0)
+        for key, sample in self.samplers:
+            try:
+                sample(rng)
+            except (IndexError, TypeError, ValueError) as e:
+                raise ValueError(f"Parameter {key}: {e}")
+
+    def device_id(self, index: int, site_id: str) -> str:
+        return self.name.format(type=self.device_type, index=index, site_id=site_id)
+
+    @classmethod
+    def from_spec(cls, spec: Dict[str, Any]) -> "DeviceGroup":
+        if "device_id" in spec:
+            # Single device with a fixed id
+            return cls(spec.get("device_type") or spec.get("type"), 1, spec["device_id"], spec.get("params"))
+        return cls(
+            spec.get("type") or spec.get("device_type"),
+            int(spec.get("count", 1)),
+            spec.get("name", DEFAULT_NAME),
+            spec.get("params")
+        )
+
+    def build(self, site_id: str, seed: str) -> Iterator[Device]:
+        """Devices of this group, created one at a time"""
+        rng = random.Random(seed)
+        for index in range(1, self.count + 1):
+            device = self.device_class(self.device_id(index, site_id))
+            for key, sample in self.samplers:
+                setattr(device, key, sample(rng))
+            yield device
+
+
+class SitePlan:
+    """
+    Device groups of one site; expands to devices without holding them
+
+    Raises ValueError when two devices of the site would get the same id.
+    """
+
+    def __init__(self, site_id: str, groups: List[DeviceGroup], seed: Any = None, history: bool = True):
+        self.site_id = site_id
+        self.groups = groups
+        self.seed = seed
+        self.history = history
+
+        seen = set()
+        for group in groups:
+            for index in range(1, group.count + 1):
+                device_id = group.device_id(index, site_id)
+                if device_id in seen:
+                    raise ValueError(f"Duplicate device id {device_id!r} in site {site_id}")
+                seen.add(device_id)
+
+    @property
+    def device_count(self) -> int:
+        return sum(group.count for group in self.groups)
+
+    def devices(self) -> Iterator[Device]:
+        for number, group in enumerate(self.groups):
+            yield from group.build(self.site_id, f"{self.seed}:{self.site_id}:{number}")
+
+
+def parse_fleet(spec: Dict[str, Any]) -> List[SitePlan]:
+    """Site plans from a parsed fleet definition; raises ValueError if invalid"""
+    seed = spec.get("seed")
+    plans = []
+    for site in spec.get("sites", []):
+        groups = [DeviceGroup.from_spec(device) for device in site.get("devices", [])]
+        history = bool(site.get("history", True))
+        count = site.get("count")
+        if count is None:
+            plans.append(SitePlan(site["site_id"], groups, seed, history))
+            continue
+        for number in range(1, int(count) + 1):
+            plans.append(SitePlan(site["site_id"].format(site=number), groups, seed, history))
+    return plans
+
+
+def read_spec(path: str) -> Dict[str, Any]:
+    """Parsed YAML (.yaml/.yml) or JSON file"""
+    with open(path) as f:
+        spec = yaml.safe_load(f) if Path(path).suffix in (".yaml", ".yml") else json.load(f)
+    return spec or {}
+
+
+def load_fleet(path: str) -> List[SitePlan]:
+    """Parse a YAML or JSON fleet file"""
+    return parse_fleet(read_spec(path))
+
+
+def main():
+    """
+    Validate a fleet file and time building every device
+
+    Usage:
+        python -m services.fleet fleets/capacity_10k.yaml
+    """
+    started = time.perf_counter()
+    plans = load_fleet(sys.argv[1])
+    parsed = time.perf_counter()
+    built = [sum(1 for _ in plan.devices()) for plan in plans]
+    finished = time.perf_counter()
+    print(f"{len(plans)} sites, {sum(built)} devices")
+    print(f"parse: {(parsed - started) * 1000:.1f}ms, build: {(finished - parsed) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,123 @@
 import asyncio
 import random
-import time
-from datetime import datetime
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
 from typing import Literal
+from services.clock import clock
+from services.grid_sources import create_grid_source
+from services.recorder import recording_service
 
 PricingTier = Literal["LOW", "MEDIUM", "HIGH"]
 CarbonIntensity = Literal["LOW", "MEDIUM", "HIGH"]
 
+SCHEDULE_RESOLUTION = 300  # seconds (5 minutes)
+SCHEDULE_CACHE_DAYS = 8
+TIMESTAMP_RANGE = (0.0, 4102444800.0)  # 1970-01-01 to 2100-01-01, for arbitrary lookups
+
+
+def _profile(hour: int, rng: random.Random) -> dict:
+    """
+    Generate context for an hour of the day
+    
+    Simulates real-world patterns:
+    - High carbon during evening (7-10 PM) when coal/gas peak
+    - Low carbon during day (10 AM - 3 PM) when solar is strong
+    - High prices during peak hours (5-9 PM)
+    - Low prices during off-peak (11 PM - 6 AM)
+    """
+    # Carbon Intensity Pattern (gCO2/kWh)
+    if 10 <= hour <= 15:
+        # Daytime: Solar energy abundant
+        carbon = rng.uniform(200, 350)
+        carbon_level = "LOW"
+        renewable_pct = rng.uniform(50, 70)
+    elif 19 <= hour <= 22:
+        # Evening peak: Coal/gas plants running
+        carbon = rng.uniform(600, 800)
+        carbon_level = "HIGH"
+        renewable_pct = rng.uniform(10, 25)
+    else:
+        # Other times: Mixed generation
+        carbon = rng.uniform(400, 550)
+        carbon_level = "MEDIUM"
+        renewable_pct = rng.uniform(30, 45)
+    
+    # Electricity Pricing Pattern ($/kWh)
+    if 17 <= hour <= 21:
+        # Peak hours: High demand, high price
+        price = rng.uniform(0.25, 0.35)
+        pricing_tier = "HIGH"
+    elif 23 <= hour or hour <= 6:
+        # Off-peak: Low demand, low price
+        price = rng.uniform(0.08, 0.12)
+        pricing_tier = "LOW"
+    else:
+        # Mid-peak
+        price = rng.uniform(0.15, 0.22)
+        pricing_tier = "MEDIUM"
+    
+    return {
+        "carbon_intensity": round(carbon, 2),
+        "carbon_level": carbon_level,
+        "electricity_price": round(price, 4),
+        "pricing_tier": pricing_tier,
+        "grid_renewable_percentage": round(renewable_pct, 2)
+    }
+
+
+class GridSchedule:
+    """
+    Precomputed day-ahead grid context at 5-minute resolution
+    
+    Each local day is generated once from a day-seeded RNG, so any past or
+    future timestamp resolves to the same slot. Lookups are a range check
+    plus a list index.
+    """
+    
+    def __init__(self, resolution: int = SCHEDULE_RESOLUTION, cache_days: int = SCHEDULE_CACHE_DAYS):
+        self.resolution = resolution
+        self.cache_days = cache_days
+        self._days: "OrderedDict[date, tuple]" = OrderedDict()
+        self._current = (0.0, 0.0, [])
+    
+    def _build_day(self, day: date) -> tuple:
+        start = datetime.combine(day, datetime.min.time()).timestamp()
+        end = datetime.combine(day + timedelta(days=1), datetime.min.time()).timestamp()
+        rng = clock.derive_rng(day.toordinal())
+        slots = []
+        ts = start
+        while ts < end:
+            slots.append({**_profile(datetime.fromtimestamp(ts).hour, rng), "timestamp": ts})
+            ts += self.resolution
+        return start, end, slots
+    
+    def _table(self, ts: float) -> tuple:
+        day = date.fromtimestamp(ts)
+        table = self._days.get(day)
+        if table is None:
+            table = self._days[day] = self._build_day(day)
+            if len(self._days) > self.cache_days:
+                self._days.popitem(last=False)
+        return table
+    
+    def at(self, ts: float) -> dict:
+        """Scheduled slot containing ts"""
+        start, end, slots = self._current
+        if not start <= ts < end:
+            start, end, slots = self._current = self._table(ts)
+        return slots[int((ts - start) // self.resolution)]
+    
+    def window(self, start: float, end: float) -> list:
+        """Scheduled slots overlapping [start, end]"""
+        slots = []
+        ts = start - start % self.resolution
+        while ts <= end:
+            slot = self.at(ts)
+            if not slots or slot is not slots[-1]:
+                slots.append(slot)
+            ts += self.resolution
+        return slots
+
 
 class GridContextService:
     """
@@ -27,83 +138,74 @@ class GridContextService:
             "electricity_price": 0.0,  # $/kWh
             "pricing_tier": "MEDIUM",  # LOW, MEDIUM, HIGH
             "grid_renewable_percentage": 0.0,  # 0-100%
-            "last_updated": time.time(),
+            "last_updated": clock.time(),
             "next_update_in": 0
         }
+        self.overrides = {}  # fields pinned by a scenario timeline
+        self.schedule = GridSchedule()
+        self.source = create_grid_source(self.schedule)
         self._task = None
         self.update_interval = 900  # 15 minutes in seconds (configurable)
     
-    def _get_time_based_context(self) -> dict:
-        """
-        Generate context based on time of day
-        
-        Simulates real-world patterns:
-        - High carbon during evening (7-10 PM) when coal/gas peak
-        - Low carbon during day (10 AM - 3 PM) when solar is strong
-        - High prices during peak hours (5-9 PM)
-        - Low prices during off-peak (11 PM - 6 AM)
-        """
-        current_hour = datetime.now().hour
-        
-        # Carbon Intensity Pattern (gCO2/kWh)
-        if 10 <= current_hour <= 15:
-            # Daytime: Solar energy abundant
-            carbon = random.uniform(200, 350)
-            carbon_level = "LOW"
-            renewable_pct = random.uniform(50, 70)
-        elif 19 <= current_hour <= 22:
-            # Evening peak: Coal/gas plants running
-            carbon = random.uniform(600, 800)
-            carbon_level = "HIGH"
-            renewable_pct = random.uniform(10, 25)
-        else:
-            # Other times: Mixed generation
-            carbon = random.uniform(400, 550)
-            carbon_level = "MEDIUM"
-            renewable_pct = random.uniform(30, 45)
-        
-        # Electricity Pricing Pattern ($/kWh)
-        if 17 <= current_hour <= 21:
-            # Peak hours: High demand, high price
-            price = random.uniform(0.25, 0.35)
-            pricing_tier = "HIGH"
-        elif 23 <= current_hour or current_hour <= 6:
-            # Off-peak: Low demand, low price
-            price = random.uniform(0.08, 0.12)
-            pricing_tier = "LOW"
-        else:
-            # Mid-peak
-            price = random.uniform(0.15, 0.22)
-            pricing_tier = "MEDIUM"
-        
-        return {
-            "carbon_intensity": round(carbon, 2),
-            "carbon_level": carbon_level,
-            "electricity_price": round(price, 4),
-            "pricing_tier": pricing_tier,
-            "grid_renewable_percentage": round(renewable_pct, 2)
-        }
+    def context_at(self, ts: float) -> dict:
+        """Source's grid context in effect at an arbitrary timestamp; ValueError outside TIMESTAMP_RANGE"""
+        if not TIMESTAMP_RANGE[0] <= ts <= TIMESTAMP_RANGE[1]:
+            raise ValueError(f"timestamp must be between {TIMESTAMP_RANGE[0]:.0f} and {TIMESTAMP_RANGE[1]:.0f}")
+        return dict(self.source.window(ts, ts)[0])
+    
+    def forecast(self, horizon: float) -> list:
+        """Source's slots or rows from now until horizon seconds ahead"""
+        return self.source.window(clock.time(), clock.time() + horizon)
     
     def get_context(self) -> dict:
         """Get current grid context"""
         return self.context.copy()
     
+    def rates_at(self, ts: float) -> tuple:
+        """(electricity_price, carbon_intensity) in effect at ts, for pricing energy samples"""
+        context = self.context if recording_service.replaying else self.source.at(ts)
+        return (
+            self.overrides.get("electricity_price", context["electricity_price"]),
+            self.overrides.get("carbon_intensity", context["carbon_intensity"])
+        )
+    
+    def set_override(self, values: dict):
+        """Pin context fields over the source until clear_override()"""
+        self.overrides.update(values)
+        self.context.update(values)
+        self.context["last_updated"] = clock.time()
+        recording_service.on_grid(self.context["last_updated"], values)
+    
+    def clear_override(self):
+        """Return to the source's values"""
+        if not self.overrides:
+            return
+        self.overrides = {}
+        restored = self.source.current()
+        self.context.update(restored)
+        self.context["last_updated"] = clock.time()
+        recording_service.on_grid(self.context["last_updated"], restored)
+    
     async def run_simulation(self):
         """
         Background task that updates grid context periodically
-        Updates every 15 minutes (900 seconds) by default
+        Updates when the source changes (each 5-minute schedule slot or
+        replayed row), at least every update_interval seconds
         """
         while True:
-            # Generate new context based on time of day
-            new_context = self._get_time_based_context()
+            new_context = self.source.current()
             
-            # Update state
-            self.context.update(new_context)
-            self.context["last_updated"] = time.time()
-            self.context["next_update_in"] = self.update_interval
+            # Update state (a running replay owns the context)
+            if not recording_service.replaying:
+                self.context.update(new_context)
+                self.context.update(self.overrides)
+                self.context["last_updated"] = clock.time()
+                recording_service.on_grid(self.context["last_updated"], new_context)
+            wait = min(self.update_interval, self.source.next_update_in())
+            self.context["next_update_in"] = wait
             
-            # Wait for next update
-            await asyncio.sleep(self.update_interval)
+            # Wait for next update (replayed series may change sooner)
+            await clock.sleep(wait)
     
     def start_background_task(self):
         """Start the background update task"""
@@ -0,0 +1,245 @@
+"""
+Grid signal sources for GridContextService
+
+- ScheduleSource: synthetic time-of-day schedule (default)
+- FileReplaySource: historical tariff/carbon series from CSV or Parquet,
+  streamed forward in chunks and replayed with time acceleration
+"""
+
+import csv
+import math
+import os
+from array import array
+from bisect import bisect_right
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from services.clock import clock
+
+GRID_SOURCE_FILE = os.getenv("GRID_SOURCE_FILE", "")
+GRID_REPLAY_SPEED = float(os.getenv("GRID_REPLAY_SPEED", "1"))
+GRID_REPLAY_LOOP = os.getenv("GRID_REPLAY_LOOP", "1") == "1"
+PARQUET_BATCH_ROWS = 4096
+REPLAY_HISTORY_ROWS = 256  # recent rows kept for lookups of past timestamps
+
+PRICE_TIERS = ((0.13, "LOW"), (0.24, "MEDIUM"), (math.inf, "HIGH"))  # $/kWh upper bounds
+CARBON_LEVELS = ((375.0, "LOW"), (575.0, "MEDIUM"), (math.inf, "HIGH"))  # gCO2/kWh upper bounds
+
+
+def _classify(value: float, bands) -> str:
+    for upper, label in bands:
+        if value < upper:
+            return label
+    return bands[-1][1]
+
+
+def _parse_timestamp(value) -> float:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return datetime.fromisoformat(str(value)).timestamp()
+
+
+def _to_context(row: Dict) -> dict:
+    price = float(row["electricity_price"])
+    carbon = float(row["carbon_intensity"])
+    renewable = row.get("grid_renewable_percentage", row.get("renewable_pct"))
+    return {
+        "carbon_intensity": round(carbon, 2),
+        "carbon_level": row.get("carbon_level") or _classify(carbon, CARBON_LEVELS),
+        "electricity_price": round(price, 4),
+        "pricing_tier": row.get("pricing_tier") or _classify(price, PRICE_TIERS),
+        "grid_renewable_percentage": round(float(renewable), 2) if renewable not in (None, "") else 0.0,
+    }
+
+
+class ScheduleSource:
+    """Current slot of the precomputed GridSchedule"""
+
+    def __init__(self, schedule):
+        self.schedule = schedule
+
+    def current(self) -> dict:
+        slot = self.schedule.at(clock.time())
+        return {key: value for key, value in slot.items() if key != "timestamp"}
+
+    def at(self, ts: float) -> dict:
+        """Slot in effect at simulated time ts (shared, do not modify)"""
+        return self.schedule.at(ts)
+
+    def window(self, start: float, end: float) -> list:
+        return self.schedule.window(start, end)
+
+    def next_update_in(self) -> float:
+        """Seconds until the next slot starts"""
+        now = clock.time()
+        return self.schedule.at(now)["timestamp"] + self.schedule.resolution - now
+
+
+class FileReplaySource:
+    """
+    Replay a historical series of (timestamp, electricity_price,
+    carbon_intensity[, grid_renewable_percentage, pricing_tier, carbon_level])
+
+    The replay reads rows forward only. Lookups away from the replay
+    position (at/window) load the series once and map a timestamp into it
+    arithmetically, shifting by whole loop periods. Series time advances
+    `speed` times faster than wall time, starting at the first row when the
+    source is created.
+    """
+
+    def __init__(self, path: str, speed: float = GRID_REPLAY_SPEED, loop: bool = GRID_REPLAY_LOOP):
+        self.path = Path(path)
+        self.speed = speed
+        self.loop = loop
+        self._table: Optional[Tuple[array, List[dict], float]] = None
+        self._start()
+
+    def _rows(self) -> Iterator[Dict]:
+        if self.path.suffix == ".parquet":
+            import pyarrow.parquet as pq
+            for batch in pq.ParquetFile(self.path, memory_map=True).iter_batches(batch_size=PARQUET_BATCH_ROWS):
+                yield from batch.to_pylist()
+        else:
+            with open(self.path, newline="") as f:
+                yield from csv.DictReader(f)
+
+    def _start(self):
+        self._reader = self._series()
+        self._row = next(self._reader, None)
+        if self._row is None:
+            raise ValueError(f"Grid signal file is empty: {self.path}")
+        self._next = next(self._reader, None)
+        self._history = deque([self._row], maxlen=REPLAY_HISTORY_ROWS)
+        self._origin = (self._row[0], clock.time())
+
+    def _series(self) -> Iterator[tuple]:
+        """(series timestamp, context) of every row, repeated with shifted timestamps if looping"""
+        offset = 0.0
+        first: Optional[float] = None
+        prev: Optional[float] = None
+        step = 0.0
+        while True:
+            for row in self._rows():
+                ts = _parse_timestamp(row["timestamp"])
+                if first is None:
+                    first = ts
+                if prev is not None:
+                    step = ts - prev
+                prev = ts
+                yield ts + offset, _to_context(row)
+            if not self.loop or prev is None:
+                return
+            # Continue with the first row one step after the last one
+            period = prev - first + step
+            if period <= 0:
+                return
+            offset += period
+            prev = None
+
+    @staticmethod
+    def _window(rows, start: float, end: float) -> list:
+        """Rows in effect during [start, end] in series time; at least the first row"""
+        selected = []
+        for row in rows:
+            if row[0] <= start:
+                selected = [row]
+            elif row[0] <= end or not selected:
+                selected.append(row)
+                if row[0] > end:
+                    break
+            else:
+                break
+        return selected
+
+    def _load(self) -> Tuple[array, List[dict], float]:
+        """(timestamps, contexts, loop period or 0) of the whole file, read once"""
+        if self._table is None:
+            timestamps, contexts = array("d"), []
+            for row in self._rows():
+                timestamps.append(_parse_timestamp(row["timestamp"]))
+                contexts.append(_to_context(row))
+            period = 0.0
+            if self.loop and len(timestamps) > 1:
+                # The first row follows the last one a step later, as in _series
+                period = max(0.0, timestamps[-1] - timestamps[0] + timestamps[-1] - timestamps[-2])
+            self._table = (timestamps, contexts, period)
+        return self._table
+
+    def _rows_from(self, series_ts: float) -> Iterator[tuple]:
+        """(series timestamp, context) from the row in effect at series_ts onwards"""
+        timestamps, contexts, period = self._load()
+        shift = (series_ts - timestamps[0]) // period * period if period else 0.0
+        index = max(0, bisect_right(timestamps, series_ts - shift) - 1)
+        while True:
+            yield timestamps[index] + shift, contexts[index]
+            index += 1
+            if index == len(timestamps):
+                if not period:
+                    return
+                index, shift = 0, shift + period
+
+    def series_time(self, ts: Optional[float] = None) -> float:
+        """Series time at simulated time ts (default: now)"""
+        series_start, wall_start = self._origin
+        return series_start + ((clock.time() if ts is None else ts) - wall_start) * self.speed
+
+    def sim_time(self, series_ts: float) -> float:
+        """Simulated time at which the replay reaches series_ts"""
+        series_start, wall_start = self._origin
+        return wall_start + (series_ts - series_start) / self.speed
+
+    def _advance(self):
+        now = self.series_time()
+        while self._next is not None and self._next[0] <= now:
+            self._row, self._next = self._next, next(self._reader, None)
+            self._history.append(self._row)
+
+    def current(self) -> dict:
+        self._advance()
+        return {**self._row[1], "source_timestamp": self._row[0]}
+
+    def at(self, ts: float) -> dict:
+        """
+        Row in effect at simulated time ts (shared, do not modify)
+
+        The last REPLAY_HISTORY_ROWS rows are checked first; other timestamps
+        are looked up in the loaded series.
+        """
+        self._advance()
+        series_ts = self.series_time(ts)
+        if self._next is None or series_ts < self._next[0]:
+            for row_ts, context in reversed(self._history):
+                if row_ts <= series_ts:
+                    return context
+        return next(self._rows_from(series_ts))[1]
+
+    def window(self, start: float, end: float) -> list:
+        """Rows in effect during simulated [start, end], timestamped in simulated time"""
+        self._advance()
+        series_start, series_end = self.series_time(start), self.series_time(end)
+        known = [*self._history, *([self._next] if self._next is not None else [])]
+        if known[0][0] <= series_start and (self._next is None or self._next[0] > series_end):
+            rows = self._window(known, series_start, series_end)
+        else:
+            rows = self._window(self._rows_from(series_start), series_start, series_end)
+        return [
+            {**context, "timestamp": self.sim_time(row_ts), "source_timestamp": row_ts}
+            for row_ts, context in rows
+        ]
+
+    def next_update_in(self) -> float:
+        if self._next is None:
+            return math.inf
+        return max(0.0, (self._next[0] - self.series_time()) / self.speed)
+
+
+def create_grid_source(schedule):
+    """FileReplaySource when GRID_SOURCE_FILE is set, otherwise the schedule"""
+    if GRID_SOURCE_FILE:
+        return FileReplaySource(GRID_SOURCE_FILE)
+    return ScheduleSource(schedule)
@@ -1,8 +1,159 @@
+"""
+Component health checks
+
+Each check returns {"status": "ok" | "degraded" | "fail", ...} with the
+measured value and its budget. Liveness covers the simulator loops only
+(failing it should restart the instance); readiness also requires fresh grid
+context, event-loop lag within budget over the loop monitor's recent window
+and, when HEALTH_REQUIRE_PATHWAY=1, fresh Pathway output. A single slow
+event-loop sample never fails liveness: a loop that stays blocked already
+shows up as a stale simulator tick.
+"""
+
+import asyncio
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+from services.clock import clock
+from services.devices import DEFAULT_SITE
+from services.grid_context import grid_context_service
+from services.llm_insight import llm_insight_service
+from services.loop_monitor import loop_monitor
+from services.pathway.config import PathwayConfig
+from services.sites import site_manager
+
+HEALTH_MAX_TICK_AGE = float(os.getenv("HEALTH_MAX_TICK_AGE", "2.0"))  # wall seconds
+HEALTH_MAX_GRID_AGE = float(os.getenv("HEALTH_MAX_GRID_AGE", "0")) or 2 * grid_context_service.update_interval  # simulated seconds
+HEALTH_MAX_PATHWAY_LAG = float(os.getenv("HEALTH_MAX_PATHWAY_LAG", "30"))  # seconds since last output write
+HEALTH_MAX_LOOP_LAG = float(os.getenv("HEALTH_MAX_LOOP_LAG", "0.25"))  # seconds, p95 of recent samples
+HEALTH_REQUIRE_PATHWAY = os.getenv("HEALTH_REQUIRE_PATHWAY", "0") == "1"
+
+# Written on every Pathway batch, unlike anomalies
+PATHWAY_HEARTBEAT_FILES = (PathwayConfig.DEVICE_STATS_FILE, PathwayConfig.RECOMMENDATIONS_FILE)
+
+_SEVERITY = {"ok": 0, "degraded": 1, "fail": 2}
+
+
+def _task_error(task: Optional[asyncio.Task]) -> Optional[str]:
+    if task is None:
+        return "not started"
+    if task.done():
+        if task.cancelled():
+            return "cancelled"
+        return f"exited: {task.exception()!r}"
+    return None
+
+
+def _budget(value: Optional[float], budget: float, over: str = "fail") -> str:
+    return "ok" if value is not None and value <= budget else over
+
+
 class HealthService:
-    def check_system_status(self):
+    def _check_site(self, manager) -> dict:
+        error = _task_error(manager._task)
+        last_tick = manager.last_tick
+        age = time.monotonic() - last_tick if last_tick is not None else None
+        result = {
+            "status": "fail" if error else _budget(age, HEALTH_MAX_TICK_AGE),
+            "tick_age_s": round(age, 3) if age is not None else None,
+            "budget_s": HEALTH_MAX_TICK_AGE,
+            "devices": len(manager.devices),
+        }
+        if error:
+            result["error"] = error
+        return result
+
+    def check_simulator(self) -> dict:
+        """Default site's simulator; other sites are listed and count toward the status"""
+        sites = {site_id: self._check_site(manager) for site_id, manager in list(site_manager.sites.items())}
+        result = dict(sites[DEFAULT_SITE])
+        if len(sites) > 1:
+            result["status"] = max((site["status"] for site in sites.values()), key=_SEVERITY.get)
+            result["sites"] = sites
+        return result
+
+    def check_grid(self) -> dict:
+        error = _task_error(grid_context_service._task)
+        age = clock.time() - grid_context_service.context["last_updated"]
+        result = {
+            "status": "fail" if error else _budget(age, HEALTH_MAX_GRID_AGE),
+            "age_s": round(age, 1),
+            "budget_s": HEALTH_MAX_GRID_AGE,
+        }
+        if error:
+            result["error"] = error
+        return result
+
+    def check_pathway(self) -> dict:
+        mtimes = []
+        for filename in PATHWAY_HEARTBEAT_FILES:
+            try:
+                mtimes.append(Path(filename).stat().st_mtime)
+            except FileNotFoundError:
+                continue
+        over = "fail" if HEALTH_REQUIRE_PATHWAY else "degraded"
+        if not mtimes:
+            return {"status": over, "lag_s": None, "budget_s": HEALTH_MAX_PATHWAY_LAG, "error": "no output files"}
+        lag = time.time() - max(mtimes)
         return {
-            "status": "ok",
-            "message": "System is running smoothly"
+            "status": _budget(lag, HEALTH_MAX_PATHWAY_LAG, over),
+            "lag_s": round(lag, 3),
+            "budget_s": HEALTH_MAX_PATHWAY_LAG,
+            "required": HEALTH_REQUIRE_PATHWAY,
         }
 
-health_service = HealthService()
\ No newline at end of file
+    def check_llm(self) -> dict:
+        backoff = max(0.0, llm_insight_service._backoff_until - time.time())
+        error = _task_error(llm_insight_service._run_task)
+        result = {
+            "status": "degraded" if error or backoff > 0 else "ok",
+            "backoff_remaining_s": round(backoff, 1),
+            "last_insight_at": (llm_insight_service.latest_insight or {}).get("timestamp"),
+        }
+        if error:
+            result["error"] = error
+        return result
+
+    async def check_event_loop(self) -> dict:
+        """Sustained lag (p95 of the loop monitor window); one probe sample when the monitor is off"""
+        if loop_monitor.enabled:
+            lag, sustained = loop_monitor.lag, loop_monitor.lag_p95
+        else:
+            start = time.perf_counter()
+            await asyncio.sleep(0)
+            lag = sustained = time.perf_counter() - start
+        return {
+            "status": _budget(sustained, HEALTH_MAX_LOOP_LAG),
+            "lag_s": round(lag, 4),
+            "lag_p95_s": round(sustained, 4),
+            "budget_s": HEALTH_MAX_LOOP_LAG,
+        }
+
+    def _report(self, components: dict) -> dict:
+        status = max((c["status"] for c in components.values()), key=_SEVERITY.__getitem__, default="ok")
+        return {"status": status, "timestamp": time.time(), "components": components}
+
+    async def liveness(self) -> dict:
+        return self._report({"simulator": self.check_simulator()})
+
+    async def readiness(self) -> dict:
+        return self._report({
+            "simulator": self.check_simulator(),
+            "grid": self.check_grid(),
+            "pathway": self.check_pathway(),
+            "event_loop": await self.check_event_loop(),
+        })
+
+    async def check_system_status(self) -> dict:
+        return self._report({
+            "simulator": self.check_simulator(),
+            "grid": self.check_grid(),
+            "pathway": self.check_pathway(),
+            "llm": self.check_llm(),
+            "event_loop": await self.check_event_loop(),
+        })
+
+
+health_service = HealthService()
@@ -0,0 +1,454 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+HISTORY_DIR = os.getenv("HISTORY_DIR", "history")
+HISTORY_RETENTION = float(os.getenv("HISTORY_RETENTION", "86400"))  # seconds
+HISTORY_SAMPLE_RATE = 10  # Hz, matches the simulation tick
+DEVICES_PER_FILE = 64  # device slots per ring file, so a site needs one mapping per 64 devices
+
+STATUS_CODES = {"off": 0, "starting": 1, "running": 2, "fault": 3}
+STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+
+TELEMETRY_COLUMNS: Sequence[Tuple[str, str]] = (
+    ("timestamp", "d"),
+    ("voltage", "f"),
+    ("current", "f"),
+    ("power", "f"),
+    ("status", "b"),
+)
+
+_MAGIC = b"GSRING01"
+_HEADER = struct.Struct("<8sQQQ")  # magic, capacity, count, column count
+
+
+def _map(fileno: int, size: int) -> mmap.mmap:
+    """Map a file without keeping a duplicate descriptor open where supported"""
+    if sys.version_info >= (3, 13):
+        return mmap.mmap(fileno, size, trackfd=False)
+    return mmap.mmap(fileno, size)
+
+
+class ColumnRing:
+    """
+    Append-only columnar ring buffer over a region of a memory-mapped file
+
+    Each column is a contiguous typed area of the region, so range reads are
+    zero-copy slices. The first column must be a non-decreasing timestamp.
+    """
+
+    def __init__(self, buf: memoryview, columns: Sequence[Tuple[str, str]], capacity: int):
+        self.columns = [name for name, _ in columns]
+        self.capacity = capacity
+        self._buf = buf
+
+        magic, cap, count, ncols = _HEADER.unpack_from(buf, 0)
+        if not (magic == _MAGIC and cap == capacity and ncols == len(columns)):
+            # Unused slot or a different layout
+            count = 0
+            _HEADER.pack_into(buf, 0, _MAGIC, capacity, count, len(columns))
+        self.count = count
+
+        self._cols = []
+        offset = _HEADER.size
+        for _, typecode in columns:
+            size = capacity * array(typecode).itemsize
+            self._cols.append(buf[offset:offset + size].cast(typecode))
+            offset += size + (-size % 8)
+
+    @staticmethod
+    def region_size(columns: Sequence[Tuple[str, str]], capacity: int) -> int:
+        size = _HEADER.size
+        for _, typecode in columns:
+            column = capacity * array(typecode).itemsize
+            size += column + (-column % 8)
+        return size
+
+    @property
+    def first(self) -> int:
+        """Logical index of the oldest retained row"""
+        return max(0, self.count - self.capacity)
+
+    @property
+    def last_timestamp(self) -> float:
+        return self._cols[0][(self.count - 1) % self.capacity] if self.count else float("-inf")
+
+    def append(self, values: Sequence):
+        slot = self.count % self.capacity
+        for col, value in zip(self._cols, values):
+            col[slot] = value
+        self.count += 1
+        struct.pack_into("<Q", self._buf, 16, self.count)
+
+    def reset(self):
+        """Drop every row"""
+        self.count = 0
+        struct.pack_into("<Q", self._buf, 16, 0)
+
+    def bisect(self, ts: float, right: bool = False) -> int:
+        """Logical index of the first row with timestamp >= ts (> ts if right)"""
+        times = self._cols[0]
+        lo, hi = self.first, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            t = times[mid % self.capacity]
+            if t < ts or right and t == ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def read(self, column: int, lo: int, hi: int) -> List:
+        """Values of a column for logical rows [lo, hi)"""
+        if hi <= lo:
+            return []
+        col = self._cols[column]
+        a, b = lo % self.capacity, hi % self.capacity or self.capacity
+        if a < b:
+            return col[a:b].tolist()
+        return col[a:].tolist() + col[:b].tolist()
+
+    def row(self, index: int) -> Tuple:
+        slot = index % self.capacity
+        return tuple(col[slot] for col in self._cols)
+
+    def close(self):
+        for col in self._cols:
+            col.release()
+        self._buf.release()
+
+
+class RingFile:
+    """
+    One memory-mapped file holding the rings of `slots` devices back to back
+
+    layout lists (columns, capacity) of the rings every device slot holds.
+    Slots are sparse until written, so unused ones take no disk space.
+    """
+
+    def __init__(self, path: Path, layout: Sequence[Tuple[Sequence[Tuple[str, str]], int]], slots: int):
+        self.path = Path(path)
+        self.layout = layout
+        self.regions = [ColumnRing.region_size(columns, capacity) for columns, capacity in layout]
+        self.slot_size = sum(self.regions)
+        size = self.slot_size * slots
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        resize = not self.path.exists() or self.path.stat().st_size != size
+        with open(self.path, "w+b" if resize else "r+b") as f:
+            if resize:
+                f.truncate(size)
+            self._mmap = _map(f.fileno(), size)
+        self._view = memoryview(self._mmap)
+
+    def rings(self, slot: int) -> List[ColumnRing]:
+        offset = slot * self.slot_size
+        rings = []
+        for (columns, capacity), size in zip(self.layout, self.regions):
+            rings.append(ColumnRing(self._view[offset:offset + size], columns, capacity))
+            offset += size
+        return rings
+
+    def close(self):
+        self._view.release()
+        self._mmap.close()
+
+
+ROLLUP_COLUMNS: Sequence[Tuple[str, str]] = (
+    ("timestamp", "d"),
+    ("current_min", "f"),
+    ("current_max", "f"),
+    ("current_avg", "f"),
+    ("current_last", "f"),
+    ("power_min", "f"),
+    ("power_max", "f"),
+    ("power_avg", "f"),
+    ("power_last", "f"),
+    ("energy_wh", "d"),
+    ("samples", "I"),
+)
+
+# (resolution seconds, retention seconds)
+ROLLUP_TIERS: Sequence[Tuple[int, float]] = (
+    (1, 86400),
+    (60, 30 * 86400),
+    (900, 365 * 86400),
+)
+
+MAX_INTEGRATION_GAP = 5.0  # seconds; longer gaps are treated as missing data
+
+
+def trapezoid_wh(p0: float, p1: float, dt: float) -> float:
+    """Energy in Wh between two power samples dt seconds apart"""
+    return (p0 + p1) / 2 * dt / 3600
+
+
+class Rollup:
+    """Running min/max/avg/last and energy for one time bucket"""
+
+    __slots__ = ("bucket", "samples", "c_min", "c_max", "c_sum", "c_last",
+                 "p_min", "p_max", "p_sum", "p_last", "energy_wh")
+
+    def __init__(self, bucket: float):
+        self.bucket = bucket
+        self.samples = 0
+        self.c_min = self.p_min = float("inf")
+        self.c_max = self.p_max = float("-inf")
+        self.c_sum = self.p_sum = 0.0
+        self.c_last = self.p_last = 0.0
+        self.energy_wh = 0.0
+
+    def add(self, current: float, power: float, energy_wh: float):
+        self.samples += 1
+        self.c_min = min(self.c_min, current)
+        self.c_max = max(self.c_max, current)
+        self.c_sum += current
+        self.c_last = current
+        self.p_min = min(self.p_min, power)
+        self.p_max = max(self.p_max, power)
+        self.p_sum += power
+        self.p_last = power
+        self.energy_wh += energy_wh
+
+    def merge(self, row: Dict[str, float]):
+        n = row["samples"]
+        self.c_min = min(self.c_min, row["current_min"])
+        self.c_max = max(self.c_max, row["current_max"])
+        self.c_sum += row["current_avg"] * n
+        self.c_last = row["current_last"]
+        self.p_min = min(self.p_min, row["power_min"])
+        self.p_max = max(self.p_max, row["power_max"])
+        self.p_sum += row["power_avg"] * n
+        self.p_last = row["power_last"]
+        self.energy_wh += row["energy_wh"]
+        self.samples += n
+
+    def values(self) -> Tuple:
+        return (
+            self.bucket,
+            self.c_min, self.c_max, self.c_sum / self.samples, self.c_last,
+            self.p_min, self.p_max, self.p_sum / self.samples, self.p_last,
+            self.energy_wh, self.samples,
+        )
+
+
+def _holds(ring: ColumnRing, ts: float) -> bool:
+    """Whether the ring still has every row at or after ts (nothing dropped yet, or oldest row <= ts)"""
+    return ring.count <= ring.capacity or ring.row(ring.first)[0] <= ts
+
+
+class _DeviceSeries:
+    """Raw ring plus incrementally maintained rollup tiers for one device"""
+
+    def __init__(self, rings: List[ColumnRing]):
+        self.raw = rings[0]
+        self.tiers = [(resolution, ring) for (resolution, _), ring in zip(ROLLUP_TIERS, rings[1:])]
+        self.open: List[Optional[Rollup]] = [None] * len(self.tiers)
+        self.last: Optional[Tuple[float, float]] = None
+
+    def append(self, ts: float, voltage: float, current: float, power: float, status: int):
+        self.raw.append((ts, voltage, current, power, status))
+
+        energy = 0.0
+        if self.last is not None:
+            dt = ts - self.last[0]
+            if 0 < dt <= MAX_INTEGRATION_GAP:
+                energy = trapezoid_wh(self.last[1], power, dt)
+        self.last = (ts, power)
+
+        for i, (resolution, ring) in enumerate(self.tiers):
+            bucket = ts - ts % resolution
+            acc = self.open[i]
+            if acc is None or acc.bucket != bucket:
+                if acc is not None:
+                    ring.append(acc.values())
+                acc = self.open[i] = Rollup(bucket)
+            acc.add(current, power, energy)
+
+    def reset(self):
+        self.raw.reset()
+        for _, ring in self.tiers:
+            ring.reset()
+        self.open = [None] * len(self.tiers)
+        self.last = None
+
+    def close(self):
+        self.raw.close()
+        for _, ring in self.tiers:
+            ring.close()
+
+
+class HistoryStore:
+    """
+    Per-device telemetry history
+
+    Raw samples go to one ColumnRing per device; 1s, 1min and 15min rollups
+    are updated in place on every append and sealed when their bucket ends.
+    The rings of DEVICES_PER_FILE devices share one file; devices.jsonl
+    lists device ids in slot order.
+
+    When the timestamps of a device go back (a restart with an earlier
+    simulated clock) its rings are cleared, since lookups bisect on time. An
+    OSError (file or mapping limits, full disk), including one while
+    opening the directory, stops recording for the whole store; `error`
+    keeps the reason.
+    """
+
+    def __init__(self, directory: str = HISTORY_DIR, retention: float = HISTORY_RETENTION):
+        self.directory = Path(directory)
+        self.capacity = int(retention * HISTORY_SAMPLE_RATE)
+        self.layout = [(TELEMETRY_COLUMNS, self.capacity)] + [
+            (ROLLUP_COLUMNS, int(tier_retention // resolution)) for resolution, tier_retention in ROLLUP_TIERS
+        ]
+        self.error: Optional[str] = None
+        self._series: Dict[str, _DeviceSeries] = {}
+        self._files: Dict[int, RingFile] = {}
+        self._slots: Dict[str, int] = {}
+        self._reset_logged = False
+        self._lock = threading.Lock()  # queries open series from threadpool threads
+        index = self.directory / "devices.jsonl"
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            if index.exists():
+                with open(index) as f:
+                    for line in f:
+                        try:
+                            self._slots.setdefault(json.loads(line), len(self._slots))
+                        except json.JSONDecodeError:
+                            break  # partially written last line
+        except OSError as e:
+            self.error = str(e)
+            print(f"History in {self.directory} unavailable: {e}")
+
+    def _slot(self, device_id: str) -> int:
+        slot = self._slots.get(device_id)
+        if slot is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(self.directory / "devices.jsonl", "a") as f:
+                f.write(json.dumps(device_id) + "\n")
+            slot = self._slots[device_id] = len(self._slots)
+        return slot
+
+    def _get_series(self, device_id: str) -> _DeviceSeries:
+        series = self._series.get(device_id)
+        if series is not None:
+            return series
+        with self._lock:
+            series = self._series.get(device_id)
+            if series is None:
+                number, slot = divmod(self._slot(device_id), DEVICES_PER_FILE)
+                ring_file = self._files.get(number)
+                if ring_file is None:
+                    ring_file = self._files[number] = RingFile(
+                        self.directory / f"devices-{number:04d}.ring", self.layout, DEVICES_PER_FILE
+                    )
+                series = self._series[device_id] = _DeviceSeries(ring_file.rings(slot))
+            return series
+
+    def append(self, device):
+        if self.error is not None:
+            return
+        try:
+            series = self._get_series(device.device_id)
+            if device.timestamp < series.raw.last_timestamp:
+                series.reset()
+                if not self._reset_logged:
+                    print(f"History in {self.directory}: timestamps went back, clearing the affected devices")
+                    self._reset_logged = True
+            series.append(
+                device.timestamp,
+                device.voltage,
+                device.current,
+                device.power,
+                STATUS_CODES.get(device.status, -1),
+            )
+        except (OSError, ValueError) as e:
+            self.error = str(e)
+            print(f"History in {self.directory} stopped: {e}")
+            self.close()
+
+    def query(self, device_id: str, start: float, end: float, step: Optional[float] = None) -> Dict[str, list]:
+        """
+        Return columns for start <= timestamp <= end
+
+        Without step (or step below the finest rollup), raw samples are
+        returned, one per step-second bucket when step is set. Otherwise
+        rows come from the coarsest rollup tier whose resolution fits in
+        step, or the next coarser tier that still holds start, merged into
+        step-second buckets. truncated is set when rows before start were
+        already dropped from the ring that served the query.
+        """
+        series = self._get_series(device_id)
+        fitting = [index for index, (resolution, _) in enumerate(series.tiers) if step and resolution <= step]
+        if not fitting:
+            result = self._query_raw(series.raw, start, end, step)
+            result["truncated"] = not _holds(series.raw, start)
+            return result
+        index = fitting[-1]
+        while index < len(series.tiers) - 1 and not _holds(series.tiers[index][1], start):
+            index += 1
+        result = self._query_rollup(series, series.tiers[index], start, end, step)
+        result["truncated"] = not _holds(series.tiers[index][1], start)
+        return result
+
+    def _query_raw(self, ring: ColumnRing, start: float, end: float, step: Optional[float]) -> Dict[str, list]:
+        lo, hi = ring.bisect(start), ring.bisect(end, right=True)
+        result = {name: [] for name, _ in TELEMETRY_COLUMNS}
+
+        if step:
+            indices = []
+            bucket = start
+            i = lo
+            while i < hi:
+                indices.append(i)
+                bucket += step * (1 + int((ring.row(i)[0] - bucket) // step))
+                i = ring.bisect(bucket)
+            for i in indices:
+                for name, value in zip(result, ring.row(i)):
+                    result[name].append(value)
+        else:
+            for column, name in enumerate(result):
+                result[name] = ring.read(column, lo, hi)
+
+        result["status"] = [STATUS_NAMES.get(code, "unknown") for code in result["status"]]
+        result["resolution"] = 0
+        return result
+
+    def _query_rollup(self, series: _DeviceSeries, tier, start: float, end: float, step: float) -> Dict[str, list]:
+        resolution, ring = tier
+        names = [name for name, _ in ROLLUP_COLUMNS]
+        rows = [
+            dict(zip(names, ring.row(i)))
+            for i in range(ring.bisect(start - start % resolution), ring.bisect(end, right=True))
+        ]
+        acc = series.open[series.tiers.index(tier)]
+        if acc is not None and acc.samples and start - resolution < acc.bucket <= end:
+            rows.append(dict(zip(names, acc.values())))
+
+        merged: List[Rollup] = []
+        for row in rows:
+            bucket = row["timestamp"] - (row["timestamp"] - start) % step
+            if not merged or merged[-1].bucket != bucket:
+                merged.append(Rollup(bucket))
+            merged[-1].merge(row)
+
+        result = {name: [] for name in names}
+        for acc in merged:
+            for name, value in zip(names, acc.values()):
+                result[name].append(value)
+        result["resolution"] = resolution
+        return result
+
+    def close(self):
+        for series in self._series.values():
+            series.close()
+        self._series.clear()
+        for ring_file in self._files.values():
+            ring_file.close()
+        self._files.clear()
@@ -10,6 +10,8 @@ from google import genai
 from services.devices import device_manager
 from services.grid_context import grid_context_service
 from services.pathway.config import PathwayConfig
+from services.pathway.sink import tail_lines
+from services.metrics import registry
 
 
 class GridInsight(BaseModel):
@@ -36,6 +38,15 @@ Rules:
 CRITICAL_MONITOR_INTERVAL = 2.0
 CURRENT_BUCKET_SIZE = 10.0
 
+LLM_SECONDS = registry.histogram(
+    "gridsense_llm_request_seconds", "Gemini call latency by outcome", ["outcome"],
+    buckets=(0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0)
+)
+LLM_RATE_LIMITED = registry.counter("gridsense_llm_rate_limited", "Gemini calls rejected with 429 / RESOURCE_EXHAUSTED")
+LLM_FINGERPRINT = registry.counter(
+    "gridsense_llm_fingerprint_checks", "Insight attempts by state fingerprint result (hit = call skipped)", ["result"]
+)
+
 
 def _build_context() -> str:
     telemetry = device_manager.get_all_telemetry()
@@ -67,8 +78,7 @@ def _build_context() -> str:
 
     if anomalies_file.exists():
         try:
-            with open(anomalies_file) as f:
-                recent = f.readlines()[-5:]
+            recent = tail_lines(anomalies_file, 5)
             lines.append("\n=== PATHWAY ANOMALIES (last 5) ===")
             for raw in recent:
                 try:
@@ -82,8 +92,7 @@ def _build_context() -> str:
 
     if stats_file.exists():
         try:
-            with open(stats_file) as f:
-                stat_lines = f.readlines()[-10:]
+            stat_lines = tail_lines(stats_file, 10)
             latest_stats = {}
             for raw in stat_lines:
                 try:
@@ -183,20 +192,27 @@ class LLMInsightService:
         is_urgent = self._urgent.is_set()
 
         if fingerprint == self._last_fingerprint and not is_urgent:
+            LLM_FINGERPRINT.inc(result="hit")
             return False
+        LLM_FINGERPRINT.inc(result="miss")
 
+        start = time.perf_counter()
         try:
             self.latest_insight = await self.generate_insight()
+            LLM_SECONDS.observe(time.perf_counter() - start, outcome="ok")
             self._last_fingerprint = fingerprint
             print(f"LLM insight: severity={self.latest_insight['severity']}")
             return True
         except Exception as e:
             error_str = str(e)
             if "429" in error_str or "RESOURCE_EXHAUSTED" in error_str:
+                LLM_SECONDS.observe(time.perf_counter() - start, outcome="rate_limited")
+                LLM_RATE_LIMITED.inc()
                 retry_delay = _parse_retry_delay(e) or 60.0
                 self._backoff_until = time.time() + retry_delay
                 print(f"LLM rate limited, retrying in {retry_delay:.0f}s")
             else:
+                LLM_SECONDS.observe(time.perf_counter() - start, outcome="error")
                 print(f"LLM error: {e}")
                 traceback.print_exc()
             return False
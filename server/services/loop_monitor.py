@@ -0,0 +1,123 @@
+"""
+Event-loop lag sampler and blocking-call detector
+
+A task sleeps for `interval` and records how late it wakes up. A watchdog
+thread checks that task's heartbeat; when the loop has not run it for longer
+than `threshold`, the stack of the loop thread (the callback holding it) is
+logged once per stall.
+"""
+
+import asyncio
+import math
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Optional
+
+from services.metrics import registry
+
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "1") == "1"
+LOOP_MONITOR_INTERVAL = float(os.getenv("LOOP_MONITOR_INTERVAL", "0.1"))  # seconds
+SLOW_CALLBACK_THRESHOLD = float(os.getenv("SLOW_CALLBACK_THRESHOLD", "0.25"))  # seconds
+LOOP_LAG_WINDOW = int(os.getenv("LOOP_LAG_WINDOW", "50"))  # recent samples kept for lag_p95
+
+LOOP_LAG_SECONDS = registry.histogram(
+    "gridsense_event_loop_lag_seconds", "Delay of the event loop in waking a sleeping task",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+SLOW_CALLBACKS = registry.counter("gridsense_slow_callbacks", "Event-loop stalls longer than the slow-callback threshold")
+
+
+class LoopMonitor:
+    def __init__(self, interval: float = LOOP_MONITOR_INTERVAL, threshold: float = SLOW_CALLBACK_THRESHOLD):
+        self.interval = interval
+        self.threshold = threshold
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self._recent = deque(maxlen=LOOP_LAG_WINDOW)
+        self.stalls = 0
+        self.last_stall: Optional[dict] = None
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def enabled(self) -> bool:
+        return self._task is not None
+
+    async def _sample(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._heartbeat = time.monotonic()
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lag = max(0.0, loop.time() - start - self.interval)
+            self.max_lag = max(self.max_lag, self.lag)
+            self._recent.append(self.lag)
+            LOOP_LAG_SECONDS.observe(self.lag)
+
+    @property
+    def lag_p95(self) -> float:
+        """95th percentile of the last LOOP_LAG_WINDOW samples"""
+        if not self._recent:
+            return self.lag
+        recent = sorted(self._recent)
+        return recent[math.ceil(0.95 * len(recent)) - 1]
+
+    def _watch(self):
+        reported = None
+        while not self._stop.wait(min(self.interval, self.threshold / 2)):
+            heartbeat = self._heartbeat
+            stalled = time.monotonic() - heartbeat - self.interval
+            if stalled < self.threshold or heartbeat == reported:
+                continue
+            reported = heartbeat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else ""
+            self.stalls += 1
+            self.last_stall = {"at": time.time(), "blocked_s": round(stalled, 3), "stack": stack}
+            SLOW_CALLBACKS.inc()
+            print(f"Event loop blocked for {stalled:.3f}s (threshold {self.threshold}s):\n{stack}")
+
+    def start_background_task(self):
+        """Start the lag sampler and watchdog thread (call from the event loop)"""
+        if self._task is None:
+            self._loop_thread_id = threading.get_ident()
+            self._heartbeat = time.monotonic()
+            self._stop.clear()
+            self._task = asyncio.create_task(self._sample())
+            self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+            print(f"Loop monitor started (interval={self.interval}s, threshold={self.threshold}s)")
+
+    async def stop_background_task(self):
+        if self._task:
+            self._stop.set()
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._watchdog.join()
+            self._watchdog = None
+
+    def status(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "interval_s": self.interval,
+            "threshold_s": self.threshold,
+            "lag_s": round(self.lag, 4),
+            "lag_p95_s": round(self.lag_p95, 4),
+            "max_lag_s": round(self.max_lag, 4),
+            "stalls": self.stalls,
+            "last_stall": self.last_stall,
+        }
+
+
+loop_monitor = LoopMonitor()
@@ -0,0 +1,155 @@
+"""
+Columnar Output Sink for Pathway results
+
+Optional Arrow IPC / Parquet writer partitioned by hour and device_type:
+    pathway_output/columnar/<table>/hour=YYYYMMDDHH/device_type=<type>/part-*.arrow
+
+Requires pyarrow. Enable with COLUMNAR_FORMAT=arrow or COLUMNAR_FORMAT=parquet.
+"""
+
+import io
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .config import PathwayConfig
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+FORMAT_SUFFIXES = {"arrow": ".arrow", "parquet": ".parquet"}
+
+
+def columnar_available() -> bool:
+    return pa is not None
+
+
+def _now() -> float:
+    return time.time()
+
+
+def _hour_key(ts: float) -> int:
+    return int(datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y%m%d%H"))
+
+
+class ColumnarSink:
+    """Pathway subscriber that buffers rows and flushes them as columnar part files"""
+
+    def __init__(
+        self,
+        name: str,
+        fmt: str = PathwayConfig.COLUMNAR_FORMAT,
+        flush_rows: int = PathwayConfig.COLUMNAR_FLUSH_ROWS,
+        flush_interval: float = PathwayConfig.COLUMNAR_FLUSH_INTERVAL,
+    ):
+        if pa is None:
+            raise RuntimeError("pyarrow is required for columnar output")
+        if fmt not in FORMAT_SUFFIXES:
+            raise ValueError(f"Unsupported columnar format: {fmt}")
+        self.root = Path(PathwayConfig.COLUMNAR_DIR) / name
+        self.fmt = fmt
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self._buffers: Dict[Tuple[int, str], List[Dict[str, Any]]] = {}
+        self._buffered = 0
+        self._last_flush = _now()
+        self._part = 0
+
+    def on_change(self, key, row: Dict[str, Any], time: int, is_addition: bool):
+        partition = (_hour_key(row.get("timestamp") or _now()), row.get("device_type") or "all")
+        self._buffers.setdefault(partition, []).append(
+            {**row, "diff": 1 if is_addition else -1, "time": time}
+        )
+        self._buffered += 1
+        if self._buffered >= self.flush_rows:
+            self.flush()
+
+    def on_time_end(self, time: int):
+        if self._buffered and _now() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def on_end(self):
+        self.flush()
+
+    def flush(self):
+        for (hour, device_type), rows in self._buffers.items():
+            directory = self.root / f"hour={hour}" / f"device_type={device_type}"
+            directory.mkdir(parents=True, exist_ok=True)
+            target = directory / f"part-{int(_now() * 1000)}-{self._part:06d}{FORMAT_SUFFIXES[self.fmt]}"
+            self._part += 1
+            table = pa.Table.from_pylist(rows)
+            if self.fmt == "parquet":
+                pq.write_table(table, target, compression="zstd")
+            else:
+                with ipc.new_file(target, table.schema, options=ipc.IpcWriteOptions(compression="zstd")) as writer:
+                    writer.write_table(table)
+        self._buffers.clear()
+        self._buffered = 0
+        self._last_flush = _now()
+
+
+def _read_part(path: Path) -> "pa.Table":
+    if path.suffix == ".parquet":
+        return pq.read_table(path)
+    with ipc.open_file(path) as reader:
+        return reader.read_all()
+
+
+def _partition_files(name: str, start: float, end: float) -> Iterator[Path]:
+    root = Path(PathwayConfig.COLUMNAR_DIR) / name
+    if not root.exists():
+        return
+    first, last = _hour_key(start), _hour_key(end)
+    for hour_dir in sorted(root.glob("hour=*")):
+        hour = int(hour_dir.name.split("=", 1)[1])
+        if first <= hour <= last:
+            yield from sorted(hour_dir.glob("device_type=*/part-*"))
+
+
+def export_arrow_stream(
+    name: str,
+    start: float,
+    end: float,
+    device_type: Optional[str] = None,
+) -> Iterator[bytes]:
+    """
+    Yield an Arrow IPC stream of rows with start <= timestamp <= end
+
+    Parts that cannot be read or cast to the schema of the first part are
+    skipped and logged, so a bad part never aborts a stream mid-way.
+    """
+    buffer = io.BytesIO()
+    writer = None
+    for path in _partition_files(name, start, end):
+        if device_type and path.parent.name != f"device_type={device_type}":
+            continue
+        try:
+            table = _read_part(path)
+            if "timestamp" in table.column_names:
+                ts = table["timestamp"]
+                table = table.filter(pc.and_(pc.greater_equal(ts, start), pc.less_equal(ts, end)))
+            if table.num_rows == 0:
+                continue
+            if writer is not None and table.schema != schema:
+                table = table.select(schema.names).cast(schema)
+        except (pa.ArrowException, KeyError) as e:
+            # Unreadable part, or its columns do not fit the stream's schema (set by the first part)
+            print(f"Skipping {path} in {name} export: {e}")
+            continue
+        if writer is None:
+            schema = table.schema
+            writer = ipc.new_stream(buffer, schema)
+        for batch in table.to_batches():
+            writer.write_batch(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if writer is not None:
+        writer.close()
+        yield buffer.getvalue()
@@ -14,13 +14,14 @@ class PathwayConfig:
     API_PORT: Final[int] = int(os.getenv("API_PORT") or os.getenv("PORT", "8000"))
     API_BASE_URL: Final[str] = os.getenv("API_BASE_URL", f"http://localhost:{API_PORT}")
     INTERNAL_STREAM_PATH: Final[str] = "/api/stream/internal"
+    STREAM_SITE: Final[str] = os.getenv("PATHWAY_SITE", "*")  # site id, or * for every site
     EXTERNAL_STREAM_PATH: Final[str] = "/api/stream/external"
     
     GEMINI_API_KEY: Final[str] = os.getenv("GEMINI_API_KEY", "")
     GEMINI_MODEL: Final[str] = "gemini-2.5-flash-lite"
     
-    INTERNAL_POLL_INTERVAL: Final[float] = 0.1  # 10Hz = 100ms
-    EXTERNAL_POLL_INTERVAL: Final[float] = 15.0  # 15 seconds (demo mode)
+    INTERNAL_POLL_INTERVAL: Final[float] = float(os.getenv("INTERNAL_POLL_INTERVAL", "0.1"))  # 10Hz = 100ms
+    EXTERNAL_POLL_INTERVAL: Final[float] = float(os.getenv("EXTERNAL_POLL_INTERVAL", "15.0"))  # 15 seconds (demo mode)
     # EXTERNAL_POLL_INTERVAL: Final[float] = 900.0  # 15 minutes (production)
     
     INTERNAL_AUTOCOMMIT_MS: Final[int] = 100
@@ -40,6 +41,25 @@ class PathwayConfig:
     RECOMMENDATIONS_FILE: Final[str] = f"{OUTPUT_DIR}/recommendations.jsonl"
     DEVICE_STATS_FILE: Final[str] = f"{OUTPUT_DIR}/device_stats.jsonl"
     TOTAL_POWER_FILE: Final[str] = f"{OUTPUT_DIR}/total_power.jsonl"
+    ENERGY_FILE: Final[str] = f"{OUTPUT_DIR}/energy.jsonl"
+    
+    # Output Rotation
+    SINK_MAX_SEGMENT_BYTES: Final[int] = int(os.getenv("SINK_MAX_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+    SINK_MAX_SEGMENT_AGE: Final[float] = float(os.getenv("SINK_MAX_SEGMENT_AGE", "3600"))  # seconds
+    SINK_RETAIN_SEGMENTS: Final[int] = int(os.getenv("SINK_RETAIN_SEGMENTS", "48"))
+    SINK_COMPRESSION_LEVEL: Final[int] = 3
+    
+    # Columnar Output (requires pyarrow; "arrow", "parquet" or empty to disable)
+    COLUMNAR_FORMAT: Final[str] = os.getenv("COLUMNAR_FORMAT", "")
+    COLUMNAR_DIR: Final[str] = f"{OUTPUT_DIR}/columnar"
+    COLUMNAR_FLUSH_ROWS: Final[int] = 50000
+    COLUMNAR_FLUSH_INTERVAL: Final[float] = 60.0  # seconds
+    
+    # Server-Sent Events follower (shared reader for /api/pathway/stream)
+    FOLLOW_INTERVAL: Final[float] = float(os.getenv("PATHWAY_FOLLOW_INTERVAL", "0.5"))  # seconds
+    FOLLOW_BATCH_ROWS: Final[int] = 1000
+    SSE_QUEUE_SIZE: Final[int] = int(os.getenv("SSE_QUEUE_SIZE", "1000"))
+    SSE_HEARTBEAT_INTERVAL: Final[float] = 15.0  # seconds
     
     # LLM Insight Configuration
     LLM_INSIGHT_INTERVAL: Final[float] = 30.0  # seconds between Gemini calls
@@ -51,7 +71,7 @@ class PathwayConfig:
     @classmethod
     def get_internal_url(cls) -> str:
         """Get full URL for internal stream endpoint"""
-        return f"{cls.API_BASE_URL}{cls.INTERNAL_STREAM_PATH}"
+        return f"{cls.API_BASE_URL}{cls.INTERNAL_STREAM_PATH}?site={cls.STREAM_SITE}"
     
     @classmethod
     def get_external_url(cls) -> str:
@@ -0,0 +1,173 @@
+"""
+Incremental row counters and sparse index for Pathway output files
+
+Each counter remembers the byte offset it has counted up to in the active
+segment and only scans bytes appended since the last call. While scanning it
+records a sparse index of (row, byte offset, timestamp) roughly every
+INDEX_STRIDE_BYTES, used to seek for cursor and time-range reads. Offsets
+and the index are persisted next to the output file (<stem>.offsets.json)
+so a restarted API process resumes instead of rescanning. Sealed segments
+contribute the totals the sink recorded in the manifest.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .sink import COUNT_CHUNK_SIZE, RETRACT_MARKER, load_manifest, manifest_path
+
+OFFSET_PERSIST_INTERVAL = 5.0  # seconds
+INDEX_STRIDE_BYTES = 256 * 1024
+
+
+def offsets_path(path: Path) -> Path:
+    return path.with_name(f"{path.stem}.offsets.json")
+
+
+def _empty_state(segment: Optional[list] = None) -> Dict[str, Any]:
+    return {"segment": segment, "offset": 0, "rows": 0, "retracts": 0, "index": [], "next_index_at": 0}
+
+
+def _row_timestamp(line: bytes) -> Optional[float]:
+    try:
+        return json.loads(line).get("timestamp")
+    except (json.JSONDecodeError, AttributeError):
+        return None
+
+
+class OutputCounter:
+    """Running row, insert and retract counts for one rotating output file"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._state = self._load_state()
+        self._persisted_at = 0.0
+        self._dirty = False
+        self._manifest_mtime = None
+        self._manifest: Optional[Dict[str, Any]] = None
+
+    def _load_state(self) -> Dict[str, Any]:
+        try:
+            with open(offsets_path(self.path)) as f:
+                return {**_empty_state(), **json.load(f)}
+        except (FileNotFoundError, json.JSONDecodeError):
+            return _empty_state()
+
+    def _persist(self):
+        target = offsets_path(self.path)
+        tmp = target.with_suffix(".tmp")
+        try:
+            with open(tmp, "w") as f:
+                json.dump(self._state, f)
+            os.replace(tmp, target)
+        except OSError as e:
+            print(f"Could not persist offsets for {self.path}: {e}")
+        self._persisted_at = time.monotonic()
+        self._dirty = False
+
+    def _sealed(self) -> Dict[str, Any]:
+        try:
+            mtime = manifest_path(self.path).stat().st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        if mtime != self._manifest_mtime:
+            self._manifest = load_manifest(self.path)
+            self._manifest_mtime = mtime
+        return self._manifest or {}
+
+    def refresh(self) -> Optional[Dict[str, Any]]:
+        """Count newly appended rows; None if the file does not exist"""
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+
+        manifest = self._sealed()
+        # Inodes of deleted segments get reused, so the active segment is
+        # identified by inode and manifest sequence number together
+        segment = [stat.st_ino, manifest.get("next_seq", 0)]
+
+        with self._lock:
+            state = self._state
+            if state["segment"] != segment or stat.st_size < state["offset"]:
+                # Rotated or truncated: the old segment's counts are in the manifest
+                state = self._state = _empty_state(segment)
+                self._dirty = True
+            if stat.st_size > state["offset"]:
+                self._scan(state)
+                self._dirty = True
+            if self._dirty and time.monotonic() - self._persisted_at >= OFFSET_PERSIST_INTERVAL:
+                self._persist()
+            rows, retracts = state["rows"], state["retracts"]
+
+        sealed = manifest.get("sealed_totals", {})
+        return {
+            "first_row": sealed.get("rows", 0),
+            "size_bytes": stat.st_size,
+            "last_modified": stat.st_mtime,
+            "line_count": rows,
+            "inserts": rows - retracts,
+            "retracts": retracts,
+            "segments": len(manifest.get("segments", [])),
+            "total_rows": rows + sealed.get("rows", 0),
+            "total_inserts": rows - retracts + sealed.get("inserts", 0),
+            "total_retracts": retracts + sealed.get("retracts", 0),
+        }
+
+
+    def _scan(self, state: Dict[str, Any]):
+        """Count rows appended after state["offset"] and extend the index"""
+        tail = b""
+        with open(self.path, "rb") as f:
+            f.seek(state["offset"])
+            while True:
+                chunk = f.read(COUNT_CHUNK_SIZE)
+                if not chunk:
+                    break
+                data = tail + chunk
+                base = state["offset"]
+                cut = data.rfind(b"\n") + 1
+                while state["next_index_at"] - base < cut:
+                    # First row starting at or after next_index_at
+                    target = max(state["next_index_at"] - base, 0)
+                    start = data.find(b"\n", target - 1) + 1 if target else 0
+                    if start >= cut:
+                        break
+                    end = data.find(b"\n", start)
+                    row = state["rows"] + data.count(b"\n", 0, start)
+                    state["index"].append([row, base + start, _row_timestamp(data[start:end])])
+                    state["next_index_at"] = base + start + INDEX_STRIDE_BYTES
+                state["rows"] += data.count(b"\n", 0, cut)
+                state["retracts"] += data.count(RETRACT_MARKER, 0, cut)
+                state["offset"] += cut
+                tail = data[cut:]
+
+    def snapshot(self) -> Optional[Dict[str, Any]]:
+        """Refreshed scan state (segment, offset, rows, index) and manifest"""
+        if self.refresh() is None:
+            return None
+        with self._lock:
+            state = {**self._state, "index": list(self._state["index"])}
+        return {"state": state, "manifest": self._sealed()}
+
+
+_counters: Dict[Path, OutputCounter] = {}
+_counters_lock = threading.Lock()
+
+
+def output_counter(path: Path) -> OutputCounter:
+    """Shared counter for an output file"""
+    path = Path(path)
+    counter = _counters.get(path)
+    if counter is None:
+        with _counters_lock:
+            counter = _counters.setdefault(path, OutputCounter(path))
+    return counter
+
+
+def output_counts(path: Path) -> Optional[Dict[str, Any]]:
+    return output_counter(path).refresh()
@@ -0,0 +1,175 @@
+"""
+Shared follower of Pathway output files for Server-Sent Events
+
+One background task reads rows appended to the followed outputs (by cursor,
+see query.read_rows) and fans them out to every subscriber's queue, so the
+number of file reads does not grow with the number of connected clients.
+
+Event ids are cursor vectors ("anomalies:120,recommendations:33,...").
+A client reconnecting with Last-Event-ID first gets the rows it missed,
+read from disk table by table, then continues on the live feed.
+"""
+
+import asyncio
+import json
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from services.metrics import registry
+
+from .config import PathwayConfig
+from .counters import output_counts
+from .query import read_rows
+
+FOLLOW_TABLES = ("anomalies", "recommendations", "device_stats")
+
+SSE_SUBSCRIBERS = registry.gauge("gridsense_sse_subscribers", "Connected Server-Sent Events clients")
+SSE_DROPPED = registry.counter("gridsense_sse_dropped", "SSE clients disconnected because their queue overflowed")
+
+
+def format_event_id(cursors: Dict[str, int]) -> str:
+    return ",".join(f"{table}:{cursor}" for table, cursor in cursors.items())
+
+
+def parse_event_id(value: Optional[str]) -> Dict[str, int]:
+    """Cursor vector from a Last-Event-ID header; unknown or malformed parts are ignored"""
+    cursors = {}
+    for part in (value or "").split(","):
+        table, _, cursor = part.strip().partition(":")
+        if table in FOLLOW_TABLES and cursor.isdigit():
+            cursors[table] = int(cursor)
+    return cursors
+
+
+def format_event(table: str, row: dict, cursors: Dict[str, int]) -> str:
+    return f"id: {format_event_id(cursors)}\nevent: {table}\ndata: {json.dumps(row)}\n\n"
+
+
+class _Subscription:
+    def __init__(self, tables: Tuple[str, ...]):
+        self.tables = tables
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=PathwayConfig.SSE_QUEUE_SIZE)
+
+
+class PathwayFollower:
+    def __init__(self, output_dir: Path = Path(PathwayConfig.OUTPUT_DIR), interval: float = PathwayConfig.FOLLOW_INTERVAL):
+        self.output_dir = output_dir
+        self.interval = interval
+        self.cursors: Dict[str, int] = {}
+        self._subscribers: Set[_Subscription] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def _path(self, table: str) -> Path:
+        return self.output_dir / f"{table}.jsonl"
+
+    def _init_cursors(self):
+        """Start following each table from its current end"""
+        for table in FOLLOW_TABLES:
+            if table not in self.cursors:
+                counts = output_counts(self._path(table))
+                self.cursors[table] = counts["total_rows"] if counts else 0
+
+    def _poll(self) -> List[Tuple[str, List[dict]]]:
+        """New rows per table since the last poll (blocking file reads)"""
+        self._init_cursors()
+        batches = []
+        for table in FOLLOW_TABLES:
+            page = read_rows(self._path(table), since=self.cursors[table], limit=PathwayConfig.FOLLOW_BATCH_ROWS)
+            self.cursors[table] = page["next_cursor"]
+            if page["rows"]:
+                batches.append((table, page["rows"]))
+        return batches
+
+    def _publish(self, batches: List[Tuple[str, List[dict]]]):
+        for subscription in list(self._subscribers):
+            try:
+                for table, rows in batches:
+                    if table in subscription.tables:
+                        for row in rows:
+                            subscription.queue.put_nowait((table, row))
+            except asyncio.QueueFull:
+                # Too slow to keep up: end its stream, it resumes via Last-Event-ID
+                SSE_DROPPED.inc()
+                self._subscribers.discard(subscription)
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                subscription.queue.put_nowait(None)
+
+    async def _run(self):
+        while True:
+            if self._subscribers:
+                try:
+                    self._publish(await asyncio.to_thread(self._poll))
+                except Exception as e:
+                    print(f"Pathway follower error: {e}")
+            else:
+                # Nobody listening: pick up from the end again on the next subscriber
+                self.cursors.clear()
+            await asyncio.sleep(self.interval)
+
+    def start_background_task(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            print(f"Pathway follower started (interval={self.interval}s)")
+
+    async def stop_background_task(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _replay(self, table: str, cursors: Dict[str, int]) -> AsyncIterator[str]:
+        """Rows of one table from cursors[table] to the current end of file"""
+        while True:
+            page = await asyncio.to_thread(
+                read_rows, self._path(table), cursors[table], None, None, PathwayConfig.FOLLOW_BATCH_ROWS
+            )
+            for row in page["rows"]:
+                cursors[table] = row["cursor"] + 1
+                yield format_event(table, row, cursors)
+            cursors[table] = page["next_cursor"]
+            if not page["rows"]:
+                return
+
+    async def events(self, tables: Tuple[str, ...], last_event_id: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        SSE-formatted events for the given tables
+
+        Registers for live rows before replaying from Last-Event-ID so nothing
+        written in between is lost; live rows already replayed are skipped.
+        """
+        self.start_background_task()
+        subscription = _Subscription(tables)
+        self._subscribers.add(subscription)
+        SSE_SUBSCRIBERS.inc()
+        try:
+            if not self.cursors:
+                await asyncio.to_thread(self._init_cursors)
+            cursors = {**self.cursors, **parse_event_id(last_event_id)}
+            if last_event_id:
+                for table in tables:
+                    async for event in self._replay(table, cursors):
+                        yield event
+
+            while True:
+                try:
+                    item = await asyncio.wait_for(subscription.queue.get(), PathwayConfig.SSE_HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if item is None:
+                    return
+                table, row = item
+                if row["cursor"] < cursors[table]:
+                    continue
+                cursors[table] = row["cursor"] + 1
+                yield format_event(table, row, cursors)
+        finally:
+            self._subscribers.discard(subscription)
+            SSE_SUBSCRIBERS.dec()
+
+
+pathway_follower = PathwayFollower()
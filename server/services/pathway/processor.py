@@ -7,7 +7,11 @@ and optimization recommendations.
 
 import pathway as pw
 import os
+from pathlib import Path
+from services.energy import EnergyAccumulator
 from .config import PathwayConfig
+from .columnar import ColumnarSink
+from .sink import RotatingJsonlSink
 from .utils import (
     internal_stream_generator,
     external_stream_generator,
@@ -63,14 +67,19 @@ class PathwayProcessor:
     def _ensure_output_directory(self):
         os.makedirs(self.config.OUTPUT_DIR, exist_ok=True)
     
-    def _create_streams(self):
+    def _create_streams(self, device_connector=None, grid_connector=None):
         """
         Create input data streams
         
+        Args:
+            device_connector: Device telemetry subject (defaults to polling the API)
+            grid_connector: Grid context subject (defaults to polling the API)
+        
         Returns:
             Tuple of (device_stream, grid_stream)
         """
         class DeviceSchema(pw.Schema):
+            site_id: str
             device_id: str
             device_type: str
             status: str
@@ -78,6 +87,9 @@ class PathwayProcessor:
             current: float
             power: float
             timestamp: float
+            tick_id: int
+            origin_ts: float
+            ingest_ts: float
         
         class GridSchema(pw.Schema):
             carbon_intensity: float
@@ -88,13 +100,13 @@ class PathwayProcessor:
             timestamp: float
         
         device_stream = pw.io.python.read(
-            DeviceConnector(),
+            device_connector or DeviceConnector(),
             schema=DeviceSchema,
             autocommit_duration_ms=self.config.INTERNAL_AUTOCOMMIT_MS
         )
         
         grid_stream = pw.io.python.read(
-            GridConnector(),
+            grid_connector or GridConnector(),
             schema=GridSchema,
             autocommit_duration_ms=self.config.EXTERNAL_AUTOCOMMIT_MS
         )
@@ -114,6 +126,7 @@ class PathwayProcessor:
         anomalies = device_stream.filter(
             (pw.this.current > self.config.HIGH_CURRENT_THRESHOLD) | (pw.this.status == "fault")
         ).select(
+            site_id=pw.this.site_id,
             device_id=pw.this.device_id,
             device_type=pw.this.device_type,
             current=pw.this.current,
@@ -124,7 +137,10 @@ class PathwayProcessor:
                 pw.this.current,
                 pw.this.status
             ),
-            timestamp=pw.this.timestamp
+            timestamp=pw.this.timestamp,
+            tick_id=pw.this.tick_id,
+            origin_ts=pw.this.origin_ts,
+            ingest_ts=pw.this.ingest_ts
         )
         
         return anomalies
@@ -137,9 +153,10 @@ class PathwayProcessor:
             device_stream: Input device telemetry stream
             
         Returns:
-            Stream of device statistics grouped by type
+            Stream of device statistics grouped by site and type
         """
-        device_stats = device_stream.groupby(pw.this.device_type).reduce(
+        device_stats = device_stream.groupby(pw.this.site_id, pw.this.device_type).reduce(
+            site_id=pw.this.site_id,
             device_type=pw.this.device_type,
             avg_current=pw.reducers.avg(pw.this.current),
             max_current=pw.reducers.max(pw.this.current),
@@ -181,6 +198,7 @@ class PathwayProcessor:
         )
 
         combined = joined.select(
+            site_id=device_stream.site_id,
             device_id=device_stream.device_id,
             device_type=device_stream.device_type,
             status=device_stream.status,
@@ -206,11 +224,65 @@ class PathwayProcessor:
                 _renewable_pct,
                 _cost_per_hour
             ),
-            timestamp=device_stream.timestamp
+            timestamp=device_stream.timestamp,
+            tick_id=device_stream.tick_id,
+            origin_ts=device_stream.origin_ts,
+            ingest_ts=device_stream.ingest_ts
         )
         
         return combined
     
+    def _write_energy(self, recommendations):
+        """
+        Accumulate per-device kWh, cost and carbon from the joined stream
+        
+        Rows already carry the price and carbon intensity in effect at their
+        timestamp. Totals of devices updated in a batch are written once per
+        batch.
+        
+        Args:
+            recommendations: Device stream joined with grid context
+        """
+        accumulator = EnergyAccumulator()
+        sink = RotatingJsonlSink(self.config.ENERGY_FILE)
+        changed = set()
+        
+        def on_change(key, row, time, is_addition):
+            if is_addition:
+                accumulator.add(
+                    (row["site_id"], row["device_id"]),
+                    row["timestamp"],
+                    row["power"],
+                    row["electricity_price"],
+                    row["carbon_intensity"]
+                )
+                changed.add((row["site_id"], row["device_id"]))
+        
+        def on_time_end(time):
+            for key in changed:
+                site_id, device_id = key
+                sink.write({"site_id": site_id, "device_id": device_id, **accumulator.snapshot(key), "diff": 1, "time": time})
+            changed.clear()
+            sink.on_time_end(time)
+        
+        pw.io.subscribe(recommendations, on_change=on_change, on_time_end=on_time_end, on_end=sink.on_end)
+    
+    def _write_output(self, table, path: str):
+        """
+        Write a table to a rotating, size-bounded jsonlines sink and,
+        when COLUMNAR_FORMAT is set, to a partitioned columnar sink
+        """
+        sinks = [RotatingJsonlSink(path)]
+        if self.config.COLUMNAR_FORMAT:
+            sinks.append(ColumnarSink(Path(path).stem))
+        for sink in sinks:
+            pw.io.subscribe(
+                table,
+                on_change=sink.on_change,
+                on_time_end=sink.on_time_end,
+                on_end=sink.on_end
+            )
+    
     def run(self):
         """
         Run the complete Pathway pipeline
@@ -232,9 +304,10 @@ class PathwayProcessor:
         recommendations = self._generate_recommendations(device_stream, grid_stream)
         
         print("Writing outputs to files\n")
-        pw.io.jsonlines.write(anomalies, self.config.ANOMALIES_FILE)
-        pw.io.jsonlines.write(device_stats, self.config.DEVICE_STATS_FILE)
-        pw.io.jsonlines.write(recommendations, self.config.RECOMMENDATIONS_FILE)
+        self._write_output(anomalies, self.config.ANOMALIES_FILE)
+        self._write_output(device_stats, self.config.DEVICE_STATS_FILE)
+        self._write_output(recommendations, self.config.RECOMMENDATIONS_FILE)
+        self._write_energy(recommendations)
         
         print("=" * 70)
         print("Pipeline is running! Press Ctrl+C to stop.")
@@ -0,0 +1,143 @@
+"""
+Cursor and time-range reads over rotating Pathway output files
+
+Every row has a global row number (its cursor) that survives rotation: a
+sealed segment's first row is recorded in the manifest and the active
+segment starts at sealed_totals.rows. Sealed segments are skipped by row
+range and min/max timestamp; within the active segment the sparse index
+kept by OutputCounter is used to seek close to the first wanted row.
+
+Rows are assumed to be appended in roughly timestamp order: a time-range
+scan stops at the first row newer than end + ORDER_SLACK seconds.
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .counters import output_counter
+from .sink import _read_sealed
+
+ORDER_SLACK = 5.0  # seconds
+READ_CHUNK_SIZE = 256 * 1024
+
+
+def _sealed_segments(manifest: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Retained sealed segments with first_row filled in for older manifests"""
+    segments = [dict(segment) for segment in manifest.get("segments", [])]
+    next_first = manifest.get("sealed_totals", {}).get("rows", 0)
+    for segment in reversed(segments):
+        segment.setdefault("first_row", next_first - segment["rows"])
+        next_first = segment["first_row"]
+    return segments
+
+
+def _in_range(segment: Dict[str, Any], start: Optional[float], end: Optional[float]) -> bool:
+    if start is not None and segment.get("max_ts") is not None and segment["max_ts"] < start:
+        return False
+    if end is not None and segment.get("min_ts") is not None and segment["min_ts"] > end:
+        return False
+    return True
+
+
+def _seek_point(index: List[list], since_row: int, start: Optional[float]) -> Tuple[int, int]:
+    """(row, byte offset) of the last index point before the wanted rows"""
+    row, offset = 0, 0
+    for point_row, point_offset, point_ts in index:
+        before_cursor = point_row <= since_row
+        before_start = start is not None and point_ts is not None and point_ts < start
+        if not (before_cursor or before_start):
+            break
+        row, offset = point_row, point_offset
+    return row, offset
+
+
+def _active_lines(path: Path, offset: int) -> Iterator[bytes]:
+    """Complete lines of the active segment from offset to EOF"""
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return
+    with f:
+        f.seek(offset)
+        tail = b""
+        while True:
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                return
+            lines = (tail + chunk).split(b"\n")
+            tail = lines.pop()
+            yield from lines
+
+
+def read_rows(
+    path: Path,
+    since: Optional[int] = None,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    limit: int = 100,
+) -> Dict[str, Any]:
+    """
+    Rows with cursor >= since and start <= timestamp <= end, oldest first
+
+    Returns {"rows", "next_cursor", "truncated"}: pass next_cursor as
+    since on the next call to receive only newer rows. truncated is set when
+    since points before the oldest retained row. Retractions (diff < 0) are
+    skipped but still advance the cursor. A limit below 1 returns no rows.
+    """
+    path = Path(path)
+    snapshot = output_counter(path).snapshot()
+    if snapshot is None or limit <= 0:
+        return {"rows": [], "next_cursor": since or 0, "truncated": False}
+    state, manifest = snapshot["state"], snapshot["manifest"]
+    active_first = manifest.get("sealed_totals", {}).get("rows", 0)
+    sealed = _sealed_segments(manifest)
+    oldest = sealed[0]["first_row"] if sealed else active_first
+    since = oldest if since is None else since
+    truncated = since < oldest
+
+    rows: List[Dict[str, Any]] = []
+    cursor = max(since, oldest)
+    time_filtered = start is not None or end is not None
+
+    def take(row_number: int, line: bytes) -> bool:
+        """Collect one row; False once the scan can stop"""
+        nonlocal cursor
+        if row_number < cursor:
+            return True
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError:
+            cursor = row_number + 1
+            return True
+        ts = data.get("timestamp")
+        if end is not None and ts is not None and ts > end + ORDER_SLACK:
+            return False
+        cursor = row_number + 1
+        if data.get("diff", 1) <= 0:
+            return True
+        if time_filtered and (ts is None or (start is not None and ts < start) or (end is not None and ts > end)):
+            return True
+        rows.append({**data, "cursor": row_number})
+        return len(rows) < limit
+
+    for segment in sealed:
+        if segment["first_row"] + segment["rows"] <= cursor:
+            continue
+        if not _in_range(segment, start, end):
+            cursor = max(cursor, segment["first_row"] + segment["rows"])
+            continue
+        try:
+            lines = _read_sealed(path.parent / segment["file"])
+        except FileNotFoundError:
+            continue
+        for i, line in enumerate(lines):
+            if not take(segment["first_row"] + i, line):
+                return {"rows": rows, "next_cursor": cursor, "truncated": truncated}
+
+    row, offset = _seek_point(state["index"], cursor - active_first, start)
+    for line in _active_lines(path, offset):
+        if not take(active_first + row, line):
+            break
+        row += 1
+    return {"rows": rows, "next_cursor": cursor, "truncated": truncated}
@@ -0,0 +1,307 @@
+"""
+Rotating JSONL Sink for Pathway outputs
+
+The active segment keeps the original output path (e.g. anomalies.jsonl) so
+readers that only need recent rows stay unchanged. Sealed segments are
+renamed, tracked in a sidecar manifest and zstd-compressed on a background
+thread, so a rotation never stalls the Pathway callback. Until compression
+finishes the manifest lists the plain .jsonl segment.
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import zstandard
+
+from .config import PathwayConfig
+
+TAIL_CHUNK_SIZE = 64 * 1024
+COUNT_CHUNK_SIZE = 1024 * 1024
+RETRACT_MARKER = b'"diff": -1'
+AGE_CHECK_INTERVAL = 60.0  # seconds between age checks of an idle active segment
+
+
+def _now() -> float:
+    return time.time()
+
+
+def count_rows(path: Path, offset: int = 0) -> Tuple[int, int, int]:
+    """
+    Count complete rows and retractions from offset to EOF
+
+    Returns (rows, retracts, offset after the last complete row). Rows are
+    matched on bytes, without JSON parsing.
+    """
+    rows = retracts = 0
+    tail = b""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while True:
+            chunk = f.read(COUNT_CHUNK_SIZE)
+            if not chunk:
+                break
+            data = tail + chunk
+            cut = data.rfind(b"\n") + 1
+            rows += data.count(b"\n", 0, cut)
+            retracts += data.count(RETRACT_MARKER, 0, cut)
+            offset += cut
+            tail = data[cut:]
+    return rows, retracts, offset
+
+
+def manifest_path(path: Path) -> Path:
+    return path.with_name(f"{path.stem}.manifest.json")
+
+
+def load_manifest(path: Path) -> Optional[Dict[str, Any]]:
+    """Load the manifest for an output file, or None if it was never rotated"""
+    try:
+        with open(manifest_path(path)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _write_manifest(path: Path, manifest: Dict[str, Any]):
+    target = manifest_path(path)
+    tmp = target.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, target)
+
+
+class RotatingJsonlSink:
+    """
+    Pathway subscriber that writes rows in jsonlines format with rotation
+
+    Segments are sealed when they exceed max_bytes or max_age seconds; age is
+    also checked on every time end and by a watcher thread, so an idle sink
+    still seals its segment. Only the newest `retain` sealed segments are kept
+    on disk.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = PathwayConfig.SINK_MAX_SEGMENT_BYTES,
+        max_age: float = PathwayConfig.SINK_MAX_SEGMENT_AGE,
+        retain: int = PathwayConfig.SINK_RETAIN_SEGMENTS,
+    ):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.retain = retain
+        self.manifest = load_manifest(self.path) or {
+            "active": self.path.name,
+            "next_seq": 0,
+            "segments": [],
+        }
+        self._lock = threading.Lock()  # guards the manifest against the compression thread
+        self._io_lock = threading.Lock()  # guards the active segment against the age watcher
+        self._closed = threading.Event()
+        self._compressor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"compress-{self.path.stem}")
+        self._open_active()
+        for segment in self.manifest["segments"]:
+            if not segment["file"].endswith(".zst"):
+                # Sealed by a run that stopped before compressing it
+                self._compressor.submit(self._compress, segment)
+        threading.Thread(target=self._watch_age, name=f"age-{self.path.stem}", daemon=True).start()
+
+    def _expired(self) -> bool:
+        return self._size > 0 and _now() - self.manifest["active_created_at"] >= self.max_age
+
+    def _watch_age(self):
+        """Seal the active segment by age even when no rows arrive"""
+        while not self._closed.wait(min(self.max_age, AGE_CHECK_INTERVAL)):
+            with self._io_lock:
+                if not self._closed.is_set() and self._expired():
+                    self.rotate()
+
+    def _save_manifest(self):
+        with self._lock:
+            _write_manifest(self.path, self.manifest)
+
+    def _open_active(self):
+        self._file = open(self.path, "ab")
+        self._size = self._file.tell()
+        self._rows = self._retracts = 0
+        self._min_ts = self._max_ts = None
+        if self._size:
+            # Appending to a segment left by a previous run
+            self._rows, self._retracts, _ = count_rows(self.path)
+        self.manifest.setdefault("active_created_at", time.time())
+        if self._size == 0:
+            self.manifest["active_created_at"] = time.time()
+        self._save_manifest()
+
+    def write(self, row: Dict[str, Any]):
+        line = (json.dumps(row) + "\n").encode()
+        with self._io_lock:
+            self._file.write(line)
+            self._size += len(line)
+            self._rows += 1
+            if row.get("diff", 1) < 0:
+                self._retracts += 1
+            ts = row.get("timestamp")
+            if ts is not None:
+                self._min_ts = ts if self._min_ts is None else min(self._min_ts, ts)
+                self._max_ts = ts if self._max_ts is None else max(self._max_ts, ts)
+            if self._size >= self.max_bytes or self._expired():
+                self.rotate()
+
+    def on_change(self, key, row: Dict[str, Any], time: int, is_addition: bool):
+        row = {**row, "diff": 1 if is_addition else -1, "time": time}
+        if "origin_ts" in row:
+            row["written_at"] = _now()
+        self.write(row)
+
+    def on_time_end(self, time: int):
+        with self._io_lock:
+            self._file.flush()
+            if self._expired():
+                self.rotate()
+
+    def on_end(self):
+        self._closed.set()
+        with self._io_lock:
+            self._file.close()
+        self._compressor.shutdown(wait=True)
+
+    def _compress(self, segment: Dict[str, Any]):
+        """Replace a plain sealed segment with its .zst and update the manifest"""
+        sealed = self.path.parent / segment["file"]
+        compressed = sealed.with_suffix(".jsonl.zst")
+        try:
+            with open(sealed, "rb") as src, open(compressed, "wb") as dst:
+                zstandard.ZstdCompressor(level=PathwayConfig.SINK_COMPRESSION_LEVEL).copy_stream(src, dst)
+        except FileNotFoundError:
+            return  # Dropped by retention before it was compressed
+        with self._lock:
+            if not any(entry is segment for entry in self.manifest["segments"]):
+                compressed.unlink(missing_ok=True)
+                return
+            segment["file"] = compressed.name
+            segment["compressed_bytes"] = compressed.stat().st_size
+            _write_manifest(self.path, self.manifest)
+        sealed.unlink(missing_ok=True)
+
+    def rotate(self):
+        """Seal the active segment, schedule its compression and apply retention"""
+        self._file.close()
+        if self._size == 0:
+            self._open_active()
+            return
+
+        seq = self.manifest["next_seq"]
+        sealed = self.path.with_name(f"{self.path.stem}.{seq:06d}.jsonl")
+        os.replace(self.path, sealed)
+
+        with self._lock:
+            segment = self._seal(seq, sealed)
+        self._compressor.submit(self._compress, segment)
+        self._open_active()
+
+    def _seal(self, seq: int, sealed: Path) -> Dict[str, Any]:
+        """Record a sealed segment in the manifest and apply retention"""
+        totals = self.manifest.setdefault("sealed_totals", {"rows": 0, "inserts": 0, "retracts": 0})
+        segment = {
+            "file": sealed.name,
+            "seq": seq,
+            "first_row": totals["rows"],
+            "created_at": self.manifest["active_created_at"],
+            "sealed_at": time.time(),
+            "bytes": self._size,
+            "compressed_bytes": None,  # set once compressed
+            "rows": self._rows,
+            "inserts": self._rows - self._retracts,
+            "retracts": self._retracts,
+            # Unknown (None) when the segment was reopened after a restart
+            "min_ts": self._min_ts,
+            "max_ts": self._max_ts,
+        }
+        self.manifest["segments"].append(segment)
+        self.manifest["next_seq"] = seq + 1
+        # Includes segments later dropped by retention; also the global row
+        # number of the first row in the active segment
+        totals["rows"] += self._rows
+        totals["inserts"] += self._rows - self._retracts
+        totals["retracts"] += self._retracts
+
+        while len(self.manifest["segments"]) > self.retain:
+            expired = self.manifest["segments"].pop(0)
+            (self.path.parent / expired["file"]).unlink(missing_ok=True)
+
+        self.manifest["active_created_at"] = time.time()
+        return segment
+
+
+def _tail_active(path: Path, max_lines: int) -> List[bytes]:
+    """Read the last max_lines complete lines by seeking backwards from EOF"""
+    if max_lines <= 0:
+        return []
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return []
+    with f:
+        end = f.seek(0, os.SEEK_END)
+        pos = end
+        buf = b""
+        while pos > 0 and buf.count(b"\n") <= max_lines:
+            step = min(TAIL_CHUNK_SIZE, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+    lines = buf.split(b"\n")
+    # Last element is empty or a partially written row
+    lines = lines[:-1]
+    if pos > 0:
+        lines = lines[1:]
+    return lines[-max_lines:]
+
+
+def _read_sealed(path: Path) -> List[bytes]:
+    """Lines of a sealed segment, compressed (.zst) or still waiting for compression"""
+    if path.suffix != ".zst":
+        try:
+            with open(path, "rb") as f:
+                return f.read().split(b"\n")[:-1]
+        except FileNotFoundError:
+            # Compressed since the manifest was read
+            path = path.with_suffix(".jsonl.zst")
+    with open(path, "rb") as f:
+        data = zstandard.ZstdDecompressor().stream_reader(f).read()
+    return data.split(b"\n")[:-1]
+
+
+def tail_lines(path: Path, max_lines: int) -> List[bytes]:
+    """
+    Return the newest max_lines raw lines of a (possibly rotated) output file
+
+    Reads the active segment from its end and falls back to sealed segments
+    listed in the manifest only when the active one holds too few rows.
+    """
+    path = Path(path)
+    if max_lines <= 0:
+        return []
+    lines = _tail_active(path, max_lines)
+    if len(lines) >= max_lines:
+        return lines
+
+    manifest = load_manifest(path)
+    if not manifest:
+        return lines
+    for segment in reversed(manifest["segments"]):
+        try:
+            older = _read_sealed(path.parent / segment["file"])
+        except FileNotFoundError:
+            continue
+        lines = older[-(max_lines - len(lines)):] + lines
+        if len(lines) >= max_lines:
+            break
+    return lines
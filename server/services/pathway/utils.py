@@ -53,10 +53,11 @@ def internal_stream_generator() -> Generator[Dict[str, Any], None, None]:
     Generator function that yields device telemetry data
     
     Polls the internal stream endpoint at configured interval (10Hz default).
-    Yields one record per device per poll.
+    Yields one record per device (of every site when STREAM_SITE is *) per poll.
     
     Yields:
         Dictionary with device telemetry fields:
+        - site_id: str
         - device_id: str
         - device_type: str
         - status: str
@@ -64,30 +65,48 @@ def internal_stream_generator() -> Generator[Dict[str, Any], None, None]:
         - current: float
         - power: float
         - timestamp: float
+        - tick_id: int (simulator tick the snapshot came from)
+        - origin_ts: float (wall time of that tick)
+        - ingest_ts: float (wall time the snapshot was received)
     """
     print(f"📡 Starting internal stream ({1/PathwayConfig.INTERNAL_POLL_INTERVAL:.0f}Hz)...")
     
     while True:
         try:
             data = fetch_internal_stream()
-            timestamp = data.get('timestamp', time.time())
+            ingest_ts = time.time()
+            snapshots = data['sites'].values() if 'sites' in data else [data]
             
-            for device_id, telemetry in data.get('devices', {}).items():
-                yield {
-                    'device_id': str(device_id),
-                    'device_type': str(telemetry['device_type']),
-                    'status': str(telemetry['status']),
-                    'voltage': float(telemetry['voltage']),
-                    'current': float(telemetry['current']),
-                    'power': float(telemetry['power']),
-                    'timestamp': float(timestamp)
-                }
+            for snapshot in snapshots:
+                yield from _device_records(snapshot, ingest_ts)
         except Exception as e:
             print(f"⚠️  Error in internal stream: {e}")
         
         time.sleep(PathwayConfig.INTERNAL_POLL_INTERVAL)
 
 
+def _device_records(snapshot: Dict[str, Any], ingest_ts: float) -> Generator[Dict[str, Any], None, None]:
+    """One record per device of a site snapshot from the internal stream"""
+    timestamp = snapshot.get('timestamp', ingest_ts)
+    tick_id = int(snapshot.get('tick_id') or 0)
+    origin_ts = float(snapshot.get('origin_ts') or ingest_ts)
+    
+    for device_id, telemetry in snapshot.get('devices', {}).items():
+        yield {
+            'site_id': str(telemetry.get('site_id', 'default')),
+            'device_id': str(device_id),
+            'device_type': str(telemetry['device_type']),
+            'status': str(telemetry['status']),
+            'voltage': float(telemetry['voltage']),
+            'current': float(telemetry['current']),
+            'power': float(telemetry['power']),
+            'timestamp': float(timestamp),
+            'tick_id': tick_id,
+            'origin_ts': origin_ts,
+            'ingest_ts': ingest_ts
+        }
+
+
 def external_stream_generator() -> Generator[Dict[str, Any], None, None]:
     """
     Generator function that yields grid context data
@@ -0,0 +1,121 @@
+"""
+On-demand profiling of the running process
+
+- sample_cpu: wall-clock stack sampling of every thread via
+  sys._current_frames(), aggregated as folded stacks
+- allocation_diff: tracemalloc snapshot diff over a time window
+
+Folded output ("frame;frame;frame count" per line) loads directly into
+flamegraph.pl, speedscope or inferno.
+"""
+
+import asyncio
+import hmac
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Optional
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+MAX_PROFILE_SECONDS = 120.0
+TRACEMALLOC_FRAMES = 25
+
+_IGNORED_FILES = (tracemalloc.__file__, "<frozen importlib._bootstrap>", "<unknown>")
+
+_busy = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _fold(frame) -> List[str]:
+    stack = []
+    while frame is not None:
+        stack.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _sample_cpu(duration: float, interval: float) -> Dict[str, int]:
+    own = threading.get_ident()
+    names = {}
+    counts: Counter = Counter()
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        frames = sys._current_frames()
+        if len(names) != len(frames):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in frames.items():
+            if ident == own:
+                continue
+            stack = [names.get(ident, f"thread-{ident}")] + _fold(frame)
+            counts[";".join(stack)] += 1
+        time.sleep(interval)
+    return counts
+
+
+def _allocation_diff(duration: float, top: int) -> List[dict]:
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    try:
+        filters = [tracemalloc.Filter(False, name) for name in _IGNORED_FILES]
+        before = tracemalloc.take_snapshot().filter_traces(filters)
+        time.sleep(duration)
+        after = tracemalloc.take_snapshot().filter_traces(filters)
+    finally:
+        if started:
+            tracemalloc.stop()
+
+    stats = after.compare_to(before, "traceback")
+    stats = [stat for stat in stats if stat.size_diff > 0][:top]
+    return [
+        {
+            "size_diff": stat.size_diff,
+            "count_diff": stat.count_diff,
+            "size": stat.size,
+            # Outermost frame first, matching folded stacks
+            "traceback": [f"{frame.filename}:{frame.lineno}" for frame in reversed(stat.traceback)],
+        }
+        for stat in stats
+    ]
+
+
+async def _run_exclusive(func, *args):
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already being captured")
+    try:
+        return await asyncio.to_thread(func, *args)
+    finally:
+        _busy.release()
+
+
+async def sample_cpu(duration: float, interval: float = 0.005) -> Dict[str, int]:
+    """Folded stack -> sample count for all threads over `duration` seconds"""
+    return await _run_exclusive(_sample_cpu, duration, interval)
+
+
+async def allocation_diff(duration: float, top: int = 50) -> List[dict]:
+    """Largest allocation growth by traceback over `duration` seconds"""
+    return await _run_exclusive(_allocation_diff, duration, top)
+
+
+def to_folded(counts: Dict[str, int]) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(counts.items()))
+
+
+def allocations_to_folded(stats: List[dict]) -> str:
+    return "".join(f"{';'.join(stat['traceback'])} {stat['size_diff']}\n" for stat in stats)
+
+
+def is_admin(token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, ADMIN_TOKEN)
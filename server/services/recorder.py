@@ -0,0 +1,255 @@
+"""
+Telemetry record/replay
+
+Log format (optionally zstd-compressed when the file name ends in .zst):
+    header  b"GSREC02\n"
+    record  <type:uint8><timestamp:float64><payload>
+      DEFINE    <index:uint32><len:uint16><device_id><len:uint16><device_type>
+      SNAPSHOT  <count:uint32> then count x <index:uint32><status:uint8><voltage:f32><current:f32><power:f32>
+      GRID      <len:uint32><grid context as JSON>
+
+GSREC01 recordings (uint16 indexes and counts, uint8 lengths) are still read.
+"""
+
+import asyncio
+import json
+import os
+import struct
+import time
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, Optional, Tuple
+
+import zstandard
+
+from services.clock import clock
+from services.history import STATUS_CODES, STATUS_NAMES
+
+RECORDINGS_DIR = os.getenv("RECORDINGS_DIR", "recordings")
+
+_MAGIC = b"GSREC02\n"
+_RECORD = struct.Struct("<Bd")
+_LENGTH = struct.Struct("<I")
+# magic -> (index and count, string length, device row)
+_FORMATS = {
+    _MAGIC: (struct.Struct("<I"), struct.Struct("<H"), struct.Struct("<IBfff")),
+    b"GSREC01\n": (struct.Struct("<H"), struct.Struct("<B"), struct.Struct("<HBfff")),
+}
+_COUNT, _STR_LENGTH, _DEVICE = _FORMATS[_MAGIC]
+
+DEFINE, SNAPSHOT, GRID = 1, 2, 3
+
+
+def _open(path: Path, mode: str) -> BinaryIO:
+    raw = open(path, mode)
+    if path.suffix != ".zst":
+        return raw
+    if mode == "wb":
+        return zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+    return zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+
+
+def _read_exact(f: BinaryIO, size: int) -> bytes:
+    data = f.read(size)
+    while len(data) < size:
+        chunk = f.read(size - len(data))
+        if not chunk:
+            raise EOFError
+        data += chunk
+    return data
+
+
+def _short_str(value: str) -> bytes:
+    encoded = value.encode()
+    return _STR_LENGTH.pack(len(encoded)) + encoded
+
+
+def _read_str(f: BinaryIO, length: struct.Struct) -> str:
+    return _read_exact(f, length.unpack(_read_exact(f, length.size))[0]).decode()
+
+
+class TelemetryRecorder:
+    """Append device snapshots and grid context changes to a binary log"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = _open(self.path, "wb")
+        self._file.write(_MAGIC)
+        self._index: Dict[str, int] = {}
+        self._last_grid: Optional[dict] = None
+        self.snapshots = 0
+        self.started_at = time.time()
+
+    def record_snapshot(self, ts: float, devices: Iterable):
+        rows = []
+        for device in devices:
+            index = self._index.get(device.device_id)
+            if index is None:
+                index = self._index[device.device_id] = len(self._index)
+                self._file.write(
+                    _RECORD.pack(DEFINE, ts) + _COUNT.pack(index)
+                    + _short_str(device.device_id) + _short_str(device.device_type)
+                )
+            rows.append(_DEVICE.pack(
+                index, STATUS_CODES.get(device.status, 255), device.voltage, device.current, device.power
+            ))
+        self._file.write(_RECORD.pack(SNAPSHOT, ts) + _COUNT.pack(len(rows)) + b"".join(rows))
+        self.snapshots += 1
+
+    def record_grid(self, ts: float, context: dict):
+        if context == self._last_grid:
+            return
+        self._last_grid = dict(context)
+        payload = json.dumps(context).encode()
+        self._file.write(_RECORD.pack(GRID, ts) + _LENGTH.pack(len(payload)) + payload)
+
+    def close(self):
+        self._file.close()
+
+
+def read_log(path: Path) -> Iterator[Tuple[int, float, object]]:
+    """
+    Yield (type, timestamp, payload) records
+
+    SNAPSHOT payloads are lists of (device_id, device_type, status, voltage,
+    current, power); GRID payloads are context dicts. DEFINE records are
+    consumed internally.
+    """
+    devices: Dict[int, Tuple[str, str]] = {}
+    with _open(Path(path), "rb") as f:
+        magic = _read_exact(f, len(_MAGIC))
+        if magic not in _FORMATS:
+            raise ValueError(f"Not a telemetry recording: {path}")
+        count_format, length_format, device_format = _FORMATS[magic]
+        while True:
+            try:
+                kind, ts = _RECORD.unpack(_read_exact(f, _RECORD.size))
+            except EOFError:
+                return
+            if kind == DEFINE:
+                (index,) = count_format.unpack(_read_exact(f, count_format.size))
+                device_id = _read_str(f, length_format)
+                device_type = _read_str(f, length_format)
+                devices[index] = (device_id, device_type)
+            elif kind == SNAPSHOT:
+                (count,) = count_format.unpack(_read_exact(f, count_format.size))
+                rows = []
+                for _ in range(count):
+                    index, status, voltage, current, power = device_format.unpack(_read_exact(f, device_format.size))
+                    device_id, device_type = devices[index]
+                    rows.append((device_id, device_type, STATUS_NAMES.get(status, "off"), voltage, current, power))
+                yield kind, ts, rows
+            elif kind == GRID:
+                (length,) = _LENGTH.unpack(_read_exact(f, _LENGTH.size))
+                yield kind, ts, json.loads(_read_exact(f, length))
+            else:
+                raise ValueError(f"Corrupt recording {path}: unknown record type {kind}")
+
+
+class RecordingService:
+    """
+    Owns the active recorder and replay task
+
+    Simulators call on_snapshot/on_grid every tick; both are no-ops unless a
+    recording is running. During replay, recorded states are written into the
+    live device and grid objects, so /api/stream/*, the WebSocket hub and
+    the Pathway connectors all serve the captured traffic.
+    """
+
+    def __init__(self):
+        self.recorder: Optional[TelemetryRecorder] = None
+        self.replaying: Optional[dict] = None
+        self._replay_task: Optional[asyncio.Task] = None
+
+    def on_snapshot(self, ts: float, devices: Iterable):
+        if self.recorder:
+            try:
+                self.recorder.record_snapshot(ts, devices)
+            except (OSError, struct.error) as e:
+                self._fail(e)
+
+    def on_grid(self, ts: float, context: dict):
+        if self.recorder:
+            try:
+                self.recorder.record_grid(ts, context)
+            except (OSError, struct.error) as e:
+                self._fail(e)
+
+    def _fail(self, error: Exception):
+        """Stop a recording that cannot be written instead of failing the caller's tick"""
+        print(f"Recording to {self.recorder.path} stopped: {error}")
+        try:
+            self.recorder.close()
+        except OSError:
+            pass
+        self.recorder = None
+
+    def start_recording(self, path: Path, grid_context: dict) -> dict:
+        self.stop_recording()
+        self.recorder = TelemetryRecorder(path)
+        self.recorder.record_grid(clock.time(), grid_context)
+        return self.status()
+
+    def stop_recording(self) -> dict:
+        status = self.status()
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
+        return status
+
+    def start_replay(self, path: Path, device_manager, grid_service, speed: float = 1.0, loop: bool = False) -> dict:
+        self.stop_replay()
+        state = {"path": str(path), "speed": speed, "loop": loop, "snapshots": 0}
+        self.replaying = state
+        self._replay_task = asyncio.create_task(self._replay(Path(path), device_manager, grid_service, state))
+        return self.status()
+
+    def stop_replay(self) -> dict:
+        status = self.status()
+        if self._replay_task:
+            self._replay_task.cancel()
+            self._replay_task = None
+        self.replaying = None
+        return status
+
+    async def _replay(self, path: Path, device_manager, grid_service, state: dict):
+        speed = state["speed"]
+        device_manager.replaying = True
+        try:
+            while True:
+                first = None
+                started = clock.time()
+                for kind, ts, payload in read_log(path):
+                    if first is None:
+                        first = ts
+                    delay = (ts - first) / speed - (clock.time() - started)
+                    if delay > 0:
+                        await clock.sleep(delay)
+                    if kind == SNAPSHOT:
+                        device_manager.apply_snapshot(payload)
+                        state["snapshots"] += 1
+                    elif kind == GRID:
+                        grid_service.context.update(payload)
+                        grid_service.context["last_updated"] = clock.time()
+                if not state["loop"]:
+                    break
+        except Exception as e:
+            print(f"Replay of {path} failed: {e}")
+        finally:
+            if self._replay_task in (None, asyncio.current_task()):
+                device_manager.replaying = False
+                self.replaying = None
+                self._replay_task = None
+
+    def status(self) -> dict:
+        return {
+            "recording": {
+                "path": str(self.recorder.path),
+                "snapshots": self.recorder.snapshots,
+                "started_at": self.recorder.started_at,
+            } if self.recorder else None,
+            "replaying": dict(self.replaying) if self.replaying else None,
+        }
+
+
+recording_service = RecordingService()
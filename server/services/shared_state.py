@@ -0,0 +1,276 @@
+"""
+Shared-memory telemetry state for multi-worker deployments
+
+The simulation, grid context and LLM loops are per-process singletons, so
+`--workers N` would run N different fleets. SERVER_ROLE splits the roles:
+
+- single (default): one process does everything, nothing is shared.
+- owner: runs every loop as usual and publishes a snapshot of all sites,
+  the grid context and the latest LLM insight into a shared-memory segment.
+- worker: runs no loops; serves live reads (/api/live, /api/stream/*, /ws,
+  see routes.worker) from the segment and forwards everything else to the
+  owner at OWNER_URL.
+
+Segment layout: [seq u64][length u64][payload]. The payload is one JSON
+header line followed by the per-site device JSON blobs it indexes, so a
+worker answers /api/live by slicing bytes instead of re-encoding.
+
+Writes use a seqlock: the owner makes seq odd, writes length and payload,
+then makes seq even. A reader copies the payload and keeps it only if seq
+was even and unchanged across the copy; otherwise it retries.
+"""
+
+import asyncio
+import json
+import os
+import struct
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, List, Optional, Tuple
+
+from services.devices import DEFAULT_SITE, telemetry_json
+from services.grid_context import grid_context_service
+from services.llm_insight import llm_insight_service
+from services.metrics import registry
+from services.sites import site_manager
+
+SERVER_ROLE = os.getenv("SERVER_ROLE", "single")  # single | owner | worker
+SHARED_STATE_NAME = os.getenv("SHARED_STATE_NAME", "gridsense_state")
+SHARED_STATE_SIZE = int(os.getenv("SHARED_STATE_SIZE", str(16 * 1024 * 1024)))  # bytes
+SHARED_STATE_INTERVAL = float(os.getenv("SHARED_STATE_INTERVAL", "0.1"))  # seconds
+# A worker re-attaches when the snapshot has not changed for this long (owner restarted)
+SHARED_STATE_STALE = float(os.getenv("SHARED_STATE_STALE", "5.0"))  # seconds
+
+SEQ = struct.Struct("<Q")
+HEADER_SIZE = 2 * SEQ.size
+READ_RETRIES = 100
+
+PUBLISH_SECONDS = registry.histogram("gridsense_shared_state_publish_seconds", "Time to serialize and publish one shared-memory snapshot")
+PUBLISH_BYTES = registry.gauge("gridsense_shared_state_bytes", "Size of the last published shared-memory snapshot")
+PUBLISH_SKIPPED = registry.counter("gridsense_shared_state_overflows", "Snapshots not published because they exceed SHARED_STATE_SIZE")
+READ_CONFLICTS = registry.counter("gridsense_shared_state_read_conflicts", "Shared-memory reads retried because the owner was writing")
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Open an existing segment without letting this process unlink it at exit"""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    segment = shared_memory.SharedMemory(name=name)
+    resource_tracker.unregister(segment._name, "shared_memory")
+    return segment
+
+
+def build_snapshot() -> bytes:
+    """Payload for the segment: JSON header line, then the device JSON blobs"""
+    sites = {}
+    blobs: List[bytes] = []
+    offset = 0
+    for site_id, manager in list(site_manager.sites.items()):
+        records = list(manager.get_all_records())
+        blob = telemetry_json(records).encode()
+        sites[site_id] = {
+            **manager.get_trace(),
+            "timestamp": records[0].timestamp if records else 0,
+            "devices": [offset, len(blob)]
+        }
+        blobs.append(blob)
+        offset += len(blob)
+
+    header = {
+        "published_at": time.time(),
+        "grid_context": grid_context_service.get_context(),
+        "llm_insight": llm_insight_service.latest_insight,
+        "llm_version": llm_insight_service.version,
+        "sites": sites
+    }
+    return json.dumps(header).encode() + b"\n" + b"".join(blobs)
+
+
+class SharedStatePublisher:
+    """Owner side: writes a snapshot every SHARED_STATE_INTERVAL"""
+
+    def __init__(self, name: str = SHARED_STATE_NAME, size: int = SHARED_STATE_SIZE, interval: float = SHARED_STATE_INTERVAL):
+        self.name = name
+        self.size = size
+        self.interval = interval
+        self.seq = 0
+        self._segment: Optional[shared_memory.SharedMemory] = None
+        self._task: Optional[asyncio.Task] = None
+        self._overflow_logged = False
+
+    def _create(self):
+        try:
+            self._segment = shared_memory.SharedMemory(name=self.name, create=True, size=self.size)
+        except FileExistsError:
+            # Left behind by an owner that did not shut down cleanly
+            stale = _attach(self.name)
+            stale.close()
+            stale.unlink()
+            self._segment = shared_memory.SharedMemory(name=self.name, create=True, size=self.size)
+
+    def publish(self, payload: bytes) -> bool:
+        buf = self._segment.buf
+        if HEADER_SIZE + len(payload) > len(buf):
+            PUBLISH_SKIPPED.inc()
+            if not self._overflow_logged:
+                print(f"Shared state snapshot of {len(payload)} bytes exceeds SHARED_STATE_SIZE={self.size}")
+                self._overflow_logged = True
+            return False
+        SEQ.pack_into(buf, 0, self.seq + 1)  # odd: write in progress
+        SEQ.pack_into(buf, SEQ.size, len(payload))
+        buf[HEADER_SIZE:HEADER_SIZE + len(payload)] = payload
+        self.seq += 2
+        SEQ.pack_into(buf, 0, self.seq)
+        PUBLISH_BYTES.set(len(payload))
+        return True
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            # Serializing a large fleet takes tens of milliseconds: keep it off the event loop
+            self.publish(await asyncio.to_thread(build_snapshot))
+            elapsed = time.perf_counter() - start
+            PUBLISH_SECONDS.observe(elapsed)
+            # Back off when a snapshot takes longer than the interval, so publishing
+            # never holds the GIL more than half the time
+            await asyncio.sleep(max(self.interval, elapsed))
+
+    def start_background_task(self):
+        if self._task is None:
+            self._create()
+            self._task = asyncio.create_task(self._run())
+            print(f"Shared state publisher started (segment={self.name}, size={self.size}, interval={self.interval}s)")
+
+    async def stop_background_task(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._segment is not None:
+            self._segment.close()
+            self._segment.unlink()
+            self._segment = None
+
+
+class SiteView:
+    """
+    One site of the shared snapshot, read live on every call
+
+    Provides the part of the DeviceManager read API used by the live routes
+    and the WebSocket pushes (site_id, get_trace, get_telemetry_json).
+    """
+
+    def __init__(self, reader: "SharedStateReader", site_id: str):
+        self.reader = reader
+        self.site_id = site_id
+
+    def _site(self) -> Tuple[dict, bytes]:
+        header, body = self.reader.snapshot()
+        return header.get("sites", {}).get(self.site_id, {}), body
+
+    def get_trace(self) -> dict:
+        site, _ = self._site()
+        return {"tick_id": site.get("tick_id"), "origin_ts": site.get("origin_ts")}
+
+    @property
+    def timestamp(self) -> float:
+        return self._site()[0].get("timestamp", 0)
+
+    def get_telemetry_json(self) -> str:
+        site, body = self._site()
+        if "devices" not in site:
+            return "{}"
+        offset, length = site["devices"]
+        return body[offset:offset + length].decode()
+
+
+class SharedStateReader:
+    """
+    Worker side: attaches lazily and re-reads the segment when seq changed
+
+    Also provides the grid context and LLM insight read API (get_context,
+    latest_insight, version) so the WebSocket pushes accept it in place of
+    the services.
+    """
+
+    def __init__(self, name: str = SHARED_STATE_NAME):
+        self.name = name
+        self._segment: Optional[shared_memory.SharedMemory] = None
+        # (seq, header, body), replaced as a whole so threadpool readers never see a mix
+        self._state: Tuple[int, dict, bytes] = (0, {}, b"")
+        self._changed_at = 0.0
+        # Routes call in from threadpool threads; a re-attach closes the segment others may be reading
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        with self._lock:
+            self._read_segment()
+
+    def _read_segment(self):
+        if self._segment is None:
+            try:
+                self._segment = _attach(self.name)
+            except FileNotFoundError:
+                return
+            self._changed_at = time.monotonic()
+            # A new segment restarts at seq 0: force a read even if the old seq matches
+            self._state = (-1, *self._state[1:])
+        buf = self._segment.buf
+        for _ in range(READ_RETRIES):
+            seq = SEQ.unpack_from(buf, 0)[0]
+            if seq == 0:
+                return
+            if seq == self._state[0]:
+                if time.monotonic() - self._changed_at > SHARED_STATE_STALE:
+                    self._segment.close()
+                    self._segment = None
+                return
+            if seq & 1:
+                READ_CONFLICTS.inc()
+                continue
+            length = SEQ.unpack_from(buf, SEQ.size)[0]
+            payload = bytes(buf[HEADER_SIZE:HEADER_SIZE + length])
+            if SEQ.unpack_from(buf, 0)[0] != seq:
+                READ_CONFLICTS.inc()
+                continue
+            header, _, body = payload.partition(b"\n")
+            self._state = (seq, json.loads(header), body)
+            self._changed_at = time.monotonic()
+            return
+
+    def snapshot(self) -> Tuple[dict, bytes]:
+        """Latest (header, body); ({}, b"") until the owner has published"""
+        self._refresh()
+        return self._state[1], self._state[2]
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.snapshot()[0])
+
+    def site_ids(self) -> List[str]:
+        return list(self.snapshot()[0].get("sites", {}))
+
+    def get(self, site_id: Optional[str] = None) -> Optional[SiteView]:
+        """View of a site (the default site when site_id is None), None if unknown"""
+        site_id = site_id or DEFAULT_SITE
+        return SiteView(self, site_id) if site_id in self.site_ids() else None
+
+    def get_context(self) -> Dict:
+        return self.snapshot()[0].get("grid_context", {})
+
+    @property
+    def latest_insight(self) -> Optional[dict]:
+        return self.snapshot()[0].get("llm_insight")
+
+    @property
+    def version(self) -> int:
+        return self.snapshot()[0].get("llm_version", 0)
+
+
+shared_state_publisher = SharedStatePublisher()
+shared_state_reader = SharedStateReader()
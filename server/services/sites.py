@@ -0,0 +1,102 @@
+"""
+Site registry
+
+Every site (plant) has its own DeviceManager with its own simulation task,
+tick counter, history and energy totals. The tasks share one event loop, so
+sites are isolated in state only: every site's tick runs on the same thread
+and the default site's tick lag grows with the devices of all other sites.
+The default site is the original device_manager. Further sites are created
+at startup from SITES_FILE (a YAML or JSON fleet definition, see
+services.fleet) or at runtime through /api/sites.
+
+History rings cost about 27 MB of sparse file per device, so sites with more
+than SITE_HISTORY_MAX_DEVICES devices must be created with history disabled.
+"""
+
+import os
+import re
+from typing import Any, Dict, Iterable, Optional
+
+from services.devices import DEFAULT_SITE, DeviceManager, device_manager
+from services.fleet import DeviceGroup, SitePlan, load_fleet
+
+SITES_FILE = os.getenv("SITES_FILE", "")
+SITE_HISTORY_MAX_DEVICES = int(os.getenv("SITE_HISTORY_MAX_DEVICES", "1000"))
+
+# Site ids are used as history directory names
+SITE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class SiteManager:
+    def __init__(self, default: DeviceManager):
+        self.sites: Dict[str, DeviceManager] = {default.site_id: default}
+        self._running = False
+
+    def get(self, site_id: Optional[str] = None) -> Optional[DeviceManager]:
+        """Device manager of a site (the default site when site_id is None)"""
+        return self.sites.get(site_id or DEFAULT_SITE)
+
+    def add_site(self, plan: SitePlan) -> DeviceManager:
+        """
+        Register a site whose devices are built lazily from its plan
+
+        Raises ValueError for an invalid or existing site id, for history on
+        more than SITE_HISTORY_MAX_DEVICES devices, or when the history
+        directory cannot be opened; the site is not registered then. It
+        starts simulating immediately when the registry is running.
+        """
+        if not SITE_ID_PATTERN.match(plan.site_id):
+            raise ValueError(f"Invalid site id: {plan.site_id}")
+        if plan.site_id in self.sites:
+            raise ValueError(f"Site already exists: {plan.site_id}")
+        if plan.history and plan.device_count > SITE_HISTORY_MAX_DEVICES:
+            raise ValueError(
+                f"Site {plan.site_id} has {plan.device_count} devices; history is limited to "
+                f"{SITE_HISTORY_MAX_DEVICES} (SITE_HISTORY_MAX_DEVICES), create it with history disabled"
+            )
+
+        manager = DeviceManager(plan.site_id, default_devices=False, history=plan.history)
+        if manager.history is not None and manager.history.error is not None:
+            raise ValueError(f"History for site {plan.site_id} unavailable: {manager.history.error}")
+        manager.add_pending(plan.devices(), plan.device_count)
+        self.sites[plan.site_id] = manager
+        if self._running:
+            manager.start_background_task()
+        return manager
+
+    def create_site(
+        self, site_id: str, devices: Iterable[Dict[str, Any]], seed: Any = None, history: bool = True
+    ) -> DeviceManager:
+        """Create a site from fleet device entries ({"device_id", "device_type"} or groups)"""
+        return self.add_site(SitePlan(site_id, [DeviceGroup.from_spec(spec) for spec in devices], seed, history))
+
+    async def remove_site(self, site_id: str) -> bool:
+        """Stop and drop a site; the default site cannot be removed"""
+        if site_id == DEFAULT_SITE or site_id not in self.sites:
+            return False
+        manager = self.sites.pop(site_id)
+        await manager.stop_background_task()
+        return True
+
+    def load_file(self, path: str):
+        """Create the sites of a fleet definition file"""
+        plans = load_fleet(path)
+        for plan in plans:
+            self.add_site(plan)
+        print(f"Loaded {len(plans)} sites ({sum(plan.device_count for plan in plans)} devices) from {path}")
+
+    def start_background_task(self):
+        """Start one simulation task per site"""
+        self._running = True
+        for manager in self.sites.values():
+            manager.start_background_task()
+
+    async def stop_background_task(self):
+        self._running = False
+        for manager in list(self.sites.values()):
+            await manager.stop_background_task()
+
+
+site_manager = SiteManager(device_manager)
+if SITES_FILE:
+    site_manager.load_file(SITES_FILE)
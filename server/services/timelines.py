@@ -0,0 +1,269 @@
+"""
+Scripted scenario timelines
+
+A timeline file (YAML or JSON in TIMELINES_DIR) lists steps at offsets in
+simulated seconds from the start of the run:
+
+    description: Motor surge with faults and a price spike
+    duration: 90                       # run length; grid overrides end here
+    steps:
+      - at: 5
+        selector: {type: motor, status: "off", limit: 50}
+        action: start
+        stagger: 2                     # spread the matched devices over 2s
+      - at: 30
+        selector: {type: motor, fraction: 0.05}
+        action: inject-fault
+      - at: 60
+        grid: {pricing_tier: HIGH, electricity_price: 0.32}
+        ramp: 10                       # numeric fields move linearly over 10s
+
+Control steps take a selector, action and value as in services.control.
+Grid steps pin grid context fields until the run ends. Steps run on the
+simulation clock, so a run under SIM_SPEED or SIM_FAST_FORWARD keeps its
+shape. Fraction samples are seeded per timeline and step, so a fleet built
+from a seeded fleet file gets the same devices on every run.
+
+Every applied batch is logged with simulated and wall time and the tick it
+lands after, for measuring Pathway and WebSocket latency against it.
+"""
+
+import asyncio
+import os
+import time
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from services.clock import clock
+from services.control import ControlOperation
+from services.devices import TICK_INTERVAL, Device, DeviceManager
+from services.fleet import read_spec
+from services.grid_context import grid_context_service
+from services.llm_insight import llm_insight_service
+from services.sites import site_manager
+
+TIMELINES_DIR = Path(os.getenv("TIMELINES_DIR", "timelines"))
+TIMELINE_SUFFIXES = (".yaml", ".yml", ".json")
+RAMP_STEP = 1.0  # simulated seconds between grid ramp updates
+
+GRID_FIELDS = {
+    "carbon_intensity": float,
+    "carbon_level": ("LOW", "MEDIUM", "HIGH"),
+    "electricity_price": float,
+    "pricing_tier": ("LOW", "MEDIUM", "HIGH"),
+    "grid_renewable_percentage": float,
+}
+
+
+class TimelineStep:
+    def __init__(self, at: float, operation: Optional[ControlOperation] = None, stagger: float = 0.0,
+                 grid: Optional[Dict[str, Any]] = None, ramp: float = 0.0):
+        if at < 0 or stagger < 0 or ramp < 0:
+            raise ValueError("at, stagger and ramp must not be negative")
+        if (operation is None) == (grid is None):
+            raise ValueError("A step needs either a selector/action or grid values")
+        for key, value in (grid or {}).items():
+            allowed = GRID_FIELDS.get(key)
+            if allowed is None:
+                raise ValueError(f"Unknown grid field: {key}")
+            if allowed is float and not isinstance(value, (int, float)) or allowed is not float and value not in allowed:
+                raise ValueError(f"Invalid value for {key}: {value}")
+        self.at = at
+        self.operation = operation
+        self.stagger = stagger
+        self.grid = grid
+        self.ramp = ramp
+
+    @classmethod
+    def from_spec(cls, spec: Dict[str, Any]) -> "TimelineStep":
+        operation = ControlOperation.from_spec(spec) if "action" in spec else None
+        return cls(
+            float(spec.get("at", 0)),
+            operation,
+            float(spec.get("stagger", 0)),
+            spec.get("grid"),
+            float(spec.get("ramp", 0))
+        )
+
+    @property
+    def end(self) -> float:
+        return self.at + max(self.stagger, self.ramp)
+
+
+class Timeline:
+    def __init__(self, name: str, steps: List[TimelineStep], description: str = "", duration: Optional[float] = None):
+        self.name = name
+        self.steps = sorted(steps, key=lambda step: step.at)
+        self.description = description
+        last = max((step.end for step in self.steps), default=0.0)
+        self.duration = max(last, duration or 0.0)
+
+    @classmethod
+    def from_spec(cls, name: str, spec: Dict[str, Any]) -> "Timeline":
+        steps = []
+        for number, step in enumerate(spec.get("steps", []), 1):
+            try:
+                steps.append(TimelineStep.from_spec(step))
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Step {number}: {e}")
+        return cls(spec.get("name", name), steps, spec.get("description", ""), spec.get("duration"))
+
+    def summary(self) -> dict:
+        return {"name": self.name, "description": self.description, "duration": self.duration, "steps": len(self.steps)}
+
+
+def timeline_files() -> Dict[str, Path]:
+    """Timeline files by name (file stem)"""
+    if not TIMELINES_DIR.is_dir():
+        return {}
+    return {
+        path.stem: path for path in sorted(TIMELINES_DIR.iterdir())
+        if path.suffix in TIMELINE_SUFFIXES
+    }
+
+
+def load_timeline(path: Path) -> Timeline:
+    """Parse a timeline file; raises ValueError if invalid"""
+    return Timeline.from_spec(path.stem, read_spec(str(path)))
+
+
+class TimelineRunner:
+    """Runs one timeline at a time and keeps the log of the latest run"""
+
+    def __init__(self):
+        self.timeline: Optional[Timeline] = None
+        self.site_id: Optional[str] = None
+        self.state = "idle"
+        self.started_at: Optional[float] = None  # simulated time
+        self.events: List[dict] = []
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def _log(self, index: int, step: TimelineStep, **fields):
+        self.events.append({
+            "step": index,
+            "at": step.at,
+            "offset": round(clock.time() - self.started_at, 3),
+            "sim_ts": clock.time(),
+            "wall_ts": time.time(),
+            **fields
+        })
+
+    async def _control(self, index: int, step: TimelineStep):
+        operation = step.operation
+        rng = clock.derive_rng(f"timeline:{self.timeline.name}:{index}")
+        managers = [site_manager.sites[site_id] for site_id in operation.selector.site_ids(self.site_id)]
+        slots = max(1, round(step.stagger / TICK_INTERVAL))
+        selected: Dict[str, List[Device]] = {}
+
+        def apply_slot(manager: DeviceManager, slot: int) -> dict:
+            # Devices are selected once, in the step's first tick; stagger only spreads the apply
+            if slot == 0:
+                selected[manager.site_id] = operation.selector.select(manager, rng)
+            devices = selected[manager.site_id]
+            chunk = devices[slot * len(devices) // slots:(slot + 1) * len(devices) // slots]
+            return {"after_tick_id": manager.tick_id, **operation.apply_to(chunk)}
+
+        begin = clock.time()
+        for slot in range(slots):
+            await clock.sleep(max(0.0, begin + slot * step.stagger / slots - clock.time()))
+            results = await asyncio.gather(*(manager.submit(partial(apply_slot, manager, slot)) for manager in managers))
+            applied = sum(result["applied"] for result in results)
+            if applied:
+                self._log(
+                    index, step, action=operation.action, applied=applied,
+                    after_tick_ids={manager.site_id: result["after_tick_id"] for manager, result in zip(managers, results)}
+                )
+                if operation.action == "inject-fault":
+                    llm_insight_service.trigger_urgent()
+
+    async def _grid(self, index: int, step: TimelineStep):
+        start = grid_context_service.get_context()
+        fixed = {key: value for key, value in step.grid.items() if GRID_FIELDS[key] is not float}
+        targets = {key: value for key, value in step.grid.items() if GRID_FIELDS[key] is float}
+        if fixed:
+            grid_context_service.set_override(fixed)
+            self._log(index, step, grid=fixed)
+        if not targets:
+            return
+        slots = max(1, round(step.ramp / RAMP_STEP))
+        begin = clock.time()
+        for slot in range(1, slots + 1):
+            await clock.sleep(max(0.0, begin + slot * step.ramp / slots - clock.time()))
+            values = {
+                key: round(start[key] + (target - start[key]) * slot / slots, 4)
+                for key, target in targets.items()
+            }
+            grid_context_service.set_override(values)
+            self._log(index, step, grid=values)
+
+    async def _step(self, index: int, step: TimelineStep):
+        if step.operation is not None:
+            await self._control(index, step)
+        else:
+            await self._grid(index, step)
+
+    async def _run(self):
+        tasks = []
+        try:
+            for index, step in enumerate(self.timeline.steps):
+                await clock.sleep(max(0.0, self.started_at + step.at - clock.time()))
+                tasks.append(asyncio.create_task(self._step(index, step)))
+            await asyncio.gather(*tasks)
+            await clock.sleep(max(0.0, self.started_at + self.timeline.duration - clock.time()))
+            self.state = "finished"
+        except asyncio.CancelledError:
+            self.state = "stopped"
+            raise
+        except Exception as e:
+            self.state = f"failed: {e}"
+        finally:
+            for task in tasks:
+                task.cancel()
+            grid_context_service.clear_override()
+            print(f"Timeline {self.timeline.name} {self.state}")
+
+    def start(self, timeline: Timeline, site_id: str):
+        """
+        Start a run; selectors without a site pattern target site_id
+
+        Raises RuntimeError when a run is in progress and ValueError when a
+        step's site pattern matches no site.
+        """
+        if self.running:
+            raise RuntimeError(f"Timeline {self.timeline.name} is already running")
+        for step in timeline.steps:
+            if step.operation is not None and not step.operation.selector.site_ids(site_id):
+                raise ValueError(f"No site matches {step.operation.selector.site or site_id}")
+        self.timeline = timeline
+        self.site_id = site_id
+        self.state = "running"
+        self.started_at = clock.time()
+        self.events = []
+        self._task = asyncio.create_task(self._run())
+        print(f"Timeline {timeline.name} started on site {site_id} ({timeline.duration}s)")
+
+    def status(self) -> dict:
+        return {
+            "timeline": self.timeline.summary() if self.timeline else None,
+            "site_id": self.site_id,
+            "state": self.state,
+            "started_at": self.started_at,
+            "elapsed": round(clock.time() - self.started_at, 3) if self.running else None,
+            "events": self.events
+        }
+
+    async def stop_background_task(self):
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+timeline_runner = TimelineRunner()
@@ -0,0 +1,206 @@
+"""
+Async load benchmark for the GridSense API
+
+Drives concurrent REST pollers, WebSocket subscribers and device-control
+bursts against a running server, then reports p50/p95/p99 latency,
+throughput and server CPU as JSON for run-to-run comparison.
+
+Usage:
+    python tests/load_benchmark.py --pollers 50 --ws-subscribers 200 --duration 60 \
+        --server-pid $(pgrep -f "uvicorn main:app") --output results.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+import websockets
+
+DEFAULT_ENDPOINTS = [
+    "/api/live",
+    "/api/stream/internal",
+    "/api/grid",
+    "/api/pathway/summary",
+]
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies: List[float], errors: int, duration: float) -> dict:
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / duration, 2),
+        "p50_ms": to_ms(percentile(latencies, 50)),
+        "p95_ms": to_ms(percentile(latencies, 95)),
+        "p99_ms": to_ms(percentile(latencies, 99)),
+        "max_ms": to_ms(max(latencies) if latencies else None),
+    }
+
+
+def to_ms(seconds: Optional[float]) -> Optional[float]:
+    """Seconds to milliseconds, rounded for reports"""
+    return round(seconds * 1000, 3) if seconds is not None else None
+
+
+def cpu_seconds(pid: int) -> Optional[float]:
+    """User + system CPU seconds of a process (Linux /proc)"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def ok(self, key: str, seconds: float):
+        self.latencies[key].append(seconds)
+
+    def fail(self, key: str):
+        self.errors[key] += 1
+
+    def report(self, duration: float) -> dict:
+        keys = set(self.latencies) | set(self.errors)
+        return {key: summarize(self.latencies[key], self.errors[key], duration) for key in sorted(keys)}
+
+
+async def poller(client: httpx.AsyncClient, endpoints: List[str], interval: float, deadline: float, rec: Recorder):
+    while time.perf_counter() < deadline:
+        for path in endpoints:
+            start = time.perf_counter()
+            try:
+                response = await client.get(path)
+                response.raise_for_status()
+                rec.ok(path, time.perf_counter() - start)
+            except httpx.HTTPError:
+                rec.fail(path)
+        if interval:
+            await asyncio.sleep(interval)
+
+
+async def ws_subscriber(url: str, deadline: float, ping_interval: float, rec: Recorder, counts: Dict[str, int]):
+    start = time.perf_counter()
+    try:
+        async with websockets.connect(url, max_size=None) as ws:
+            rec.ok("ws_connect", time.perf_counter() - start)
+            next_ping = time.perf_counter()
+            ping_sent = None
+            while time.perf_counter() < deadline:
+                if ping_sent is None and time.perf_counter() >= next_ping:
+                    ping_sent = time.perf_counter()
+                    await ws.send("ping")
+                try:
+                    raw = await asyncio.wait_for(ws.recv(), timeout=max(0.01, deadline - time.perf_counter()))
+                except asyncio.TimeoutError:
+                    break
+                message_type = json.loads(raw).get("type", "unknown")
+                counts[message_type] += 1
+                if message_type == "pong" and ping_sent is not None:
+                    rec.ok("ws_ping_rtt", time.perf_counter() - ping_sent)
+                    ping_sent = None
+                    next_ping = time.perf_counter() + ping_interval
+    except (OSError, websockets.WebSocketException):
+        rec.fail("ws_connect")
+
+
+async def control_bursts(client: httpx.AsyncClient, size: int, interval: float, deadline: float, rec: Recorder):
+    devices = (await client.get("/api/devices")).json()["devices"]
+    if not devices:
+        return
+
+    async def one(device: dict):
+        action = random.choice(["on", "off"])
+        start = time.perf_counter()
+        try:
+            response = await client.post(f"/api/devices/{device['device_id']}/control/{action}")
+            response.raise_for_status()
+            rec.ok("control", time.perf_counter() - start)
+        except httpx.HTTPError:
+            rec.fail("control")
+
+    while time.perf_counter() < deadline:
+        burst_start = time.perf_counter()
+        await asyncio.gather(*(one(random.choice(devices)) for _ in range(size)))
+        rec.ok("control_burst", time.perf_counter() - burst_start)
+        await asyncio.sleep(interval)
+
+
+async def run(args) -> dict:
+    rec = Recorder()
+    ws_counts: Dict[str, int] = defaultdict(int)
+    limits = httpx.Limits(max_connections=args.pollers + args.burst_size + 10)
+    ws_url = args.base_url.replace("http", "ws", 1) + "/ws"
+    cpu_start = cpu_seconds(args.server_pid) if args.server_pid else None
+
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        started = time.perf_counter()
+        deadline = started + args.duration
+        tasks = [poller(client, args.endpoints, args.poll_interval, deadline, rec) for _ in range(args.pollers)]
+        tasks += [ws_subscriber(ws_url, deadline, args.ping_interval, rec, ws_counts) for _ in range(args.ws_subscribers)]
+        if args.burst_size:
+            tasks.append(control_bursts(client, args.burst_size, args.burst_interval, deadline, rec))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    cpu_end = cpu_seconds(args.server_pid) if args.server_pid else None
+    return {
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "host": platform.node(),
+        "started_at": time.time() - elapsed,
+        "duration_s": round(elapsed, 3),
+        "latency": rec.report(elapsed),
+        "websocket_messages": {
+            "by_type": dict(ws_counts),
+            "per_second": round(sum(ws_counts.values()) / elapsed, 2),
+        },
+        "server_cpu_percent": (
+            round((cpu_end - cpu_start) / elapsed * 100, 1)
+            if cpu_start is not None and cpu_end is not None else None
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GridSense async load benchmark")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--pollers", type=int, default=10, help="concurrent REST pollers")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="seconds between poll rounds (0 = closed loop)")
+    parser.add_argument("--endpoints", nargs="+", default=DEFAULT_ENDPOINTS)
+    parser.add_argument("--ws-subscribers", type=int, default=10)
+    parser.add_argument("--ping-interval", type=float, default=1.0, help="seconds between WebSocket pings")
+    parser.add_argument("--burst-size", type=int, default=0, help="concurrent control requests per burst")
+    parser.add_argument("--burst-interval", type=float, default=5.0)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--server-pid", type=int, help="server process id for CPU accounting")
+    parser.add_argument("--output", help="write results JSON to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Pathway pipeline throughput and latency benchmark
+
+Feeds synthetic device and grid streams through the real PathwayProcessor
+anomaly, statistics and recommendation graphs using in-memory connectors,
+with outputs written to rotating JSONL sinks in a temporary directory.
+Each rate runs in a fresh process so memory figures are not shared.
+
+Latency is measured from a row's origin timestamp (set when the synthetic
+tick is emitted) to the flush of the batch containing its output row.
+
+Usage:
+    python tests/pathway_benchmark.py --rates 1000 5000 20000 50000 --duration 20 \
+        --devices 100 --output pathway_results.json
+
+Requires the `pathway` package.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from load_benchmark import percentile, to_ms  # noqa: E402
+
+DEVICE_TYPES = ["motor", "hvac", "lighting", "pump"]
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * PAGE_SIZE / 2**20
+
+
+class MemorySampler(threading.Thread):
+    def __init__(self, interval: float = 0.25):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples: List[float] = []
+        self._halt = threading.Event()
+
+    def run(self):
+        while not self._halt.is_set():
+            self.samples.append(rss_mb())
+            self._halt.wait(self.interval)
+
+    def stop(self):
+        self._halt.set()
+        self.join()
+
+
+def run_rate(rate: int, duration: float, devices: int, anomaly_ratio: float, seed: int) -> dict:
+    """Run the pipeline once at `rate` device rows per second (child process)"""
+    import pathway as pw
+
+    from services.pathway.processor import PathwayProcessor
+    from services.pathway.sink import RotatingJsonlSink
+
+    rng = random.Random(seed)
+    done = threading.Event()
+    fleet = [(f"{DEVICE_TYPES[i % len(DEVICE_TYPES)]}_{i:05d}", DEVICE_TYPES[i % len(DEVICE_TYPES)]) for i in range(devices)]
+    emitted = {"rows": 0, "started": None, "finished": None}
+
+    class SyntheticDevices(pw.io.python.ConnectorSubject):
+        def run(self):
+            started = time.perf_counter()
+            emitted["started"] = time.time()
+            while True:
+                elapsed = time.perf_counter() - started
+                if elapsed >= duration:
+                    break
+                target = int(rate * elapsed)
+                while emitted["rows"] < target:
+                    device_id, device_type = fleet[emitted["rows"] % devices]
+                    anomalous = rng.random() < anomaly_ratio
+                    current = rng.uniform(101.0, 150.0) if anomalous else rng.uniform(1.0, 40.0)
+                    now = time.time()
+                    self.next(
+                        site_id="default",
+                        device_id=device_id,
+                        device_type=device_type,
+                        status="running",
+                        voltage=230.0,
+                        current=current,
+                        power=current * 230.0,
+                        timestamp=now,
+                        tick_id=emitted["rows"],
+                        origin_ts=now,
+                        ingest_ts=now,
+                    )
+                    emitted["rows"] += 1
+                time.sleep(0.001)
+            emitted["finished"] = time.time()
+            done.set()
+
+    class SyntheticGrid(pw.io.python.ConnectorSubject):
+        def run(self):
+            while True:
+                price = rng.uniform(0.08, 0.30)
+                self.next(
+                    carbon_intensity=rng.uniform(250.0, 650.0),
+                    carbon_level="MEDIUM",
+                    electricity_price=price,
+                    pricing_tier="HIGH" if price > 0.24 else "MEDIUM",
+                    renewable_pct=rng.uniform(10.0, 60.0),
+                    timestamp=time.time(),
+                )
+                if done.wait(1.0):
+                    break
+
+    processor = PathwayProcessor()
+    device_stream, grid_stream = processor._create_streams(SyntheticDevices(), SyntheticGrid())
+    tables = {
+        "anomalies": processor._detect_anomalies(device_stream),
+        "device_stats": processor._compute_statistics(device_stream),
+        "recommendations": processor._generate_recommendations(device_stream, grid_stream),
+    }
+
+    workdir = tempfile.mkdtemp(prefix="pathway_bench_")
+    latencies: Dict[str, List[float]] = {name: [] for name in tables}
+    rows_out: Dict[str, int] = {name: 0 for name in tables}
+    last_output = {"at": None}
+
+    def subscribe(name, table):
+        sink = RotatingJsonlSink(os.path.join(workdir, f"{name}.jsonl"))
+        pending: List[float] = []
+
+        def on_change(key, row, time_, is_addition):
+            sink.on_change(key, row, time_, is_addition)
+            rows_out[name] += 1
+            if is_addition and "timestamp" in row:
+                pending.append(row["timestamp"])
+
+        def on_time_end(time_):
+            sink.on_time_end(time_)
+            now = time.time()
+            latencies[name].extend(now - origin for origin in pending)
+            pending.clear()
+            last_output["at"] = now
+
+        pw.io.subscribe(table, on_change=on_change, on_time_end=on_time_end, on_end=sink.on_end)
+
+    for name, table in tables.items():
+        subscribe(name, table)
+
+    sampler = MemorySampler()
+    rss_start = rss_mb()
+    sampler.start()
+    pw.run(monitoring_level=pw.MonitoringLevel.NONE)
+    sampler.stop()
+
+    input_seconds = emitted["finished"] - emitted["started"]
+    drain_seconds = (last_output["at"] or emitted["finished"]) - emitted["started"]
+    output_bytes = sum(f.stat().st_size for f in Path(workdir).iterdir())
+    shutil.rmtree(workdir, ignore_errors=True)
+    rss_end = rss_mb()
+    return {
+        "target_rows_per_s": rate,
+        "rows_in": emitted["rows"],
+        "input_rows_per_s": round(emitted["rows"] / input_seconds, 1),
+        "sustained_rows_per_s": round(emitted["rows"] / drain_seconds, 1),
+        "drain_lag_s": round(drain_seconds - input_seconds, 3),
+        "rows_out": rows_out,
+        "output_bytes": output_bytes,
+        "latency": {
+            name: {
+                "rows": len(values),
+                "p50_ms": to_ms(percentile(values, 50)),
+                "p95_ms": to_ms(percentile(values, 95)),
+                "p99_ms": to_ms(percentile(values, 99)),
+                "max_ms": to_ms(max(values) if values else None),
+            }
+            for name, values in latencies.items() if name != "device_stats"
+        },
+        "memory_mb": {
+            "start": round(rss_start, 1),
+            "peak": round(max(sampler.samples, default=rss_start), 1),
+            "end": round(rss_end, 1),
+            "growth": round(rss_end - rss_start, 1),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GridSense Pathway pipeline benchmark")
+    parser.add_argument("--rates", type=int, nargs="+", default=[1000, 5000, 20000], help="device rows per second")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per rate")
+    parser.add_argument("--devices", type=int, default=100, help="distinct synthetic devices")
+    parser.add_argument("--anomaly-ratio", type=float, default=0.02, help="fraction of rows above the current threshold")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results JSON to this file")
+    parser.add_argument("--child-rate", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child_rate:
+        result = run_rate(args.child_rate, args.duration, args.devices, args.anomaly_ratio, args.seed)
+        print(json.dumps(result))
+        return
+
+    started_at = time.time()
+    runs = []
+    for rate in args.rates:
+        command = [
+            sys.executable, __file__, "--child-rate", str(rate), "--duration", str(args.duration),
+            "--devices", str(args.devices), "--anomaly-ratio", str(args.anomaly_ratio), "--seed", str(args.seed),
+        ]
+        print(f"Running {rate} rows/s for {args.duration:.0f}s...", file=sys.stderr)
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode != 0:
+            runs.append({"target_rows_per_s": rate, "error": completed.stderr.strip()[-2000:]})
+            continue
+        # Pathway may log to stdout; the result is the last line
+        runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    results = {
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "child_rate")},
+        "host": platform.node(),
+        "started_at": started_at,
+        "runs": runs,
+    }
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
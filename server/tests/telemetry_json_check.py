@@ -0,0 +1,59 @@
+"""
+Check that telemetry_json matches json.dumps of the telemetry dicts
+
+Builds records with ordinary, extreme and non-finite values (NaN and
+infinities are expected as null) and non-ASCII ids, and exits non-zero on
+the first mismatch or invalid JSON.
+
+Usage:
+    python tests/telemetry_json_check.py
+"""
+
+import json
+import math
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.devices import TelemetryRecord, telemetry_json  # noqa: E402
+
+VALUES = [0.0, -0.0, 1.0, 230.0, 1e-300, 1e300, 0.1 + 0.2, 12345.678901234, math.nan, math.inf, -math.inf]
+
+
+def reference(records) -> str:
+    """json.dumps of the get_telemetry() dicts, non-finite values as None"""
+    return json.dumps({
+        r.device_id: {
+            field: None if isinstance(value, float) and not math.isfinite(value) else value
+            for field, value in r._asdict().items()
+        }
+        for r in records
+    })
+
+
+def main():
+    rng = random.Random(0)
+    cases = [[]]
+    for number in range(200):
+        cases.append([
+            TelemetryRecord(
+                f"dev_{number}_{index}" + rng.choice(["", "é", '"quoted"', "tab\t", "☃"]),
+                "motor", "site_a", rng.choice(["off", "running", "fault"]),
+                *(rng.choice(VALUES + [rng.uniform(-1e6, 1e6)]) for _ in range(4))
+            )
+            for index in range(rng.randint(1, 5))
+        ])
+    for records in cases:
+        output = telemetry_json(records)
+        expected = reference(records)
+        if output != expected:
+            print(f"Mismatch:\n  telemetry_json: {output}\n  json.dumps:     {expected}")
+            sys.exit(1)
+        json.loads(output, parse_constant=lambda name: sys.exit(f"Invalid JSON constant {name} in {output}"))
+    print(f"telemetry_json matches json.dumps on {len(cases)} cases")
+
+
+if __name__ == "__main__":
+    main()